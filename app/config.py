@@ -0,0 +1,75 @@
+import os
+
+# Подключение к БД и настройки пула соединений одного процесса (воркера uvicorn)
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/upload_data")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Подключение для чтения (реплика); пустое значение - читать через DATABASE_URL.
+# Соединения этого движка открывают только транзакции на чтение
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+
+# Сколько секунд после загрузки чтения клиента идут через основную БД, чтобы он видел свои данные
+# несмотря на отставание реплики; 0 - не закреплять
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "0"))
+
+# Ограничение времени выполнения одного запроса в миллисекундах, 0 - без ограничения.
+# Распространяется и на COPY при загрузке, поэтому должно превышать время загрузки самого большого файла
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Количество строк CSV, читаемых и записываемых за одну порцию
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "10000"))
+
+# Максимальное количество одновременно обрабатываемых загрузок, остальные ждут в очереди
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", "2"))
+
+# Каталог, в котором сохраняются файлы фоновых загрузок до их обработки
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp/uploads")
+
+# Сколько завершенных фоновых задач хранить для запросов статуса
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+
+# Сколько ждать блокировки таблиц при подмене промежуточных копий, прежде чем отказаться от подмены
+SWAP_LOCK_TIMEOUT_MS = int(os.getenv("SWAP_LOCK_TIMEOUT_MS", "10000"))
+
+# Что делать загрузке, когда рабочие таблицы изменяет другой воркер или реплика:
+# wait - дождаться своей очереди, reject - отказаться с ответом 409
+LOAD_LOCK_MODE = os.getenv("LOAD_LOCK_MODE", "wait")
+
+# Движок разбора CSV: c (pandas), pyarrow (потоковое чтение блоками, если библиотека установлена)
+# или auto - pyarrow при наличии, иначе pandas. По умолчанию c: pyarrow читает все столбцы как строки
+# и приводит числа в каждой порции, что на типичных файлах медленнее разбора pandas
+CSV_ENGINE = os.getenv("CSV_ENGINE", "c")
+
+# Размер блока в байтах для потокового чтения CSV через pyarrow
+CSV_BLOCK_SIZE = int(os.getenv("CSV_BLOCK_SIZE", str(16 * 1024 * 1024)))
+
+# Количество процессов для параллельного разбора файлов пакетной загрузки
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Хранение агрегатов: tables - таблицы, заполняемые приложением, matview - материализованные
+# представления PostgreSQL, которые обновляются через REFRESH MATERIALIZED VIEW CONCURRENTLY
+AGGREGATE_BACKEND = os.getenv("AGGREGATE_BACKEND", "tables")
+
+# Сколько секунд воркер использует закэшированный справочник регион -> округ, прежде чем перечитать его;
+# после замены справочника в любом воркере он перечитывается сразу по общей версии данных
+REGION_COUNTY_CACHE_SECONDS = float(os.getenv("REGION_COUNTY_CACHE_SECONDS", "60"))
+
+# Сколько секунд воркер отвечает из кэша агрегатов, не запрашивая общую версию данных из БД;
+# загрузки других воркеров становятся видны здесь не позже чем через это время
+AGGREGATE_VERSION_CHECK_SECONDS = float(os.getenv("AGGREGATE_VERSION_CHECK_SECONDS", "1"))
+
+# Максимальный размер одной части возобновляемой загрузки в байтах
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("UPLOAD_CHUNK_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Через сколько секунд без новых частей сессия возобновляемой загрузки истекает, а промежуточные
+# копии таблиц, оставшиеся после сбоя воркера, считаются брошенными и удаляются
+STAGING_TTL_SECONDS = int(os.getenv("STAGING_TTL_SECONDS", str(24 * 60 * 60)))
+
+# Как часто каждый воркер ищет истекшие сессии и брошенные копии (первый раз - при запуске)
+STAGING_CLEANUP_INTERVAL_SECONDS = int(os.getenv("STAGING_CLEANUP_INTERVAL_SECONDS", "3600"))
+
+# Сколько ошибок проверки строк возвращать в ответе; общее количество ошибок сообщается всегда
+VALIDATION_ERROR_LIMIT = int(os.getenv("VALIDATION_ERROR_LIMIT", "100"))
@@ -0,0 +1,187 @@
+from typing import Dict, Optional
+
+SCHEMA = "fastapi_schema"
+
+# Таблицы с агрегатами, которые заполняются за один проход по company_data
+AGGREGATE_TABLES = {
+    "region_data": f"{SCHEMA}.region_data",
+    "county_data": f"{SCHEMA}.county_data",
+    "common_info_region": f"{SCHEMA}.common_info_region",
+    "common_info_county": f"{SCHEMA}.common_info_county",
+    "common_info_industry": f"{SCHEMA}.common_info_industry",
+}
+
+# Столбцы company_data, из которых строятся агрегаты
+SOURCE_COLUMNS = (
+    "region",
+    "county",
+    "industry",
+    "current_business_value",
+    "liquidation_value",
+    "creditor_return",
+    "working_capital_needs",
+    "pre_tax_profit",
+    "solvency_rank",
+    "roa_coefficient",
+)
+
+# Значения GROUPING(region, county, industry) для каждого набора группировки
+REGION_GROUP = 3
+COUNTY_GROUP = 5
+INDUSTRY_GROUP = 6
+
+TOTAL_COLUMNS = (
+    "total_business_value",
+    "total_liquidation_value",
+    "total_creditor_return",
+    "total_working_capital_needs",
+    "total_pre_tax_profit",
+)
+
+COUNT_COLUMNS = (
+    "total_companies",
+    "profitable_companies",
+    "debt_free_companies",
+    "solvent_companies",
+    "roa_companies",
+)
+
+
+# Набор группировки, ключевой столбец, столбцы значений и порядок вставки для каждой таблицы
+TARGET_LAYOUT = {
+    "region_data": (REGION_GROUP, "region", TOTAL_COLUMNS, """
+        CASE region
+            WHEN 'Москва' THEN 1
+            WHEN 'СПб' THEN 2
+            WHEN 'Новосибирск' THEN 3
+            ELSE 4
+        END"""),
+    "county_data": (COUNTY_GROUP, "county", TOTAL_COLUMNS, """
+        CASE county
+            WHEN 'Центральный' THEN 1
+            WHEN 'Северо-Западный' THEN 2
+            WHEN 'Сибирский' THEN 3
+            ELSE 4
+        END"""),
+    "common_info_region": (REGION_GROUP, "region", COUNT_COLUMNS, None),
+    "common_info_county": (COUNTY_GROUP, "county", COUNT_COLUMNS, None),
+    "common_info_industry": (INDUSTRY_GROUP, "industry", COUNT_COLUMNS, None),
+}
+
+
+def company_source(table: str = f"{SCHEMA}.company_data", sign: int = 1) -> str:
+    """Возвращает подзапрос со строками компаний и знаком их вклада в агрегаты"""
+    return f"SELECT {', '.join(SOURCE_COLUMNS)}, {sign} AS sign FROM {table}"
+
+
+def _stats_ctes(source: str) -> str:
+    """CTE stats: группировка типизированных показателей по всем наборам за один проход
+
+    Округ определяется при загрузке по справочнику region_county и хранится в company_data.
+    """
+    return f"""
+        stats AS (
+            SELECT
+                region,
+                county,
+                industry,
+                GROUPING(region, county, industry) AS grouping_id,
+                SUM(sign) AS total_companies,
+                SUM(CASE WHEN pre_tax_profit > 0 THEN sign ELSE 0 END) AS profitable_companies,
+                SUM(CASE WHEN creditor_return = 0 THEN sign ELSE 0 END) AS debt_free_companies,
+                SUM(CASE WHEN solvency_rank > 0 THEN sign ELSE 0 END) AS solvent_companies,
+                SUM(CASE WHEN roa_coefficient != 0 THEN sign ELSE 0 END) AS roa_companies,
+                SUM(sign * COALESCE(current_business_value, 0)) AS total_business_value,
+                SUM(sign * COALESCE(liquidation_value, 0)) AS total_liquidation_value,
+                SUM(sign * COALESCE(creditor_return, 0)) AS total_creditor_return,
+                SUM(sign * COALESCE(working_capital_needs, 0)) AS total_working_capital_needs,
+                SUM(sign * COALESCE(pre_tax_profit, 0)) AS total_pre_tax_profit
+            FROM ({source}) AS source
+            GROUP BY GROUPING SETS ((region), (county), (industry))
+        )"""
+
+
+def build_aggregation_sql(source: Optional[str] = None, targets: Dict[str, str] = AGGREGATE_TABLES) -> str:
+    """Строит запрос, который за один проход по source заполняет все таблицы агрегатов"""
+    ctes = [_stats_ctes(source or company_source())]
+
+    for name, (group, key, columns, order) in TARGET_LAYOUT.items():
+        column_list = ", ".join(columns)
+        ctes.append(f"""
+        {name} AS (
+            INSERT INTO {targets[name]} ({key}, {column_list})
+            SELECT {key}, {column_list}
+            FROM stats
+            WHERE grouping_id = {group}
+            {f"ORDER BY {order}" if order else ""}
+        )""")
+
+    return f"WITH {','.join(ctes)}\n        SELECT COUNT(*) FROM stats"
+
+
+def build_view_select(name: str, source: Optional[str] = None) -> str:
+    """Строит запрос с содержимым таблицы агрегатов name для материализованного представления
+
+    id нумерует строки в порядке вставки в таблицу, а суммы приводятся к типам ее столбцов.
+    """
+    group, key, columns, order = TARGET_LAYOUT[name]
+    column_list = ", ".join(
+        f"CAST({column} AS {'BIGINT' if column in TOTAL_COLUMNS else 'INTEGER'}) AS {column}" for column in columns
+    )
+    return f"""WITH {_stats_ctes(source or company_source())}
+        SELECT row_number() OVER (ORDER BY {order or key}) AS id, {key}, {column_list}
+        FROM stats
+        WHERE grouping_id = {group}"""
+
+
+def build_delta_sql(source: str, targets: Dict[str, str] = AGGREGATE_TABLES) -> str:
+    """Строит запрос, который прибавляет к таблицам агрегатов вклад строк source со знаком sign"""
+    ctes = [_stats_ctes(source)]
+
+    for name, (group, key, columns, order) in TARGET_LAYOUT.items():
+        column_list = ", ".join(columns)
+        assignments = ", ".join(f"{column} = target.{column} + delta.{column}" for column in columns)
+        ctes.append(f"""
+        {name}_updated AS (
+            UPDATE {targets[name]} AS target
+            SET {assignments}
+            FROM stats AS delta
+            WHERE delta.grouping_id = {group} AND target.{key} IS NOT DISTINCT FROM delta.{key}
+        ),
+        {name}_inserted AS (
+            INSERT INTO {targets[name]} ({key}, {column_list})
+            SELECT {key}, {column_list}
+            FROM stats AS delta
+            WHERE delta.grouping_id = {group} AND NOT EXISTS (
+                SELECT 1 FROM {targets[name]} AS target WHERE target.{key} IS NOT DISTINCT FROM delta.{key}
+            )
+            {f"ORDER BY {order}" if order else ""}
+        )""")
+
+    return f"WITH {','.join(ctes)}\n        SELECT COUNT(*) FROM stats"
+
+
+def build_cleanup_sql(targets: Dict[str, str] = AGGREGATE_TABLES) -> str:
+    """Строит запрос, удаляющий группы, в которых после применения дельты не осталось компаний"""
+    return f"""
+        WITH common_info_region AS (
+            DELETE FROM {targets["common_info_region"]} WHERE total_companies <= 0 RETURNING region
+        ),
+        common_info_county AS (
+            DELETE FROM {targets["common_info_county"]} WHERE total_companies <= 0 RETURNING county
+        ),
+        common_info_industry AS (
+            DELETE FROM {targets["common_info_industry"]} WHERE total_companies <= 0
+        ),
+        region_data AS (
+            DELETE FROM {targets["region_data"]} AS target
+            USING common_info_region AS emptied
+            WHERE target.region IS NOT DISTINCT FROM emptied.region
+        ),
+        county_data AS (
+            DELETE FROM {targets["county_data"]} AS target
+            USING common_info_county AS emptied
+            WHERE target.county IS NOT DISTINCT FROM emptied.county
+        )
+        SELECT 1
+    """
@@ -0,0 +1,58 @@
+import csv
+import io
+from typing import Iterable, Iterator, Sequence
+
+
+class CopyBuffer:
+    """Файлоподобный объект, отдающий строки в формате CSV для COPY FROM STDIN"""
+
+    def __init__(self, rows: Iterable[Sequence]):
+        self._rows: Iterator[Sequence] = iter(rows)
+        self._chunk = io.StringIO()
+        self._writer = csv.writer(self._chunk, lineterminator="\n")
+        self._pending = ""
+        self.rows_written = 0
+
+    def _fill(self, size: int) -> None:
+        """Дописывает строки в буфер, пока в нем не наберется size символов"""
+        while len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self.rows_written += 1
+            if self._chunk.tell() >= size:
+                self._flush_chunk()
+        self._flush_chunk()
+
+    def _flush_chunk(self) -> None:
+        self._pending += self._chunk.getvalue()
+        self._chunk.seek(0)
+        self._chunk.truncate()
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            self._fill(float("inf"))
+            data, self._pending = self._pending, ""
+            return data
+
+        self._fill(size)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+def copy_rows(connection, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """Потоково загружает строки в таблицу через COPY FROM STDIN и возвращает их количество"""
+    buffer = CopyBuffer(rows)
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    cursor = connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+    return buffer.rows_written
@@ -0,0 +1,152 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BANKRUPTCY_KEY = "возбуждено производство по делу о несостоятельности (банкротстве)"
+
+# Основные поля компании; все столбцы начиная со столбца-признака попадают в bankruptcy_data
+MAIN_COLUMNS = ("company_name", "region", "industry")
+
+BIGINT_LIMIT = 2 ** 63
+INTEGER_LIMIT = 2 ** 31
+
+# Показатели из bankruptcy_data, которые при загрузке копируются в типизированные столбцы:
+# для целочисленных указана граница диапазона, для вещественных - None
+METRIC_COLUMNS = {
+    "current_business_value": BIGINT_LIMIT,
+    "liquidation_value": BIGINT_LIMIT,
+    "creditor_return": BIGINT_LIMIT,
+    "working_capital_needs": BIGINT_LIMIT,
+    "pre_tax_profit": BIGINT_LIMIT,
+    "solvency_rank": INTEGER_LIMIT,
+    "roa_coefficient": None,
+}
+
+# Значения столбца-признака банкротства и соответствующие им значения is_bankrupt
+BANKRUPTCY_FLAGS = {"Да": True, "Нет": False}
+
+# Округ регионов, отсутствующих в справочнике region_county
+DEFAULT_COUNTY = "Другой"
+
+COMPANY_COLUMNS = (
+    MAIN_COLUMNS + ("bankruptcy_data",) + tuple(METRIC_COLUMNS) + ("is_bankrupt", "county", "row_hash")
+)
+
+# Явные типы текстовых столбцов, чтобы парсер не тратил время на их определение
+CSV_DTYPES = {column: str for column in MAIN_COLUMNS + (BANKRUPTCY_KEY,)}
+
+
+def _text_column(series: pd.Series) -> List[Any]:
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _integer_column(series: pd.Series, limit: int) -> List[Any]:
+    """Приводит столбец к целым числам; нечисловые и выходящие за диапазон значения дают None"""
+    numbers = pd.to_numeric(series, errors="coerce")
+    if numbers.dtype.kind == "f":
+        numbers = numbers.round()
+    valid = (numbers.notna() & (numbers >= -limit) & (numbers < limit)).to_numpy()
+
+    result = np.full(len(series), None, dtype=object)
+    result[valid] = numbers[valid].astype("int64").tolist()
+    return result.tolist()
+
+
+def _float_column(series: pd.Series) -> List[Any]:
+    """Приводит столбец к вещественным числам; нечисловые и бесконечные значения дают None"""
+    numbers = pd.to_numeric(series, errors="coerce").astype("float64")
+    valid = np.isfinite(numbers.to_numpy())
+
+    result = np.full(len(series), None, dtype=object)
+    result[valid] = numbers[valid].tolist()
+    return result.tolist()
+
+
+def _json_column(frame: pd.DataFrame) -> List[str]:
+    """Сериализует строки порции в JSON одним вызовом, без промежуточных словарей"""
+    frame = frame.copy(deep=False)
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype.kind != "f":
+            continue
+        numbers = values.to_numpy(dtype="float64", na_value=np.nan)
+        infinite = np.isinf(numbers)
+        present = numbers[~np.isnan(numbers)]
+        # Пропуски заставляют pandas хранить целые числа как float; возвращаем им целый вид,
+        # если все значения помещаются в int64, иначе оставляем вещественные
+        if not infinite.any() and np.all(np.mod(present, 1) == 0) and \
+                np.all((present >= -BIGINT_LIMIT) & (present < BIGINT_LIMIT)):
+            frame[column] = values.astype("Int64")
+        elif infinite.any():
+            # В JSON нет бесконечностей, и to_json записал бы их как null; сохраняем их текстом
+            frame[column] = values.astype(object).where(~infinite, pd.Series(numbers, index=values.index).astype(str))
+
+    text = frame.to_json(orient="records", lines=True, force_ascii=False, double_precision=15)
+    return text.rstrip("\n").split("\n") if len(frame) else []
+
+
+def _hash_column(columns: List[List[Any]]) -> List[int]:
+    """Хеширует содержимое строк; типизированные столбцы выводятся из JSON и в хеш не входят"""
+    frame = pd.DataFrame(dict(enumerate(columns)), dtype=object)
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashes.view("int64").tolist()
+
+
+class CompanyLayout:
+    """Разбиение столбцов файла на основные поля и bankruptcy_data, вычисляемое один раз по заголовку
+
+    counties - справочник регион -> округ, по которому округ компании определяется при загрузке.
+    """
+
+    def __init__(self, columns: Sequence[str], counties: Optional[Dict[str, str]] = None):
+        self.counties = counties or {}
+        columns = list(columns)
+        if BANKRUPTCY_KEY not in columns:
+            raise ValueError(f"Missing required column: {BANKRUPTCY_KEY}")
+
+        marker = columns.index(BANKRUPTCY_KEY)
+        self.bankruptcy_columns = [
+            column for position, column in enumerate(columns)
+            if BANKRUPTCY_KEY in column or position >= marker
+        ]
+        self.main_columns = [column for column in columns if column not in self.bankruptcy_columns]
+
+        ignored = [column for column in self.main_columns if column not in MAIN_COLUMNS]
+        if ignored:
+            logger.warning(f"Ignoring unknown columns before the bankruptcy marker: {', '.join(ignored)}")
+
+    def split(self, company_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Разделяет одну запись на основные поля и данные о банкротстве"""
+        main_data = {column: company_data[column] for column in self.main_columns if column in MAIN_COLUMNS}
+        bankruptcy_data = {column: company_data[column] for column in self.bankruptcy_columns}
+        return main_data, bankruptcy_data
+
+    def to_rows(self, frame: pd.DataFrame) -> Iterator[Tuple[Any, ...]]:
+        """Преобразует порцию в кортежи значений в порядке COMPANY_COLUMNS, обрабатывая данные по столбцам"""
+        size = len(frame)
+        missing = [None] * size
+
+        columns = [_text_column(frame[column]) if column in frame else missing for column in MAIN_COLUMNS]
+        columns.append(_json_column(frame[self.bankruptcy_columns]))
+        content = list(columns)
+
+        for column, limit in METRIC_COLUMNS.items():
+            if column not in frame:
+                columns.append(missing)
+            elif limit is None:
+                columns.append(_float_column(frame[column]))
+            else:
+                columns.append(_integer_column(frame[column], limit))
+
+        flags = frame[BANKRUPTCY_KEY].map(BANKRUPTCY_FLAGS)
+        columns.append(flags.astype(object).where(flags.notna(), None).tolist())
+        region = frame["region"].astype(object) if "region" in frame else pd.Series(missing, dtype=object)
+        counties = region.map(self.counties)
+        columns.append(counties.fillna(DEFAULT_COUNTY).tolist())
+        columns.append(_hash_column(content) if size else [])
+
+        return zip(*columns)
@@ -0,0 +1,51 @@
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import LOAD_LOCK_MODE
+from app.database.versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+LOCK_WAIT = "wait"
+LOCK_REJECT = "reject"
+LOCK_MODES = (LOCK_WAIT, LOCK_REJECT)
+
+# Ключ advisory-блокировки, под которой изменяются рабочие company_data и таблицы агрегатов
+LOAD_LOCK_KEY = "company_data_load"
+
+
+class LoadInProgress(RuntimeError):
+    """Рабочие таблицы изменяет другая загрузка, а LOAD_LOCK_MODE=reject запрещает ее ждать"""
+
+
+def acquire_load_lock(db: Session, on_wait: Optional[Callable[[], None]] = None) -> bool:
+    """Берет блокировку изменения рабочих таблиц до конца текущей транзакции
+
+    Блокировка общая для всех воркеров и реплик, работающих с одной БД. Разбор, проверка
+    и COPY в промежуточные копии идут без нее, а подмена таблиц, дописывание строк,
+    пересчет агрегатов и переназначение округов выполняются под ней по очереди. Если
+    блокировка занята, при LOAD_LOCK_MODE=wait вызывается on_wait и загрузка ждет
+    освобождения, при reject выбрасывается LoadInProgress. Повторный вызов в той же
+    транзакции не блокирует. Вместе с блокировкой увеличивается общая версия данных,
+    по которой воркеры сбрасывают закэшированные ответы. Возвращает True, если пришлось ждать.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+
+    params = {"key": LOAD_LOCK_KEY}
+    waited = False
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), params).scalar():
+        if LOAD_LOCK_MODE == LOCK_REJECT:
+            raise LoadInProgress("Another data load is being published, retry later")
+
+        logger.info("Waiting for another data load to be published")
+        if on_wait is not None:
+            on_wait()
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), params)
+        waited = True
+
+    bump_data_version(db)
+    return waited
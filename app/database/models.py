@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Boolean, Float, String, JSON, DateTime, ForeignKey, Index, \
+    LargeBinary, Text, func
 
 from sqlalchemy.orm import relationship
 
@@ -7,7 +8,15 @@ from app.database.base import Base
 
 class CompanyDataORM(Base):
     __tablename__ = 'company_data'
-    __table_args__ = {'schema': 'fastapi_schema'}
+    __table_args__ = (
+        # Составные индексы обслуживают фильтры списка компаний с keyset-пагинацией по id
+        # и группировку по region/industry
+        Index('ix_company_data_region_id', 'region', 'id'),
+        Index('ix_company_data_industry_id', 'industry', 'id'),
+        Index('ix_company_data_is_bankrupt_id', 'is_bankrupt', 'id'),
+        Index('ix_company_data_county_id', 'county', 'id'),
+        {'schema': 'fastapi_schema'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_name = Column(String)
@@ -16,6 +25,22 @@ class CompanyDataORM(Base):
 
     bankruptcy_data = Column(JSON)
 
+    # Типизированные копии показателей из bankruptcy_data, заполняются при загрузке
+    current_business_value = Column(BigInteger)
+    liquidation_value = Column(BigInteger)
+    creditor_return = Column(BigInteger)
+    working_capital_needs = Column(BigInteger)
+    pre_tax_profit = Column(BigInteger)
+    solvency_rank = Column(Integer)
+    roa_coefficient = Column(Float)
+    is_bankrupt = Column(Boolean)
+
+    # Федеральный округ по справочнику region_county на момент загрузки
+    county = Column(String)
+
+    # Хеш содержимого строки: позволяет upsert пропускать не изменившиеся строки
+    row_hash = Column(BigInteger)
+
     region_info = relationship("CommonInfoRegion", back_populates="company")
     county_info = relationship("CommonInfoCounty", back_populates="company")
     industry_info = relationship("CommonInfoIndustry", back_populates="company")
@@ -76,11 +101,11 @@ class RegionDataORM(Base):
     id = Column(Integer, primary_key=True, index=True)
     region = Column(String, unique=True)
 
-    total_business_value = Column(Integer)
-    total_liquidation_value = Column(Integer)
-    total_creditor_return = Column(Integer)
-    total_working_capital_needs = Column(Integer)
-    total_pre_tax_profit = Column(Integer)
+    total_business_value = Column(BigInteger)
+    total_liquidation_value = Column(BigInteger)
+    total_creditor_return = Column(BigInteger)
+    total_working_capital_needs = Column(BigInteger)
+    total_pre_tax_profit = Column(BigInteger)
 
 
 class CountyDataORM(Base):
@@ -90,8 +115,79 @@ class CountyDataORM(Base):
     id = Column(Integer, primary_key=True, index=True)
     county = Column(String, unique=True)
 
-    total_business_value = Column(Integer)
-    total_liquidation_value = Column(Integer)
-    total_creditor_return = Column(Integer)
-    total_working_capital_needs = Column(Integer)
-    total_pre_tax_profit = Column(Integer)
\ No newline at end of file
+    total_business_value = Column(BigInteger)
+    total_liquidation_value = Column(BigInteger)
+    total_creditor_return = Column(BigInteger)
+    total_working_capital_needs = Column(BigInteger)
+    total_pre_tax_profit = Column(BigInteger)
+
+
+# Справочник федеральных округов регионов; регионы, которых в нем нет, относятся к округу "Другой"
+class RegionCountyORM(Base):
+    __tablename__ = 'region_county'
+    __table_args__ = {'schema': 'fastapi_schema'}
+
+    id = Column(Integer, primary_key=True, index=True)
+    region = Column(String, unique=True, nullable=False)
+    county = Column(String, nullable=False)
+
+
+# Журнал завершенных загрузок: по хешу содержимого повторно присланный файл не загружается заново
+class UploadORM(Base):
+    __tablename__ = 'uploads'
+    __table_args__ = {'schema': 'fastapi_schema'}
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), index=True)
+    filename = Column(String)
+    mode = Column(String)
+    key = Column(String)
+    rows = Column(Integer)
+    result = Column(JSON)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+# Версия рабочих данных, общая для всех воркеров и реплик: увеличивается при каждом изменении
+# company_data и агрегатов, по ней воркеры проверяют актуальность закэшированных ответов
+class DataVersionORM(Base):
+    __tablename__ = 'data_version'
+    __table_args__ = {'schema': 'fastapi_schema'}
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Строки загрузок, не прошедшие проверку и отложенные при загрузке с карантином
+class QuarantinedRowORM(Base):
+    __tablename__ = 'quarantined_rows'
+    __table_args__ = {'schema': 'fastapi_schema'}
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), index=True)
+    filename = Column(String)
+    row_number = Column(Integer)
+    errors = Column(JSON)
+    data = Column(JSON)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+# Сессии возобновляемой загрузки: состояние хранится в БД, а принятые строки - в промежуточной
+# копии company_data, поэтому загрузку можно продолжить после перезапуска воркера
+class UploadSessionORM(Base):
+    __tablename__ = 'upload_sessions'
+    __table_args__ = {'schema': 'fastapi_schema'}
+
+    id = Column(String(32), primary_key=True)
+    filename = Column(String)
+    status = Column(String, nullable=False)
+    staging_suffix = Column(String, nullable=False)
+    header = Column(Text)
+    # Принятые байты файла; следующая часть должна начинаться с этого смещения
+    received_bytes = Column(BigInteger, nullable=False, default=0)
+    rows_committed = Column(BigInteger, nullable=False, default=0)
+    # Хвост принятых данных после последней целой строки, дописываемый к началу следующей части
+    pending = Column(LargeBinary, nullable=False, default=b"")
+    result = Column(JSON)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
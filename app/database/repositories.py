@@ -1,18 +1,62 @@
+import json
 import logging
-from typing import List, Dict, Any
+import time
+import uuid
+from datetime import timedelta
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional
+
+import pandas as pd
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, text
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.database.aggregates import build_aggregation_sql, build_cleanup_sql, build_delta_sql, company_source, \
+    SOURCE_COLUMNS
+from app.config import CSV_CHUNK_SIZE
+from app.database.bulk import copy_rows
+from app.database.layout import COMPANY_COLUMNS, DEFAULT_COUNTY, CompanyLayout
+from app.database.locks import acquire_load_lock
 from app.database.models import CompanyDataORM, RegionDataORM, CountyDataORM, CommonInfoRegion, CommonInfoCounty, \
-    CommonInfoIndustry
+    CommonInfoIndustry, QuarantinedRowORM, RegionCountyORM, UploadORM, UploadSessionORM
+from app.database.staging import StagingArea
+from app.database.versions import data_version
+from app.database.views import materialized_views_enabled, refresh_views
+from app.utils.cache import county_cache
+from app.utils.metrics import AGGREGATION_SECONDS, INSERT_SECONDS, ROWS_FAILED, ROWS_INGESTED, timed
 
 logger = logging.getLogger(__name__)
 
+# Столбцы, которые можно запросить через список компаний
+COMPANY_FIELDS = ("id",) + COMPANY_COLUMNS
+
+MODE_REPLACE = "replace"
+MODE_APPEND = "append"
+MODE_UPSERT = "upsert"
+LOAD_MODES = (MODE_REPLACE, MODE_APPEND, MODE_UPSERT)
+
+# Столбцы, по которым upsert сопоставляет строки порции с уже загруженными
+KEY_COLUMNS = ("company_name", "region", "industry")
+DEFAULT_KEY = "company_name"
+
 
 class CompanyRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, progress=None):
         self.db = db
+        self.progress = progress
+        self.last_load_stats: Dict[str, Any] = {}
+        self.unchanged_count = 0
+        self.received_count = 0
+
+    def _report_stage(self, stage: str) -> None:
+        """Сообщает наблюдателю о смене стадии загрузки"""
+        if self.progress is not None:
+            self.progress.set_stage(stage)
+
+    def _lock_load(self) -> None:
+        """Берет блокировку изменения рабочих таблиц; пока ее держит другая загрузка, стадия - waiting"""
+        if acquire_load_lock(self.db, on_wait=lambda: self._report_stage("waiting")):
+            self._report_stage("aggregating")
 
     def clear_all_data(self) -> None:
         """Очищает все данные из таблицы CompanyDataORM"""
@@ -25,21 +69,29 @@ class CompanyRepository:
             logger.error(f"Error clearing CompanyDataORM: {str(e)}")
             raise
 
+    def region_counties(self) -> Dict[str, str]:
+        """Возвращает закэшированный справочник регион -> округ для определения округа при загрузке
+
+        Замена справочника увеличивает общую версию данных, поэтому после замены в другом
+        воркере справочник перечитывается, не дожидаясь REGION_COUNTY_CACHE_SECONDS.
+        """
+        version, _ = data_version(self.db)
+        return county_cache.get(lambda: RegionCountyRepository(self.db).mapping(), version)
+
+    @staticmethod
+    def _row_values(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        """Преобразует подготовленный к вставке кортеж в аргументы CompanyDataORM"""
+        values = dict(zip(COMPANY_COLUMNS, row))
+        values["bankruptcy_data"] = json.loads(values["bankruptcy_data"])
+        return values
+
     def create_company(self, company_data: Dict[str, Any]) -> CompanyDataORM:
         """Создает новую запись компании"""
         try:
-            bankruptcy_key = "возбуждено производство по делу о несостоятельности (банкротстве)"
-            main_data = {}
-            bankruptcy_data = {}
-
-            for key, value in company_data.items():
-                if bankruptcy_key in key or list(company_data.keys()).index(key) >= list(company_data.keys()).index(
-                        bankruptcy_key):
-                    bankruptcy_data[key] = value
-                else:
-                    main_data[key] = value
-
-            db_company = CompanyDataORM(**main_data, bankruptcy_data=bankruptcy_data)
+            layout = CompanyLayout(company_data, self.region_counties())
+            row = next(layout.to_rows(pd.DataFrame.from_records([company_data])))
+
+            db_company = CompanyDataORM(**self._row_values(row))
             self.db.add(db_company)
             self.db.commit()
             self.db.refresh(db_company)
@@ -50,224 +102,465 @@ class CompanyRepository:
             logger.error(f"Error creating company: {str(e)}")
             raise
 
-    def bulk_create_companies(self, companies_data: List[Dict[str, Any]]) -> int:
+    def bulk_create_from_batches(self, batches: Iterable[List[Dict[str, Any]]], mode: str = MODE_REPLACE,
+                                 key: str = DEFAULT_KEY) -> int:
+        """Массовое создание компаний из потока порций строк без накопления всего файла в памяти"""
+        frames = (pd.DataFrame.from_records(batch) for batch in batches)
+        return self.bulk_create_from_frames(frames, mode, key)
+
+    def bulk_create_companies(self, companies_data: Iterable[Dict[str, Any]], mode: str = MODE_REPLACE,
+                              key: str = DEFAULT_KEY) -> int:
         """Массовое создание компаний с автоматической агрегацией"""
+        records = iter(companies_data)
+        batches = iter(lambda: list(islice(records, CSV_CHUNK_SIZE)), [])
+        return self.bulk_create_from_batches(batches, mode, key)
+
+    def bulk_create_from_frames(self, frames: Iterable[pd.DataFrame], mode: str = MODE_REPLACE,
+                                key: str = DEFAULT_KEY) -> int:
+        """Массовое создание компаний из потока порций DataFrame
+
+        replace - заменяет все данные, append - дописывает строки, upsert - заменяет строки
+        с совпадающим значением key. В режимах append/upsert на PostgreSQL агрегаты
+        корректируются на дельту порции без полного пересчета.
+        """
+        # Справочник читается до начала COPY: во время COPY соединение занято потоком строк
+        return self.bulk_create_from_rows(self._iter_rows(frames, self.region_counties()), mode, key)
+
+    def bulk_create_from_rows(self, rows: Iterable[Tuple[Any, ...]], mode: str = MODE_REPLACE,
+                              key: str = DEFAULT_KEY) -> int:
+        """Массовое создание компаний из кортежей значений в порядке COMPANY_COLUMNS"""
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode: {mode}")
+        if key not in KEY_COLUMNS:
+            raise ValueError(f"Unsupported upsert key: {key}")
+
+        staging = None
+        loaded = False
+        self.unchanged_count = 0
+        self.received_count = 0
+        rows = self._count_received(rows)
         try:
-            self.clear_all_data()
-            created_count = 0
-
-            for company_data in companies_data:
-                self.create_company(company_data)
-                created_count += 1
+            started_at = time.perf_counter()
+
+            if self._supports_copy() and mode == MODE_REPLACE:
+                method = "copy"
+                staging = StagingArea(self.db)
+                created_count = self._copy_to_staging(staging, rows)
+            elif self._supports_copy():
+                method = "copy"
+                created_count = self._merge_companies(rows, mode, key)
+            else:
+                method = "orm"
+                created_count = self._create_companies_orm(rows, mode, key)
+
+            elapsed = time.perf_counter() - started_at
+            INSERT_SECONDS.labels(method=method, mode=mode).observe(elapsed)
+            self.last_load_stats = {
+                "method": method,
+                "mode": mode,
+                "rows": created_count,
+                "unchanged_rows": self.unchanged_count,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(created_count / elapsed, 1) if elapsed > 0 else None,
+            }
+            logger.info(
+                f"Inserted {created_count} companies via {method} ({mode}) in {elapsed:.2f}s "
+                f"({self.last_load_stats['rows_per_sec']} rows/sec)"
+            )
 
-            self._update_aggregated_data()
-            self._update_common_info()  # Добавляем вызов обновления общей информации
+            if staging is not None:
+                self._report_stage("aggregating")
+                self._publish_staging(staging)
+                staging = None
+            elif method == "orm":
+                self._report_stage("aggregating")
+                self._update_aggregates()
 
+            ROWS_INGESTED.labels(mode=mode).inc(created_count)
+            loaded = True
             logger.info(f"Successfully created {created_count} companies")
             return created_count
         except SQLAlchemyError as e:
             self.db.rollback()
             logger.error(f"Error in bulk company creation: {str(e)}")
             raise
+        finally:
+            if not loaded:
+                ROWS_FAILED.labels(mode=mode).inc(self.received_count)
+            if staging is not None:
+                self._discard_staging(staging)
+
+    def _count_received(self, rows: Iterable[Tuple[Any, ...]]) -> Iterator[Tuple[Any, ...]]:
+        """Считает строки, переданные на запись, чтобы учесть их в метрике при ошибке загрузки"""
+        for row in rows:
+            self.received_count += 1
+            yield row
+
+    @staticmethod
+    def _iter_rows(frames: Iterable[pd.DataFrame], counties: Dict[str, str]) -> Iterator[Tuple[Any, ...]]:
+        """Разбивает столбцы по заголовку первой порции и отдает готовые к вставке кортежи"""
+        layout = None
+        for frame in frames:
+            if layout is None:
+                layout = CompanyLayout(frame.columns, counties)
+            yield from layout.to_rows(frame)
+
+    def _create_companies_orm(self, rows: Iterable[Tuple[Any, ...]], mode: str, key: str) -> int:
+        """Построчная загрузка через ORM для СУБД без поддержки COPY"""
+        if mode == MODE_REPLACE:
+            self.clear_all_data()
+
+        created_count = 0
+        for row in rows:
+            values = self._row_values(row)
+            if mode == MODE_UPSERT:
+                key_column = getattr(CompanyDataORM, key)
+                self.db.query(CompanyDataORM).filter(key_column == values[key]).delete()
+            self.db.add(CompanyDataORM(**values))
+            self.db.commit()
+            created_count += 1
 
-    def _update_common_info(self):
-        """Обновляет общую информацию по регионам, округам и отраслям"""
+        return created_count
+
+    def _supports_copy(self) -> bool:
+        """Проверяет, можно ли загружать данные через COPY (PostgreSQL + psycopg2)"""
+        dialect = self.db.get_bind().dialect
+        return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+    def _copy_to_staging(self, staging: StagingArea, rows: Iterable[Tuple[Any, ...]]) -> int:
+        """Загружает компании через COPY FROM STDIN в промежуточную копию company_data"""
+        staging.create()
+        self.db.commit()
+
+        created_count = self.copy_to_staging_table(staging, rows)
+
+        self.db.commit()
+        return created_count
+
+    def copy_to_staging_table(self, staging: StagingArea, rows: Iterable[Tuple[Any, ...]]) -> int:
+        """Дописывает строки в промежуточную копию company_data через COPY, не фиксируя транзакцию"""
+        return copy_rows(
+            self.db.connection().connection,
+            staging.table(CompanyDataORM.__tablename__),
+            COMPANY_COLUMNS,
+            rows,
+        )
+
+    def publish_staged_load(self, staging: StagingArea, created_count: int) -> None:
+        """Агрегирует строки, собранные в промежуточной копии по частям, и подменяет ими рабочие таблицы
+
+        Агрегация и подмена выполняются в текущей транзакции, которую фиксирует вызывающий,
+        поэтому после сбоя публикацию можно повторить с теми же копиями.
+        """
         try:
-            # Очищаем старые данные
-            self.db.query(CommonInfoRegion).delete()
-            self.db.query(CommonInfoCounty).delete()
-            self.db.query(CommonInfoIndustry).delete()
+            self._report_stage("aggregating")
+            started_at = time.perf_counter()
+            self._publish_staging(staging, commit=False)
+            elapsed = time.perf_counter() - started_at
+
+            ROWS_INGESTED.labels(mode=MODE_REPLACE).inc(created_count)
+            self.last_load_stats = {
+                "method": "copy",
+                "mode": MODE_REPLACE,
+                "rows": created_count,
+                "unchanged_rows": 0,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(created_count / elapsed, 1) if elapsed > 0 else None,
+            }
+            logger.info(f"Published {created_count} staged companies in {elapsed:.2f}s")
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Error publishing staging tables {staging.suffix}: {str(e)}")
+            raise
 
-            # Обновляем данные по регионам
-            self._update_common_info_region()
+    def _publish_staging(self, staging: StagingArea, commit: bool = True) -> None:
+        """Строит агрегаты по промежуточным копиям и подменяет ими рабочие таблицы
+
+        commit=False оставляет агрегацию и подмену в транзакции вызывающего.
+        """
+        source = company_source(staging.table(CompanyDataORM.__tablename__))
+        with timed(AGGREGATION_SECONDS, kind="staging"):
+            if materialized_views_enabled():
+                staging.create_views()
+            else:
+                groups = self.db.execute(text(build_aggregation_sql(source, staging.aggregate_targets))).scalar()
+                logger.info(f"Aggregated staging data ({groups} groups)")
+            if commit:
+                self.db.commit()
+
+        self._lock_load()
+        staging.swap()
+        if commit:
+            self.db.commit()
 
-            # Обновляем данные по округам
-            self._update_common_info_county()
+    def _discard_staging(self, staging: StagingArea) -> None:
+        """Удаляет промежуточные копии после неудачной загрузки"""
+        try:
+            self.db.rollback()
+            staging.drop()
+            self.db.commit()
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Error dropping staging tables {staging.suffix}: {str(e)}")
+
+    def _merge_companies(self, rows: Iterable[Tuple[Any, ...]], mode: str, key: str) -> int:
+        """Дописывает или заменяет строки по ключу и корректирует агрегаты на дельту в одной транзакции"""
+        columns = ", ".join(COMPANY_COLUMNS)
+        source_columns = ", ".join(SOURCE_COLUMNS)
+        self.db.execute(text("DROP TABLE IF EXISTS company_batch, company_removed"))
+        self.db.execute(text(f"""
+            CREATE TEMP TABLE company_batch ON COMMIT DROP AS
+            SELECT {columns} FROM fastapi_schema.company_data WITH NO DATA
+        """))
+        self.db.execute(text(f"""
+            CREATE TEMP TABLE company_removed ON COMMIT DROP AS
+            SELECT {source_columns} FROM fastapi_schema.company_data WITH NO DATA
+        """))
+
+        created_count = copy_rows(self.db.connection().connection, "company_batch", COMPANY_COLUMNS, rows)
+
+        # Строки порции приняты во временную таблицу; дальше меняются рабочие таблицы
+        self._lock_load()
+        if mode == MODE_UPSERT:
+            # Ключи, набор строк которых совпадает с уже загруженным, не удаляются и не вставляются заново
+            self.unchanged_count = self.db.execute(text(f"""
+                WITH unchanged AS (
+                    SELECT batch.{key}
+                    FROM (
+                        SELECT {key}, array_agg(row_hash ORDER BY row_hash) AS hashes
+                        FROM company_batch
+                        GROUP BY {key}
+                    ) AS batch
+                    JOIN (
+                        SELECT {key}, array_agg(row_hash ORDER BY row_hash) AS hashes
+                        FROM fastapi_schema.company_data
+                        WHERE {key} IN (SELECT {key} FROM company_batch)
+                        GROUP BY {key}
+                    ) AS company ON company.{key} = batch.{key} AND company.hashes = batch.hashes
+                )
+                DELETE FROM company_batch WHERE {key} IN (SELECT {key} FROM unchanged)
+            """)).rowcount
+            logger.info(f"Skipped {self.unchanged_count} unchanged companies")
+
+            returning = ", ".join(f"company.{column}" for column in SOURCE_COLUMNS)
+            self.db.execute(text(f"""
+                WITH removed AS (
+                    DELETE FROM fastapi_schema.company_data AS company
+                    USING (SELECT DISTINCT {key} FROM company_batch) AS batch
+                    WHERE company.{key} = batch.{key}
+                    RETURNING {returning}
+                )
+                INSERT INTO company_removed SELECT * FROM removed
+            """))
+
+        self.db.execute(text(f"""
+            INSERT INTO fastapi_schema.company_data ({columns})
+            SELECT {columns} FROM company_batch
+        """))
+
+        self._report_stage("aggregating")
+        if materialized_views_enabled():
+            self.db.commit()
+            refresh_views(self.db)
+            logger.info(f"Aggregate views refreshed after {created_count} companies")
+            return created_count
 
-            # Обновляем данные по отраслям
-            self._update_common_info_industry()
+        delta_source = f"{company_source('company_batch', 1)} UNION ALL {company_source('company_removed', -1)}"
+        with timed(AGGREGATION_SECONDS, kind="delta"):
+            self.db.execute(text(build_delta_sql(delta_source)))
+            self.db.execute(text(build_cleanup_sql()))
+            self.db.commit()
+        logger.info(f"Aggregates adjusted by delta of {created_count} companies")
+        return created_count
+
+    def refresh_aggregates(self) -> None:
+        """Пересчитывает агрегаты по всем загруженным компаниям и фиксирует транзакцию"""
+        if materialized_views_enabled():
+            refresh_views(self.db)
+        else:
+            self._update_aggregates()
+
+    def _update_aggregates(self) -> None:
+        """Пересчитывает агрегаты по регионам, округам и отраслям за один проход по company_data"""
+        try:
+            with timed(AGGREGATION_SECONDS, kind="full"):
+                self._lock_load()
+                for model in (RegionDataORM, CountyDataORM, CommonInfoRegion, CommonInfoCounty, CommonInfoIndustry):
+                    self.db.query(model).delete()
+
+                groups = self.db.execute(text(build_aggregation_sql())).scalar()
+                self.db.commit()
+            logger.info(f"Aggregated data updated successfully ({groups} groups)")
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Error updating aggregated data: {str(e)}")
+            raise
+
+    def _filter_companies(self, query, region: Optional[str], industry: Optional[str], is_bankrupt: Optional[bool]):
+        if region is not None:
+            query = query.filter(CompanyDataORM.region == region)
+        if industry is not None:
+            query = query.filter(CompanyDataORM.industry == industry)
+        if is_bankrupt is not None:
+            query = query.filter(CompanyDataORM.is_bankrupt == is_bankrupt)
+        return query
+
+    def list_companies(self, after_id: int = 0, limit: int = 100, fields: Iterable[str] = COMPANY_FIELDS,
+                       region: Optional[str] = None, industry: Optional[str] = None,
+                       is_bankrupt: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Возвращает страницу компаний с id больше after_id (keyset-пагинация)"""
+        columns = [getattr(CompanyDataORM, field) for field in fields]
+        query = self.db.query(*columns).filter(CompanyDataORM.id > after_id)
+        query = self._filter_companies(query, region, industry, is_bankrupt)
+
+        rows = query.order_by(CompanyDataORM.id).limit(limit).all()
+        return [dict(row._mapping) for row in rows]
+
+    def iter_companies(self, batch_size: int = 5000, region: Optional[str] = None, industry: Optional[str] = None,
+                       is_bankrupt: Optional[bool] = None) -> Iterator[Tuple[Any, ...]]:
+        """Потоково читает компании через серверный курсор, не загружая таблицу в память"""
+        query = self.db.query(
+            CompanyDataORM.company_name,
+            CompanyDataORM.region,
+            CompanyDataORM.industry,
+            CompanyDataORM.bankruptcy_data,
+        )
+        query = self._filter_companies(query, region, industry, is_bankrupt)
+        return iter(query.order_by(CompanyDataORM.id).yield_per(batch_size))
+
+
+class UploadRepository:
+    def __init__(self, db: Session):
+        self.db = db
 
+    def find_duplicate(self, content_hash: str, mode: str, key: str) -> Optional[UploadORM]:
+        """Возвращает последнюю загрузку, если она была тем же файлом в том же режиме
+
+        Сравнивается только последняя запись журнала: если после файла загружали
+        что-то другое, его повторная загрузка уже меняет данные.
+        """
+        latest = self.db.query(UploadORM).order_by(UploadORM.id.desc()).first()
+        if latest is not None and (latest.content_hash, latest.mode, latest.key) == (content_hash, mode, key):
+            return latest
+        return None
+
+    def record(self, content_hash: Optional[str], filename: Optional[str], mode: str, key: str, rows: int,
+               result: Dict[str, Any]) -> UploadORM:
+        """Записывает завершенную загрузку в журнал"""
+        try:
+            upload = UploadORM(content_hash=content_hash, filename=filename, mode=mode, key=key,
+                               rows=rows, result=result)
+            self.db.add(upload)
             self.db.commit()
-            logger.info("Common info tables updated successfully")
+            logger.debug(f"Recorded upload {upload.id} with hash {content_hash}")
+            return upload
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error updating common info: {str(e)}")
+            logger.error(f"Error recording upload: {str(e)}")
             raise
 
-    def _update_common_info_region(self):
-        """Обновляет CommonInfoRegion"""
-        region_stats = self.db.execute(text("""
-            SELECT 
-                region,
-                COUNT(*) as total_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'pre_tax_profit')::INTEGER > 0 THEN 1 ELSE 0 END) as profitable_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'creditor_return')::INTEGER = 0 THEN 1 ELSE 0 END) as debt_free_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'solvency_rank')::INTEGER > 0 THEN 1 ELSE 0 END) as solvent_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'roa_coefficient')::FLOAT != 0 THEN 1 ELSE 0 END) as roa_companies
-            FROM fastapi_schema.company_data
-            GROUP BY region
-        """)).fetchall()
-
-        for stat in region_stats:
-            common_info = CommonInfoRegion(
-                region=stat.region,
-                total_companies=stat.total_companies,
-                profitable_companies=stat.profitable_companies,
-                debt_free_companies=stat.debt_free_companies,
-                solvent_companies=stat.solvent_companies,
-                roa_companies=stat.roa_companies
-            )
-            self.db.add(common_info)
-
-    def _update_common_info_county(self):
-        """Обновляет CommonInfoCounty"""
-        county_stats = self.db.execute(text("""
-            SELECT 
-                CASE
-                    WHEN region = 'Москва' THEN 'Центральный'
-                    WHEN region = 'СПб' THEN 'Северо-Западный'
-                    WHEN region = 'Новосибирск' THEN 'Сибирский'
-                    ELSE 'Другой'
-                END as county,
-                COUNT(*) as total_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'pre_tax_profit')::INTEGER > 0 THEN 1 ELSE 0 END) as profitable_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'creditor_return')::INTEGER = 0 THEN 1 ELSE 0 END) as debt_free_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'solvency_rank')::INTEGER > 0 THEN 1 ELSE 0 END) as solvent_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'roa_coefficient')::FLOAT != 0 THEN 1 ELSE 0 END) as roa_companies
-            FROM fastapi_schema.company_data
-            GROUP BY county
-        """)).fetchall()
-
-        for stat in county_stats:
-            common_info = CommonInfoCounty(
-                county=stat.county,
-                total_companies=stat.total_companies,
-                profitable_companies=stat.profitable_companies,
-                debt_free_companies=stat.debt_free_companies,
-                solvent_companies=stat.solvent_companies,
-                roa_companies=stat.roa_companies
-            )
-            self.db.add(common_info)
-
-    def _update_common_info_industry(self):
-        """Обновляет CommonInfoIndustry"""
-        industry_stats = self.db.execute(text("""
-            SELECT 
-                industry,
-                COUNT(*) as total_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'pre_tax_profit')::INTEGER > 0 THEN 1 ELSE 0 END) as profitable_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'creditor_return')::INTEGER = 0 THEN 1 ELSE 0 END) as debt_free_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'solvency_rank')::INTEGER > 0 THEN 1 ELSE 0 END) as solvent_companies,
-                SUM(CASE WHEN (bankruptcy_data->>'roa_coefficient')::FLOAT != 0 THEN 1 ELSE 0 END) as roa_companies
-            FROM fastapi_schema.company_data
-            GROUP BY industry
-        """)).fetchall()
-
-        for stat in industry_stats:
-            common_info = CommonInfoIndustry(
-                industry=stat.industry,
-                total_companies=stat.total_companies,
-                profitable_companies=stat.profitable_companies,
-                debt_free_companies=stat.debt_free_companies,
-                solvent_companies=stat.solvent_companies,
-                roa_companies=stat.roa_companies
-            )
-            self.db.add(common_info)
 
+class QuarantineRepository:
+    def __init__(self, db: Session):
+        self.db = db
 
-    def _update_aggregated_data(self):
-        """Обновляет агрегированные данные по регионам и округам"""
+    def add(self, content_hash: str, filename: Optional[str], rows: List[Dict[str, Any]]) -> int:
+        """Сохраняет отложенные строки загрузки: номер строки в файле, ошибки и исходные значения"""
         try:
-            self._update_region_aggregates()
-            self._update_county_aggregates()
-            logger.info("Aggregated data updated successfully")
+            self.db.bulk_insert_mappings(QuarantinedRowORM, [
+                {"content_hash": content_hash, "filename": filename, "row_number": row["row_number"],
+                 "errors": row["errors"], "data": json.loads(row["data"])}
+                for row in rows
+            ])
+            self.db.commit()
+            logger.info(f"Quarantined {len(rows)} rows of upload {content_hash}")
+            return len(rows)
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error updating aggregated data: {str(e)}")
+            logger.error(f"Error saving quarantined rows: {str(e)}")
             raise
 
-    def _update_region_aggregates(self):
-        """Обновляет агрегированные данные по регионам"""
-        self.db.query(RegionDataORM).delete()
-
-        region_results = self.db.execute(text("""
-            SELECT 
-                region,
-                SUM(COALESCE((bankruptcy_data->>'current_business_value')::INTEGER, 0)) as total_business_value,
-                SUM(COALESCE((bankruptcy_data->>'liquidation_value')::INTEGER, 0)) as total_liquidation_value,
-                SUM(COALESCE((bankruptcy_data->>'creditor_return')::INTEGER, 0)) as total_creditor_return,
-                SUM(COALESCE((bankruptcy_data->>'working_capital_needs')::INTEGER, 0)) as total_working_capital_needs,
-                SUM(COALESCE((bankruptcy_data->>'pre_tax_profit')::INTEGER, 0)) as total_pre_tax_profit
-            FROM fastapi_schema.company_data
-            GROUP BY region
-            ORDER BY 
-                CASE region 
-                    WHEN 'Москва' THEN 1 
-                    WHEN 'СПб' THEN 2 
-                    WHEN 'Новосибирск' THEN 3 
-                    ELSE 4 
-                END
-        """)).fetchall()
-
-        for row in region_results:
-            region_data = RegionDataORM(
-                region=row.region,
-                total_business_value=row.total_business_value,
-                total_liquidation_value=row.total_liquidation_value,
-                total_creditor_return=row.total_creditor_return,
-                total_working_capital_needs=row.total_working_capital_needs,
-                total_pre_tax_profit=row.total_pre_tax_profit
-            )
-            self.db.add(region_data)
 
-        self.db.commit()
+class RegionCountyRepository:
+    def __init__(self, db: Session):
+        self.db = db
 
-    def _update_county_aggregates(self):
-        """Обновляет агрегированные данные по округам"""
-        self.db.query(CountyDataORM).delete()
-
-        county_results = self.db.execute(text("""
-            SELECT 
-                county,
-                SUM(total_business_value) as total_business_value,
-                SUM(total_liquidation_value) as total_liquidation_value,
-                SUM(total_creditor_return) as total_creditor_return,
-                SUM(total_working_capital_needs) as total_working_capital_needs,
-                SUM(total_pre_tax_profit) as total_pre_tax_profit
-            FROM (
-                SELECT 
-                    CASE
-                        WHEN region = 'Москва' THEN 'Центральный'
-                        WHEN region = 'СПб' THEN 'Северо-Западный'
-                        WHEN region = 'Новосибирск' THEN 'Сибирский'
-                        ELSE 'Другой'
-                    END as county,
-                    COALESCE((bankruptcy_data->>'current_business_value')::INTEGER, 0) as total_business_value,
-                    COALESCE((bankruptcy_data->>'liquidation_value')::INTEGER, 0) as total_liquidation_value,
-                    COALESCE((bankruptcy_data->>'creditor_return')::INTEGER, 0) as total_creditor_return,
-                    COALESCE((bankruptcy_data->>'working_capital_needs')::INTEGER, 0) as total_working_capital_needs,
-                    COALESCE((bankruptcy_data->>'pre_tax_profit')::INTEGER, 0) as total_pre_tax_profit
-                FROM fastapi_schema.company_data
-            ) as subquery
-            GROUP BY county
-            ORDER BY 
-                CASE county 
-                    WHEN 'Центральный' THEN 1
-                    WHEN 'Северо-Западный' THEN 2 
-                    WHEN 'Сибирский' THEN 3
-                    ELSE 4
-                END
-        """)).fetchall()
-
-        for row in county_results:
-            county_data = CountyDataORM(
-                county=row.county,
-                total_business_value=row.total_business_value,
-                total_liquidation_value=row.total_liquidation_value,
-                total_creditor_return=row.total_creditor_return,
-                total_working_capital_needs=row.total_working_capital_needs,
-                total_pre_tax_profit=row.total_pre_tax_profit
-            )
-            self.db.add(county_data)
+    def mapping(self) -> Dict[str, str]:
+        """Возвращает справочник в виде словаря регион -> округ"""
+        return dict(self.db.query(RegionCountyORM.region, RegionCountyORM.county).all())
+
+    def replace(self, counties: Dict[str, str]) -> int:
+        """Заменяет справочник и переназначает округа загруженных компаний
+
+        Если округ изменился хотя бы у одной компании, агрегаты пересчитываются в той же
+        транзакции. Возвращает количество компаний, у которых изменился округ.
+        """
+        try:
+            acquire_load_lock(self.db)
+            self.db.query(RegionCountyORM).delete()
+            self.db.add_all([RegionCountyORM(region=region, county=county) for region, county in counties.items()])
+            self.db.flush()
+
+            updated_count = self.db.execute(text("""
+                UPDATE fastapi_schema.company_data AS company
+                SET county = resolved.county
+                FROM (
+                    SELECT company.id, COALESCE(reference.county, :default_county) AS county
+                    FROM fastapi_schema.company_data AS company
+                    LEFT JOIN fastapi_schema.region_county AS reference ON reference.region = company.region
+                ) AS resolved
+                WHERE company.id = resolved.id AND company.county IS DISTINCT FROM resolved.county
+            """), {"default_county": DEFAULT_COUNTY}).rowcount
+
+            if updated_count:
+                CompanyRepository(self.db).refresh_aggregates()
+            else:
+                self.db.commit()
+            logger.info(f"Region county mapping replaced with {len(counties)} regions, "
+                        f"{updated_count} companies reassigned")
+            return updated_count
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Error replacing region county mapping: {str(e)}")
+            raise
+
+
+class UploadSessionRepository:
+    def __init__(self, db: Session):
+        self.db = db
 
-        self.db.commit()
\ No newline at end of file
+    def create(self, filename: Optional[str], status: str) -> UploadSessionORM:
+        """Создает сессию возобновляемой загрузки; транзакция фиксируется вызывающим"""
+        session_id = uuid.uuid4().hex
+        upload_session = UploadSessionORM(id=session_id, filename=filename, status=status,
+                                          staging_suffix=session_id[:8], received_bytes=0, rows_committed=0,
+                                          pending=b"")
+        self.db.add(upload_session)
+        self.db.flush()
+        return upload_session
+
+    def expired(self, status: str, max_age: float) -> List[UploadSessionORM]:
+        """Возвращает сессии в статусе status, не менявшиеся дольше max_age секунд
+
+        Строки сессий блокируются до конца транзакции; сессии, занятые сейчас другим
+        запросом, пропускаются.
+        """
+        return (
+            self.db.query(UploadSessionORM)
+            .filter(UploadSessionORM.status == status,
+                    UploadSessionORM.updated_at < func.now() - timedelta(seconds=max_age))
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def staging_suffixes(self, status: str) -> List[str]:
+        """Суффиксы промежуточных копий сессий в статусе status"""
+        query = self.db.query(UploadSessionORM.staging_suffix).filter(UploadSessionORM.status == status)
+        return [suffix for suffix, in query]
+
+    def get(self, session_id: str, lock: bool = False) -> Optional[UploadSessionORM]:
+        """Возвращает сессию; lock блокирует ее строку до конца транзакции от параллельных запросов"""
+        query = self.db.query(UploadSessionORM).filter(UploadSessionORM.id == session_id)
+        if lock:
+            query = query.with_for_update()
+        return query.one_or_none()
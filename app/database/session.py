@@ -1,21 +1,121 @@
+import logging
+import threading
+from typing import Optional
+
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.database.models import Base
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import DATABASE_READ_URL, DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, \
+    DB_POOL_SIZE, DB_STATEMENT_TIMEOUT_MS
+from app.utils.consistency import reads_pinned
+from app.utils.metrics import track_pool
+
+logger = logging.getLogger(__name__)
+
+_engine: Optional[Engine] = None
+_read_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+class LazySessionmaker(sessionmaker):
+    """Фабрика сессий, которая создает движок при открытии первой сессии"""
+
+    def __call__(self, **local_kw) -> Session:
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            init_engine()
+        return super().__call__(**local_kw)
+
+
+# Сессии основной БД: загрузки и все, что изменяет данные
+SessionLocal = LazySessionmaker(autocommit=False, autoflush=False)
+# Сессии чтения: реплика из DATABASE_READ_URL или основная БД, если реплика не задана
+ReadSessionLocal = LazySessionmaker(autocommit=False, autoflush=False)
+
+
+def _connect_options(read_only: bool = False) -> str:
+    options = "-csearch_path=fastapi_schema"
+    if DB_STATEMENT_TIMEOUT_MS:
+        options += f" -cstatement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    if read_only:
+        options += " -cdefault_transaction_read_only=on"
+    return options
+
+
+def _create_engine(url: str, read_only: bool = False) -> Engine:
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"options": _connect_options(read_only)},
+    )
+
 
-SQLALCHEMY_DATABASE_URL = "postgresql://postgres:postgres@db:5432/upload_data"
+def init_engine(url: str = DATABASE_URL, read_url: str = DATABASE_READ_URL) -> Engine:
+    """Создает движки и пулы соединений, если они еще не созданы, и возвращает движок основной БД
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"options": "-csearch_path=fastapi_schema"}
-)
+    Если read_url задан, чтения идут через отдельный движок с собственным пулом, даже когда
+    он указывает на тот же сервер. Схему БД создают и обновляют миграции Alembic, здесь DDL
+    не выполняется.
+    """
+    global _engine, _read_engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _create_engine(url)
+            SessionLocal.configure(bind=_engine)
+            track_pool(_engine)
+            logger.info(f"Created database engine with pool size {DB_POOL_SIZE} (+{DB_MAX_OVERFLOW} overflow)")
 
-Base.metadata.create_all(bind=engine)
+            _read_engine = _create_engine(read_url, read_only=True) if read_url else _engine
+            ReadSessionLocal.configure(bind=_read_engine)
+            if read_url:
+                logger.info("Created read-only database engine for replica reads")
+        return _engine
+
+
+def get_engine() -> Engine:
+    return init_engine()
+
+
+def get_read_engine() -> Engine:
+    init_engine()
+    return _read_engine
+
+
+def dispose_engine() -> None:
+    """Закрывает соединения пулов, например при остановке приложения"""
+    global _engine, _read_engine
+    with _engine_lock:
+        if _read_engine is not None and _read_engine is not _engine:
+            _read_engine.dispose()
+        _read_engine = None
+        ReadSessionLocal.configure(bind=None)
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+            SessionLocal.configure(bind=None)
+            logger.info("Disposed database engine")
+
+
+def read_session(primary: bool = False) -> Session:
+    """Открывает сессию для чтения; primary направляет ее в основную БД, чтобы увидеть свои записи"""
+    return SessionLocal() if primary else ReadSessionLocal()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db(request: Request):
+    db = read_session(reads_pinned(request))
+    try:
+        yield db
+    finally:
+        db.close()
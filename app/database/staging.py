@@ -0,0 +1,170 @@
+import logging
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import SWAP_LOCK_TIMEOUT_MS
+from app.database.aggregates import AGGREGATE_TABLES, SCHEMA
+from app.database.views import AGGREGATE_VIEWS, create_view, drop_views
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, которые при полной перезагрузке собираются в копиях и подменяются целиком
+STAGED_TABLES = ("company_data",) + tuple(AGGREGATE_TABLES)
+
+# Внешние ключи таблиц агрегатов на company_data; LIKE их не копирует, поэтому при подмене они создаются заново
+FOREIGN_KEYS = {
+    "common_info_region": "common_info_region_company_id_fkey",
+    "common_info_county": "common_info_county_company_id_fkey",
+    "common_info_industry": "common_info_industry_company_id_fkey",
+}
+
+
+# Комментарий копии company_data с временем создания копий (Unix time)
+CREATED_PREFIX = "created "
+
+
+class StagingArea:
+    """Набор промежуточных копий company_data и таблиц агрегатов для перезагрузки без простоя
+
+    Данные загружаются и агрегируются в копиях, после чего копии подменяют рабочие
+    таблицы переименованием в одной короткой транзакции. Читатели все это время видят
+    предыдущий полный снимок, а старые таблицы удаляются целиком через DROP.
+    """
+
+    def __init__(self, db: Session, suffix: Optional[str] = None):
+        self.db = db
+        self.suffix = suffix or uuid.uuid4().hex[:8]
+        self.with_views = False
+
+    def name(self, table: str) -> str:
+        return f"{table}_staging_{self.suffix}"
+
+    def table(self, table: str) -> str:
+        return f"{SCHEMA}.{self.name(table)}"
+
+    @property
+    def aggregate_targets(self) -> Dict[str, str]:
+        return {table: self.table(table) for table in AGGREGATE_TABLES}
+
+    def create(self) -> None:
+        """Создает пустые копии таблиц с теми же столбцами, умолчаниями, индексами и ограничениями"""
+        for table in STAGED_TABLES:
+            self.db.execute(text(f"DROP TABLE IF EXISTS {self.table(table)}"))
+            self.db.execute(text(f"CREATE TABLE {self.table(table)} (LIKE {SCHEMA}.{table} INCLUDING ALL)"))
+        # Время создания копий, по которому find_abandoned находит оставшиеся после сбоя загрузки
+        self.db.execute(text(f"COMMENT ON TABLE {self.table('company_data')} IS '{CREATED_PREFIX}{int(time.time())}'"))
+        logger.info(f"Created staging tables with suffix {self.suffix}")
+
+    def create_views(self) -> None:
+        """Строит представления агрегатов над копией company_data; при подмене они заменят рабочие"""
+        for name, view in AGGREGATE_VIEWS.items():
+            create_view(self.db, name, self.name(view), self.table("company_data"))
+        self.with_views = True
+        logger.info(f"Created staging aggregate views with suffix {self.suffix}")
+
+    @classmethod
+    def find_abandoned(cls, db: Session, max_age: float, keep: Iterable[str] = ()) -> List["StagingArea"]:
+        """Возвращает копии старше max_age секунд, кроме копий с суффиксами из keep
+
+        Копии без отметки о времени создания остались от прежних версий приложения и тоже
+        считаются брошенными.
+        """
+        prefix = "company_data_staging_"
+        rows = db.execute(text("""
+            SELECT tablename, obj_description(CAST(format('%I.%I', schemaname, tablename) AS regclass), 'pg_class')
+            FROM pg_tables
+            WHERE schemaname = :schema AND starts_with(tablename, :prefix)
+        """), {"schema": SCHEMA, "prefix": prefix}).fetchall()
+
+        keep = set(keep)
+        abandoned = []
+        for table, comment in rows:
+            suffix = table[len(prefix):]
+            created_at = 0.0
+            if comment and comment.startswith(CREATED_PREFIX):
+                created_at = float(comment[len(CREATED_PREFIX):])
+            if suffix not in keep and time.time() - created_at > max_age:
+                abandoned.append(cls(db, suffix))
+        return abandoned
+
+    def drop(self) -> None:
+        """Удаляет копии, например после неудачной загрузки"""
+        for view in AGGREGATE_VIEWS.values():
+            self.db.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {self.table(view)}"))
+        for table in STAGED_TABLES:
+            self.db.execute(text(f"DROP TABLE IF EXISTS {self.table(table)}"))
+        logger.info(f"Dropped staging tables with suffix {self.suffix}")
+
+    def _indexes(self, table: str) -> List[Tuple[str, Tuple[bool, bool, str]]]:
+        """Возвращает индексы таблицы и их определения без учета имен"""
+        rows = self.db.execute(text("""
+            SELECT
+                index_class.relname AS name,
+                index.indisprimary AS is_primary,
+                index.indisunique AS is_unique,
+                regexp_replace(pg_get_indexdef(index.indexrelid), '^.* USING ', '') AS definition
+            FROM pg_index AS index
+            JOIN pg_class AS index_class ON index_class.oid = index.indexrelid
+            WHERE index.indrelid = CAST(:table AS regclass)
+            ORDER BY index_class.relname
+        """), {"table": table}).fetchall()
+        return [(row.name, (row.is_primary, row.is_unique, row.definition)) for row in rows]
+
+    def _index_renames(self, table: str) -> List[Tuple[str, str]]:
+        """Сопоставляет индексы копии с индексами рабочей таблицы, чтобы вернуть им прежние имена"""
+        live = self._indexes(f"{SCHEMA}.{table}")
+        renames = []
+        for staging_name, definition in self._indexes(self.table(table)):
+            for position, (live_name, live_definition) in enumerate(live):
+                if live_definition == definition:
+                    renames.append((staging_name, live_name))
+                    del live[position]
+                    break
+        return renames
+
+    def swap(self) -> None:
+        """Подменяет рабочие таблицы копиями в текущей транзакции"""
+        self.db.execute(text(f"SET LOCAL lock_timeout = {int(SWAP_LOCK_TIMEOUT_MS)}"))
+
+        renames = {table: self._index_renames(table) for table in STAGED_TABLES}
+        sequences = {
+            table: self.db.execute(
+                text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": f"{SCHEMA}.{table}"}
+            ).scalar()
+            for table in STAGED_TABLES
+        }
+
+        # Представления агрегатов зависят от рабочей company_data и удаляются вместе с ней
+        drop_views(self.db)
+
+        for table in STAGED_TABLES:
+            retired = f"{table}_retired_{self.suffix}"
+            self.db.execute(text(f"ALTER TABLE {SCHEMA}.{table} RENAME TO {retired}"))
+            self.db.execute(text(f"ALTER TABLE {self.table(table)} RENAME TO {table}"))
+            if sequences[table]:
+                self.db.execute(text(f"ALTER SEQUENCE {sequences[table]} OWNED BY {SCHEMA}.{table}.id"))
+
+        # Таблицы агрегатов ссылаются на company_data, поэтому удаляются первыми
+        for table in reversed(STAGED_TABLES):
+            self.db.execute(text(f"DROP TABLE {SCHEMA}.{table}_retired_{self.suffix}"))
+
+        for table in STAGED_TABLES:
+            for staging_name, live_name in renames[table]:
+                self.db.execute(text(f"ALTER INDEX {SCHEMA}.{staging_name} RENAME TO {live_name}"))
+
+        if self.with_views:
+            for view in AGGREGATE_VIEWS.values():
+                self.db.execute(text(f"ALTER MATERIALIZED VIEW {self.table(view)} RENAME TO {view}"))
+                self.db.execute(text(f"ALTER INDEX {SCHEMA}.{self.name(view)}_key_idx RENAME TO {view}_key_idx"))
+
+        for table, constraint in FOREIGN_KEYS.items():
+            self.db.execute(text(f"""
+                ALTER TABLE {SCHEMA}.{table}
+                ADD CONSTRAINT {constraint} FOREIGN KEY (company_id) REFERENCES {SCHEMA}.company_data (id)
+            """))
+
+        logger.info(f"Swapped in staging tables with suffix {self.suffix}")
@@ -0,0 +1,29 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database.aggregates import SCHEMA
+
+DATA_VERSION_ID = 1
+
+
+def bump_data_version(db: Session) -> None:
+    """Увеличивает общую версию данных в текущей транзакции; другие воркеры увидят ее после фиксации"""
+    db.execute(text(f"""
+        INSERT INTO {SCHEMA}.data_version (id, generation, updated_at) VALUES (:id, 1, clock_timestamp())
+        ON CONFLICT (id) DO UPDATE
+        SET generation = data_version.generation + 1, updated_at = clock_timestamp()
+    """), {"id": DATA_VERSION_ID})
+
+
+def data_version(db: Session) -> Tuple[int, Optional[float]]:
+    """Возвращает общую версию данных и время ее изменения (Unix time); без записи о версии - (0, None)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return 0, None
+    row = db.execute(text(f"""
+        SELECT generation, extract(epoch FROM updated_at) FROM {SCHEMA}.data_version WHERE id = :id
+    """), {"id": DATA_VERSION_ID}).first()
+    if row is None:
+        return 0, None
+    return row[0], float(row[1]) if row[1] is not None else None
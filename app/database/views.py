@@ -0,0 +1,97 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import AGGREGATE_BACKEND
+from app.database.aggregates import AGGREGATE_TABLES, SCHEMA, TARGET_LAYOUT, build_view_select, company_source
+from app.database.locks import acquire_load_lock
+from app.database.session import SessionLocal
+from app.utils.metrics import AGGREGATION_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MATVIEW = "matview"
+
+# Материализованные представления, заменяющие таблицы агрегатов при AGGREGATE_BACKEND=matview
+AGGREGATE_VIEWS = {name: f"{name}_mv" for name in AGGREGATE_TABLES}
+
+# Ключ advisory-блокировки, под которой представления создаются и пересоздаются
+VIEWS_LOCK_KEY = "aggregate_views"
+
+
+def materialized_views_enabled() -> bool:
+    return AGGREGATE_BACKEND == BACKEND_MATVIEW
+
+
+def _definition(name: str) -> str:
+    """Метка определения представления: при изменении запроса агрегации представление пересоздается"""
+    select = build_view_select(name, company_source(f"{SCHEMA}.company_data"))
+    return f"definition {hashlib.sha1(select.encode()).hexdigest()}"
+
+
+def create_view(db: Session, name: str, view: str, source_table: str = f"{SCHEMA}.company_data") -> None:
+    """Создает заполненное представление агрегата name над source_table с уникальным индексом по ключу"""
+    key = TARGET_LAYOUT[name][1]
+    select = build_view_select(name, company_source(source_table))
+    db.execute(text(f"CREATE MATERIALIZED VIEW {SCHEMA}.{view} AS {select}"))
+    # Уникальный индекс обязателен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+    db.execute(text(f"CREATE UNIQUE INDEX {view}_key_idx ON {SCHEMA}.{view} ({key})"))
+    db.execute(text(f"COMMENT ON MATERIALIZED VIEW {SCHEMA}.{view} IS '{_definition(name)}'"))
+
+
+def _existing_views(db: Session) -> Dict[str, Optional[str]]:
+    """Возвращает материализованные представления схемы и их метки определения"""
+    rows = db.execute(text("""
+        SELECT matviewname, obj_description(CAST(format('%I.%I', schemaname, matviewname) AS regclass), 'pg_class')
+        FROM pg_matviews
+        WHERE schemaname = :schema
+    """), {"schema": SCHEMA}).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def drop_views(db: Session) -> None:
+    """Удаляет представления агрегатов, например перед удалением таблицы, над которой они построены"""
+    for view in AGGREGATE_VIEWS.values():
+        db.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {SCHEMA}.{view}"))
+
+
+def sync_views(db: Session) -> List[str]:
+    """Создает отсутствующие и пересоздает устаревшие представления, возвращает созданные"""
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": VIEWS_LOCK_KEY})
+    existing = _existing_views(db)
+
+    created = []
+    for name, view in AGGREGATE_VIEWS.items():
+        if view in existing and existing[view] == _definition(name):
+            continue
+        db.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {SCHEMA}.{view}"))
+        create_view(db, name, view)
+        created.append(view)
+
+    if created:
+        logger.info(f"Created aggregate views: {', '.join(created)}")
+    return created
+
+
+def refresh_views(db: Session) -> None:
+    """Обновляет представления агрегатов, не блокируя их чтение, и фиксирует транзакцию"""
+    with timed(AGGREGATION_SECONDS, kind="refresh"):
+        acquire_load_lock(db)
+        created = sync_views(db)
+        for view in AGGREGATE_VIEWS.values():
+            if view not in created:
+                db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {SCHEMA}.{view}"))
+        db.commit()
+
+
+def prepare_views() -> None:
+    """Создает представления агрегатов при запуске приложения, чтобы первые запросы их уже видели"""
+    db = SessionLocal()
+    try:
+        sync_views(db)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,100 @@
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.database.models import RegionDataORM, CountyDataORM, CommonInfoRegion, CommonInfoCounty, \
+    CommonInfoIndustry
+from app.database.aggregates import SCHEMA
+from app.database.session import SessionLocal
+from app.database.versions import data_version
+from app.database.views import AGGREGATE_VIEWS, materialized_views_enabled
+from app.utils.cache import aggregate_cache, CacheEntry
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+AGGREGATE_MODELS = {
+    model.__tablename__: model
+    for model in (RegionDataORM, CountyDataORM, CommonInfoRegion, CommonInfoCounty, CommonInfoIndustry)
+}
+
+HIDDEN_COLUMNS = ("company_id",)
+
+
+def _load_aggregate(db, model) -> List[Dict[str, Any]]:
+    """Читает все строки таблицы агрегатов или заменяющего ее материализованного представления"""
+    columns = [column for column in model.__table__.columns if column.name not in HIDDEN_COLUMNS]
+    if materialized_views_enabled():
+        view = AGGREGATE_VIEWS[model.__tablename__]
+        column_list = ", ".join(column.name for column in columns)
+        rows = db.execute(text(f"SELECT {column_list} FROM {SCHEMA}.{view} ORDER BY id")).fetchall()
+    else:
+        rows = db.query(*columns).order_by(model.id).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def _read_data_version() -> Tuple[int, Optional[float]]:
+    db = SessionLocal()
+    try:
+        return data_version(db)
+    finally:
+        db.close()
+
+
+def _read_aggregate(model) -> List[Dict[str, Any]]:
+    # Ответ кэшируется до следующей загрузки, поэтому читается из основной БД: строки отстающей
+    # реплики, прочитанные сразу после смены версии, остались бы в кэше до следующей загрузки
+    db = SessionLocal()
+    try:
+        return _load_aggregate(db, model)
+    finally:
+        db.close()
+
+
+def _get_aggregate(table: str, model) -> CacheEntry:
+    """Возвращает ответ из кэша, если с момента его загрузки общая версия данных не менялась"""
+    version, last_modified = aggregate_cache.shared_version(_read_data_version)
+    return aggregate_cache.get(table, lambda: _read_aggregate(model), version, last_modified)
+
+
+def _not_modified(request: Request, entry: CacheEntry) -> bool:
+    """Проверяет условные заголовки запроса"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return entry.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*"
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(entry.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+@router.get("/aggregates/{table}")
+async def get_aggregate(table: str, request: Request):
+    """Возвращает содержимое таблицы агрегатов с поддержкой ETag/Last-Modified"""
+    model = AGGREGATE_MODELS.get(table)
+    if model is None:
+        error_msg = f"Unknown aggregate table: {table}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=404, detail=error_msg)
+
+    entry = await run_in_threadpool(_get_aggregate, table, model)
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
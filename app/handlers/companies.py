@@ -0,0 +1,103 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.database.repositories import CompanyRepository, COMPANY_FIELDS
+from app.database.session import get_read_db, read_session
+from app.utils.consistency import reads_pinned
+from app.utils.export import iter_csv_export, iter_ndjson_export, gzip_stream
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv_export, "text/csv; charset=utf-8"),
+    "ndjson": (iter_ndjson_export, "application/x-ndjson"),
+}
+
+
+def _iter_export(export_format: str, primary: bool, **filters):
+    """Выгружает компании из серверного курсора в собственной сессии"""
+    db = read_session(primary)
+    try:
+        rows = CompanyRepository(db).iter_companies(**filters)
+        serializer, _ = EXPORT_FORMATS[export_format]
+        yield from serializer(rows)
+    finally:
+        db.close()
+
+
+@router.get("/companies/export")
+async def export_companies(
+        request: Request,
+        export_format: str = Query("csv", alias="format", regex=f"^({'|'.join(EXPORT_FORMATS)})$"),
+        compress: bool = Query(False, alias="gzip"),
+        region: Optional[str] = None,
+        industry: Optional[str] = None,
+        bankrupt: Optional[bool] = None
+):
+    """Потоково выгружает компании в CSV или NDJSON в раскладке исходного файла"""
+    logger.info(f"Starting companies export in {export_format} format")
+    chunks = _iter_export(export_format, reads_pinned(request), region=region, industry=industry, is_bankrupt=bankrupt)
+
+    _, media_type = EXPORT_FORMATS[export_format]
+    filename = f"companies.{export_format}"
+    if compress:
+        chunks = gzip_stream(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/companies")
+async def list_companies(
+        region: Optional[str] = None,
+        industry: Optional[str] = None,
+        bankrupt: Optional[bool] = None,
+        cursor: int = Query(0, ge=0),
+        limit: int = Query(100, gt=0, le=MAX_PAGE_SIZE),
+        fields: Optional[str] = None,
+        db: Session = Depends(get_read_db)
+):
+    """Возвращает страницу компаний, отфильтрованных по региону, отрасли и признаку банкротства
+
+    cursor - id последней компании предыдущей страницы, fields - список столбцов через запятую.
+    """
+    selected = COMPANY_FIELDS
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in COMPANY_FIELDS]
+        if unknown:
+            error_msg = f"Unknown fields: {', '.join(unknown)}"
+            logger.error(error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+        # id нужен всегда, он служит курсором следующей страницы
+        selected = ["id"] + [field for field in requested if field != "id"]
+
+    items = await run_in_threadpool(
+        CompanyRepository(db).list_companies,
+        after_id=cursor,
+        limit=limit + 1,
+        fields=selected,
+        region=region,
+        industry=industry,
+        is_bankrupt=bankrupt,
+    )
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    return {
+        "items": items,
+        "next_cursor": items[-1]["id"] if has_more else None,
+    }
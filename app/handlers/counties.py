@@ -0,0 +1,90 @@
+import logging
+from typing import Dict
+
+import pandas as pd
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Response, UploadFile
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.database.locks import LoadInProgress
+from app.database.repositories import RegionCountyRepository
+from app.database.session import SessionLocal, get_read_db
+from app.utils.cache import aggregate_cache, county_cache
+from app.utils.consistency import pin_reads
+from app.utils.workers import run_in_upload_pool
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+REFERENCE_COLUMNS = ("region", "county")
+
+
+def _replace_counties(counties: Dict[str, str]) -> int:
+    """Заменяет справочник в собственной сессии и сбрасывает кэши, зависящие от него"""
+    db = SessionLocal()
+    try:
+        updated_count = RegionCountyRepository(db).replace(counties)
+    finally:
+        db.close()
+    county_cache.invalidate()
+    aggregate_cache.invalidate()
+    return updated_count
+
+
+async def _apply_counties(counties: Dict[str, str], response: Response):
+    empty = [region for region, county in counties.items() if not region.strip() or not county.strip()]
+    if empty:
+        error_msg = f"Region and county must not be empty: {', '.join(map(repr, empty))}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    try:
+        updated_count = await run_in_upload_pool(_replace_counties, counties)
+    except LoadInProgress as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=409, detail=str(e))
+    pin_reads(response)
+    return {
+        "message": f"Loaded {len(counties)} regions, reassigned {updated_count} companies",
+        "regions": len(counties),
+        "reassigned_companies": updated_count,
+    }
+
+
+@router.get("/region-county")
+async def get_region_counties(db: Session = Depends(get_read_db)):
+    """Возвращает справочник регион -> федеральный округ"""
+    return await run_in_threadpool(RegionCountyRepository(db).mapping)
+
+
+@router.put("/region-county")
+async def put_region_counties(response: Response, counties: Dict[str, str] = Body(...)):
+    """Заменяет справочник объектом {"регион": "округ"} и переназначает округа загруженных компаний"""
+    logger.info(f"Replacing region county mapping with {len(counties)} regions")
+    return await _apply_counties(counties, response)
+
+
+@router.post("/region-county/upload-csv")
+async def upload_region_counties(response: Response, file: UploadFile = File(...)):
+    """Заменяет справочник CSV файлом со столбцами region и county"""
+    logger.info(f"Replacing region county mapping from file: {file.filename}")
+    try:
+        frame = pd.read_csv(file.file, dtype=str, keep_default_na=False)
+    except (ValueError, UnicodeDecodeError) as e:
+        error_msg = f"Error reading region county file: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    missing = [column for column in REFERENCE_COLUMNS if column not in frame.columns]
+    if missing:
+        error_msg = f"Missing required columns: {', '.join(missing)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    duplicated = sorted(set(frame.loc[frame["region"].duplicated(), "region"]))
+    if duplicated:
+        error_msg = f"Duplicate regions: {', '.join(duplicated)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    return await _apply_counties(dict(zip(frame["region"], frame["county"])), response)
@@ -0,0 +1,23 @@
+import logging
+from fastapi import APIRouter, HTTPException, Response
+
+from app.utils.consistency import pin_reads
+from app.utils.jobs import STAGE_COMPLETED, job_registry
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, response: Response):
+    """Возвращает стадию и прогресс фоновой загрузки"""
+    job = job_registry.get(job_id)
+    if job is None:
+        error_msg = f"Job {job_id} not found"
+        logger.error(error_msg)
+        raise HTTPException(status_code=404, detail=error_msg)
+
+    # Клиент узнает о завершении фоновой загрузки отсюда, поэтому чтения закрепляются здесь
+    if job.stage == STAGE_COMPLETED:
+        pin_reads(response)
+    return job.to_dict()
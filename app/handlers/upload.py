@@ -1,41 +1,278 @@
 import logging
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import List, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, status
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
-from app.database.repositories import CompanyRepository
-from app.database.session import get_db
-from app.utils.csv_processor import process_csv_file
+from app.config import CSV_CHUNK_SIZE, UPLOAD_DIR
+from app.database.locks import LoadInProgress
+from app.database.repositories import DEFAULT_KEY, KEY_COLUMNS, LOAD_MODES, MODE_REPLACE
+from app.utils.columnar import check_columnar_support, detect_columnar_format
+from app.utils.compression import check_compression, detect_compression, is_csv_upload
+from app.utils.consistency import pin_reads
+from app.utils.hashing import HashingReader, combine_hashes
+from app.utils.ingestion import ingest_columnar, ingest_csv, ingest_csv_files, upload_message
+from app.utils.jobs import submit_ingestion_job
+from app.utils.metrics import UPLOAD_SIZE
+from app.utils.validation import ValidationFailed
+from app.utils.workers import run_in_upload_pool
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 @router.post("/upload-csv/")
-async def upload_csv(file: UploadFile = File(...)):
-    """Загружает CSV файл и сохраняет данные в БД"""
+async def upload_csv(
+        file: UploadFile = File(...),
+        chunk_size: int = Query(CSV_CHUNK_SIZE, gt=0),
+        async_mode: bool = Query(False, alias="async"),
+        mode: str = Query(MODE_REPLACE, regex=f"^({'|'.join(LOAD_MODES)})$"),
+        key: str = Query(DEFAULT_KEY, regex=f"^({'|'.join(KEY_COLUMNS)})$"),
+        force: bool = Query(False),
+        quarantine: bool = Query(False)
+):
+    """Загружает CSV файл, в том числе сжатый gzip, zstd или bzip2, и сохраняет данные в БД
+
+    Строки с ошибками отклоняют файл целиком (422 с отчетом), а с quarantine откладываются
+    в quarantined_rows, и загружаются остальные.
+    """
     try:
         logger.info(f"Starting CSV upload process for file: {file.filename}")
 
-        if not file.filename.endswith('.csv'):
-            error_msg = "File must be a CSV"
+        if not is_csv_upload(file.filename, file.content_type):
+            error_msg = "File must be a CSV, optionally compressed as .csv.gz, .csv.zst or .csv.bz2"
             logger.error(error_msg)
             raise HTTPException(status_code=400, detail=error_msg)
 
-        logger.debug("Processing CSV file")
-        companies_data = await process_csv_file(file)
+        compression = detect_compression(file.filename, file.content_type)
+        try:
+            check_compression(compression)
+        except ValueError as e:
+            logger.error(str(e))
+            raise HTTPException(status_code=400, detail=str(e))
+
+        UPLOAD_SIZE.labels(endpoint="upload-csv").observe(_upload_size(file))
 
-        db = next(get_db())
-        repo = CompanyRepository(db)
-        created_count = repo.bulk_create_companies(companies_data)
+        if async_mode:
+            path, content_hash = await run_in_threadpool(_persist_upload, file)
+            job = submit_ingestion_job(path, file.filename, chunk_size, mode, key, content_hash, force, compression,
+                                       quarantine)
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"job_id": job.id, "status_url": f"/api/jobs/{job.id}"}
+            )
 
-        logger.info(f"Successfully uploaded {created_count} records")
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED,
-            content={"message": f"Successfully uploaded {created_count} records"}
+        logger.debug(f"Processing CSV file in {mode} mode in batches of {chunk_size} rows"
+                     f"{f' ({compression})' if compression else ''}")
+        created_count, load_stats = await run_in_upload_pool(
+            ingest_csv, file, chunk_size, mode, key, filename=file.filename, force=force, compression=compression,
+            quarantine=quarantine
         )
+
+        logger.info(upload_message(created_count, load_stats))
+        return _upload_response(created_count, load_stats)
     except HTTPException:
         raise
+    except LoadInProgress as e:
+        raise _busy_error(e)
+    except ValidationFailed as e:
+        raise _validation_error(e)
     except Exception as e:
         error_msg = f"Error processing CSV file: {str(e)}"
         logger.error(error_msg)
-        raise HTTPException(status_code=500, detail=error_msg)
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=error_msg)
+
+
+@router.post("/upload-columnar/")
+async def upload_columnar(
+        file: UploadFile = File(...),
+        chunk_size: int = Query(CSV_CHUNK_SIZE, gt=0),
+        mode: str = Query(MODE_REPLACE, regex=f"^({'|'.join(LOAD_MODES)})$"),
+        key: str = Query(DEFAULT_KEY, regex=f"^({'|'.join(KEY_COLUMNS)})$"),
+        force: bool = Query(False),
+        quarantine: bool = Query(False)
+):
+    """Загружает Parquet или Arrow IPC файл с сохранением типов столбцов"""
+    try:
+        logger.info(f"Starting columnar upload process for file: {file.filename}")
+
+        columnar_format = detect_columnar_format(file.filename)
+        if columnar_format is None:
+            error_msg = "File must be Parquet (.parquet) or Arrow IPC (.arrow, .arrows, .feather)"
+            logger.error(error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+
+        try:
+            check_columnar_support()
+        except ValueError as e:
+            logger.error(str(e))
+            raise HTTPException(status_code=400, detail=str(e))
+
+        UPLOAD_SIZE.labels(endpoint="upload-columnar").observe(_upload_size(file))
+
+        logger.debug(f"Processing {columnar_format} file in {mode} mode in batches of {chunk_size} rows")
+        created_count, load_stats = await run_in_upload_pool(
+            ingest_columnar, file, columnar_format, chunk_size, mode, key, filename=file.filename, force=force,
+            quarantine=quarantine
+        )
+
+        logger.info(upload_message(created_count, load_stats))
+        return _upload_response(created_count, load_stats)
+    except HTTPException:
+        raise
+    except LoadInProgress as e:
+        raise _busy_error(e)
+    except ValidationFailed as e:
+        raise _validation_error(e)
+    except Exception as e:
+        error_msg = f"Error processing columnar file: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=error_msg)
+
+
+@router.post("/upload-csv/batch")
+async def upload_csv_batch(
+        files: List[UploadFile] = File(...),
+        chunk_size: int = Query(CSV_CHUNK_SIZE, gt=0),
+        mode: str = Query(MODE_REPLACE, regex=f"^({'|'.join(LOAD_MODES)})$"),
+        key: str = Query(DEFAULT_KEY, regex=f"^({'|'.join(KEY_COLUMNS)})$"),
+        force: bool = Query(False),
+        quarantine: bool = Query(False)
+):
+    """Загружает несколько CSV файлов или zip-архив с ними одной загрузкой"""
+    paths: List[str] = []
+    hashes: List[str] = []
+    names: List[str] = []
+    try:
+        logger.info(f"Starting batch upload of {len(files)} files")
+
+        for file in files:
+            if not file.filename.endswith(('.csv', '.zip')):
+                error_msg = f"File must be a CSV or a ZIP archive: {file.filename}"
+                logger.error(error_msg)
+                raise HTTPException(status_code=400, detail=error_msg)
+
+        UPLOAD_SIZE.labels(endpoint="upload-csv-batch").observe(sum(_upload_size(file) for file in files))
+
+        for file in files:
+            if file.filename.endswith('.zip'):
+                persisted = await run_in_threadpool(_extract_csv_members, file)
+            else:
+                persisted = [(*await run_in_threadpool(_persist_upload, file), file.filename)]
+            for path, content_hash, name in persisted:
+                paths.append(path)
+                hashes.append(content_hash)
+                names.append(name)
+
+        if not paths:
+            error_msg = "No CSV files found in the upload"
+            logger.error(error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+
+        logger.debug(f"Parsing {len(paths)} CSV files in parallel in {mode} mode")
+        filenames = ", ".join(file.filename for file in files)
+        created_count, load_stats = await run_in_upload_pool(
+            ingest_csv_files, paths, chunk_size, mode, key,
+            filename=filenames, content_hash=combine_hashes(hashes), force=force, quarantine=quarantine, names=names
+        )
+
+        logger.info(f"{upload_message(created_count, load_stats)} from {len(paths)} files")
+        return _upload_response(created_count, load_stats)
+    except HTTPException:
+        raise
+    except LoadInProgress as e:
+        raise _busy_error(e)
+    except ValidationFailed as e:
+        raise _validation_error(e)
+    except zipfile.BadZipFile as e:
+        error_msg = f"Invalid ZIP archive: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+    except ValueError as e:
+        # Ошибки разбора содержимого файлов, в том числе пришедшие из процессов разбора
+        error_msg = f"Invalid CSV files: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+    except Exception as e:
+        error_msg = f"Error processing CSV files: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=error_msg)
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+def _upload_size(file: UploadFile) -> int:
+    """Возвращает размер уже принятого файла, не читая его содержимое"""
+    position = file.file.tell()
+    size = file.file.seek(0, os.SEEK_END)
+    file.file.seek(position)
+    return size
+
+
+def _busy_error(error: LoadInProgress) -> HTTPException:
+    """Отказ загрузке, пока другая загрузка изменяет рабочие таблицы (LOAD_LOCK_MODE=reject)"""
+    logger.error(str(error))
+    return HTTPException(status_code=409, detail=str(error))
+
+
+def _validation_error(error: ValidationFailed) -> HTTPException:
+    """Отчет о непрошедших проверку значениях: общее число ошибок и первые из них с номерами строк"""
+    logger.error(str(error))
+    return HTTPException(status_code=422, detail={"message": str(error), **error.report})
+
+
+def _upload_response(created_count: int, load_stats: dict) -> JSONResponse:
+    """Формирует ответ загрузки: 201 для новых данных, 200 для повторно присланного файла"""
+    duplicate = "duplicate_of" in load_stats
+    return pin_reads(JSONResponse(
+        status_code=status.HTTP_200_OK if duplicate else status.HTTP_201_CREATED,
+        content={
+            "message": upload_message(created_count, load_stats),
+            "load_stats": load_stats,
+        }
+    ))
+
+
+def _persist_stream(stream) -> Tuple[str, str]:
+    """Сохраняет поток в файл в каталоге загрузок, попутно вычисляя хеш, и возвращает путь и хеш"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=UPLOAD_DIR)
+    reader = HashingReader(stream)
+    try:
+        with os.fdopen(fd, "wb") as target:
+            shutil.copyfileobj(reader, target)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, reader.hexdigest()
+
+
+def _persist_upload(file: UploadFile) -> Tuple[str, str]:
+    """Сохраняет загруженный файл на диск для фоновой обработки"""
+    return _persist_stream(file.file)
+
+
+def _extract_csv_members(file: UploadFile) -> List[Tuple[str, str, str]]:
+    """Распаковывает CSV файлы архива во временные файлы и возвращает пути, хеши и имена в архиве
+
+    Имена из архива в путях не используются, они нужны только для отчета о проверке.
+    """
+    paths = []
+    try:
+        with zipfile.ZipFile(file.file) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or not member.filename.endswith('.csv'):
+                    continue
+                with archive.open(member) as stream:
+                    paths.append((*_persist_stream(stream), f"{file.filename}/{member.filename}"))
+    except Exception:
+        # Вызывающий не получит пути уже распакованных файлов, поэтому они удаляются здесь
+        for path, _, _ in paths:
+            os.remove(path)
+        raise
+    return paths
\ No newline at end of file
@@ -0,0 +1,108 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import UPLOAD_CHUNK_MAX_BYTES
+from app.database.locks import LoadInProgress
+from app.utils.consistency import pin_reads
+from app.utils.ingestion import upload_message
+from app.utils.metrics import UPLOAD_SIZE
+from app.utils.sessions import UploadSessionConflict, UploadSessionNotFound, abort_upload_session, \
+    append_upload_chunk, create_upload_session, finalize_upload_session, get_upload_session
+from app.utils.validation import ValidationFailed
+from app.utils.workers import run_in_upload_pool
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def _call_session(func, *args):
+    """Выполняет операцию над сессией в пуле загрузок и переводит ошибки состояния в HTTP-ответы"""
+    try:
+        return await run_in_upload_pool(func, *args)
+    except UploadSessionNotFound as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadSessionConflict as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.offset})
+    except LoadInProgress as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValidationFailed as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=422, detail={"message": str(e), **e.report})
+    except ValueError as e:
+        error_msg = f"Error processing CSV chunk: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
+
+
+def _chunk_too_large() -> HTTPException:
+    error_msg = f"Chunk exceeds {UPLOAD_CHUNK_MAX_BYTES} bytes"
+    logger.error(error_msg)
+    return HTTPException(status_code=413, detail=error_msg)
+
+
+async def _read_chunk(request: Request) -> bytes:
+    """Читает тело запроса, отказывая части больше UPLOAD_CHUNK_MAX_BYTES до того, как она попадет в память
+
+    Заявленный Content-Length проверяется до чтения, а тело без него или с неверной длиной
+    читается потоком с подсчетом байт.
+    """
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > UPLOAD_CHUNK_MAX_BYTES:
+        raise _chunk_too_large()
+
+    parts = []
+    size = 0
+    async for part in request.stream():
+        size += len(part)
+        if size > UPLOAD_CHUNK_MAX_BYTES:
+            raise _chunk_too_large()
+        parts.append(part)
+    return b"".join(parts)
+
+
+@router.post("/upload-sessions")
+async def create_session(filename: Optional[str] = Query(None)):
+    """Начинает возобновляемую загрузку CSV в режиме replace"""
+    state = await run_in_threadpool(create_upload_session, filename)
+    return JSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content=dict(state, upload_url=f"/api/upload-sessions/{state['session_id']}")
+    )
+
+
+@router.get("/upload-sessions/{session_id}")
+async def get_session(session_id: str):
+    """Возвращает состояние сессии, в том числе смещение, с которого нужно продолжить загрузку"""
+    return await _call_session(get_upload_session, session_id)
+
+
+@router.put("/upload-sessions/{session_id}")
+async def upload_chunk(session_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Принимает часть файла в теле запроса; offset - смещение части от начала файла"""
+    chunk = await _read_chunk(request)
+    UPLOAD_SIZE.labels(endpoint="upload-sessions").observe(len(chunk))
+    return await _call_session(append_upload_chunk, session_id, offset, chunk)
+
+
+@router.post("/upload-sessions/{session_id}/finalize")
+async def finalize_session(session_id: str):
+    """Завершает загрузку: агрегирует принятые строки и подменяет ими рабочие таблицы"""
+    created_count, load_stats = await _call_session(finalize_upload_session, session_id)
+    logger.info(upload_message(created_count, load_stats))
+    return pin_reads(JSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={"message": upload_message(created_count, load_stats), "load_stats": load_stats}
+    ))
+
+
+@router.delete("/upload-sessions/{session_id}")
+async def abort_session(session_id: str):
+    """Отменяет загрузку и удаляет уже принятые строки"""
+    return await _call_session(abort_upload_session, session_id)
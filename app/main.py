@@ -1,6 +1,22 @@
+import asyncio
 import logging
+from typing import Optional
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from app.config import STAGING_CLEANUP_INTERVAL_SECONDS
+from app.handlers.aggregates import router as aggregates_router
+from app.handlers.companies import router as companies_router
+from app.handlers.counties import router as counties_router
+from app.handlers.jobs import router as jobs_router
+from app.handlers.metrics import router as metrics_router
 from app.handlers.upload import router as upload_router
+from app.handlers.upload_sessions import router as upload_sessions_router
+from app.database.session import dispose_engine, init_engine
+from app.database.views import materialized_views_enabled, prepare_views
+from app.utils.metrics import MetricsMiddleware
+from app.utils.sessions import cleanup_abandoned_uploads
+from app.utils.workers import shutdown_upload_pool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,16 +30,47 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def cleanup_uploads_periodically():
+    """Удаляет копии истекших сессий и загрузок, прерванных сбоем, при запуске и затем периодически"""
+    while True:
+        try:
+            await run_in_threadpool(cleanup_abandoned_uploads)
+        except Exception as e:
+            logger.error(f"Error cleaning up abandoned uploads: {str(e)}")
+        await asyncio.sleep(STAGING_CLEANUP_INTERVAL_SECONDS)
+
 
+# FastAPI 0.68 не поддерживает параметр lifespan, поэтому подключение к БД
+# открывается и закрывается в обработчиках startup/shutdown
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up the application")
+    init_engine()
+    if materialized_views_enabled():
+        await run_in_threadpool(prepare_views)
+    global _cleanup_task
+    _cleanup_task = asyncio.create_task(cleanup_uploads_periodically())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the application")
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
+    shutdown_upload_pool()
+    dispose_engine()
 
 app.include_router(upload_router, prefix="/api")
+app.include_router(upload_sessions_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
+app.include_router(aggregates_router, prefix="/api")
+app.include_router(companies_router, prefix="/api")
+app.include_router(counties_router, prefix="/api")
+app.include_router(metrics_router)
 
 @app.get("/")
 async def root():
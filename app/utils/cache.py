@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import AGGREGATE_VERSION_CHECK_SECONDS, REGION_COUNTY_CACHE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """Сериализованный ответ вместе с валидаторами для условных запросов"""
+
+    def __init__(self, body: bytes, last_modified: float, version: Optional[int] = None):
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.last_modified = last_modified
+        self.version = version
+
+
+class AggregateCache:
+    """Кэш ответов по таблицам агрегатов, сбрасываемый после каждой загрузки
+
+    Воркер сбрасывает кэш после своей загрузки сразу, а загрузки других воркеров и реплик
+    замечает по общей версии данных из БД. Версия запрашивается не чаще раза в version_ttl
+    секунд, поэтому частые опросы обслуживаются без обращения к БД.
+    """
+
+    def __init__(self, version_ttl: float = 0.0):
+        self.version_ttl = version_ttl
+        self._entries: Dict[str, CacheEntry] = {}
+        self._generation = 0
+        self._last_modified = time.time()
+        self._version: Optional[Tuple[int, Optional[float]]] = None
+        self._version_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def shared_version(self, fetch: Callable[[], Tuple[int, Optional[float]]]) -> Tuple[int, Optional[float]]:
+        """Возвращает общую версию данных и время ее изменения, запрашивая их через fetch не чаще раза в version_ttl"""
+        with self._lock:
+            version, checked_at, generation = self._version, self._version_checked_at, self._generation
+        if version is not None and time.monotonic() - checked_at < self.version_ttl:
+            return version
+
+        version = fetch()
+        with self._lock:
+            if generation == self._generation:
+                self._version, self._version_checked_at = version, time.monotonic()
+        return version
+
+    def get(self, name: str, loader: Callable[[], Any], version: Optional[int] = None,
+            last_modified: Optional[float] = None) -> CacheEntry:
+        """Возвращает закэшированный ответ или загружает его через loader
+
+        version - общая версия данных; ответ, закэшированный для другой версии, загружается
+        заново. last_modified - время изменения этой версии, одинаковое во всех воркерах;
+        без него используется время последнего сброса кэша в этом воркере.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            generation, local_modified = self._generation, self._last_modified
+        if entry is not None and entry.version == version:
+            return entry
+
+        body = json.dumps(loader(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = CacheEntry(body, local_modified if last_modified is None else last_modified, version)
+
+        with self._lock:
+            # Данные, прочитанные до сброса кэша, не должны попасть в новое поколение
+            if generation == self._generation:
+                self._entries[name] = entry
+        logger.debug(f"Loaded {name} into aggregate cache")
+        return entry
+
+    def invalidate(self) -> None:
+        """Атомарно заменяет содержимое кэша пустым поколением"""
+        with self._lock:
+            self._entries = {}
+            self._generation += 1
+            self._last_modified = time.time()
+            self._version = None
+        logger.info("Aggregate cache invalidated")
+
+
+class ReferenceCache:
+    """Кэш небольшого справочника, который перечитывается из БД не чаще раза в ttl секунд
+
+    Каждый воркер держит свою копию. Изменение справочника в другом воркере меняет общую
+    версию данных, и справочник, загруженный при прежней версии, перечитывается сразу.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: Optional[Any] = None
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, loader: Callable[[], Any], version: Optional[int] = None) -> Any:
+        """Возвращает закэшированный справочник или загружает его через loader
+
+        version - общая версия данных; справочник, загруженный при другой версии, перечитывается.
+        """
+        with self._lock:
+            value, loaded_at, generation = self._value, self._loaded_at, self._generation
+            same_version = self._version == version
+        if value is not None and same_version and time.monotonic() - loaded_at < self.ttl:
+            return value
+
+        value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._value, self._version, self._loaded_at = value, version, time.monotonic()
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+aggregate_cache = AggregateCache(AGGREGATE_VERSION_CHECK_SECONDS)
+county_cache = ReferenceCache(REGION_COUNTY_CACHE_SECONDS)
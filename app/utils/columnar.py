@@ -0,0 +1,107 @@
+import io
+import logging
+import mmap
+import time
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from app.config import CSV_CHUNK_SIZE
+from app.utils.metrics import PARSE_SECONDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow необязателен
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+# Расширения файлов колоночных форматов; .arrow и .feather - файловый формат Arrow IPC, .arrows - потоковый
+COLUMNAR_SUFFIXES = {".parquet": FORMAT_PARQUET, ".arrow": FORMAT_ARROW, ".arrows": FORMAT_ARROW,
+                     ".feather": FORMAT_ARROW}
+
+# Сигнатура в начале файлового формата Arrow IPC; потоковый формат ее не содержит
+ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def detect_columnar_format(filename: str) -> Optional[str]:
+    for suffix, columnar_format in COLUMNAR_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return columnar_format
+    return None
+
+
+def check_columnar_support() -> None:
+    if pa is None:
+        raise ValueError("Parquet and Arrow uploads require the pyarrow package")
+
+
+def _map_source(stream):
+    """Возвращает буфер pyarrow над содержимым потока без копирования
+
+    Файл на диске отображается в память; SpooledTemporaryFile при вызове fileno()
+    сбрасывает содержимое на диск, поэтому отображается и небольшой загруженный файл.
+    Отображение закрывается сборщиком мусора вместе с последним ссылающимся на него буфером.
+    """
+    if isinstance(stream, io.BytesIO):
+        return pa.py_buffer(stream.getbuffer())
+
+    stream.flush()
+    if stream.seek(0, io.SEEK_END) == 0:
+        raise ValueError("Uploaded file is empty")
+    return pa.py_buffer(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _iter_record_batches(buffer, columnar_format: str, chunk_size: int) -> Iterator["pa.RecordBatch"]:
+    if columnar_format == FORMAT_PARQUET:
+        # Группы строк читаются по одной и режутся на порции по chunk_size строк
+        yield from pq.ParquetFile(pa.BufferReader(buffer)).iter_batches(batch_size=chunk_size)
+        return
+
+    if buffer.size >= len(ARROW_FILE_MAGIC) and buffer[:len(ARROW_FILE_MAGIC)].to_pybytes() == ARROW_FILE_MAGIC:
+        reader = pa.ipc.open_file(pa.BufferReader(buffer))
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    else:
+        batches = pa.ipc.open_stream(pa.BufferReader(buffer))
+
+    for batch in batches:
+        # slice не копирует данные, а лишь ограничивает размер порции для записи в БД
+        for offset in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(offset, chunk_size)
+
+
+def iter_columnar_frames(file, columnar_format: str, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Читает Parquet или Arrow IPC порциями и отдает их как DataFrame с исходными типами столбцов
+
+    Порции преобразуются в DataFrame целиком по столбцам, без построчных словарей,
+    поэтому дальше они проходят тот же путь записи, что и порции CSV.
+    """
+    check_columnar_support()
+    source = getattr(file, "file", file)
+    total = 0
+    parse_seconds = 0.0
+    try:
+        batches = _iter_record_batches(_map_source(source), columnar_format, chunk_size)
+        while True:
+            started_at = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                parse_seconds += time.perf_counter() - started_at
+                break
+            frame = batch.to_pandas()
+            parse_seconds += time.perf_counter() - started_at
+
+            total += len(frame)
+            logger.debug(f"Read batch of {len(frame)} records ({total} total) from {columnar_format}")
+            yield frame
+
+        PARSE_SECONDS.labels(engine=columnar_format).observe(parse_seconds)
+        logger.debug(f"Processed {total} records from {columnar_format} in {parse_seconds:.2f}s")
+    except Exception as e:
+        logger.error(f"Error processing {columnar_format} file: {str(e)}")
+        raise
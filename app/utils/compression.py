@@ -0,0 +1,83 @@
+import bz2
+import gzip
+import io
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard необязателен
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+BZIP2 = "bzip2"
+
+# Расширения сжатых CSV и типы содержимого, которыми клиент может указать сжатие части формы
+COMPRESSED_SUFFIXES = {".csv.gz": GZIP, ".csv.zst": ZSTD, ".csv.bz2": BZIP2}
+COMPRESSED_CONTENT_TYPES = {
+    "application/gzip": GZIP,
+    "application/x-gzip": GZIP,
+    "application/zstd": ZSTD,
+    "application/x-bzip2": BZIP2,
+}
+
+# Размер буфера распакованных данных, из которого читает парсер CSV
+DECOMPRESS_BUFFER_SIZE = 1024 * 1024
+
+
+def detect_compression(filename: str, content_type: Optional[str] = None) -> Optional[str]:
+    """Определяет сжатие загруженного файла по расширению или типу содержимого части формы"""
+    for suffix, compression in COMPRESSED_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return compression
+    return COMPRESSED_CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+def is_csv_upload(filename: str, content_type: Optional[str] = None) -> bool:
+    return filename.endswith(".csv") or detect_compression(filename, content_type) is not None
+
+
+def check_compression(compression: Optional[str]) -> None:
+    """Проверяет, что для сжатия установлена нужная библиотека"""
+    if compression == ZSTD and zstandard is None:
+        raise ValueError("Compression 'zstd' requires the zstandard package")
+
+
+def open_decompressed(stream, compression: Optional[str]):
+    """Оборачивает поток сжатых данных в поток распакованных, читаемый по мере разбора CSV
+
+    Распакованный файл целиком не хранится ни в памяти, ни на диске.
+    """
+    if compression is None:
+        return stream
+    check_compression(compression)
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == BZIP2:
+        return bz2.BZ2File(stream, mode="rb")
+    if compression == ZSTD:
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stream), DECOMPRESS_BUFFER_SIZE)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class PrefixedStream(io.RawIOBase):
+    """Поток, который сначала отдает уже прочитанные байты prefix, а затем остаток stream
+
+    Нужен, чтобы вернуть прочитанный заголовок в поток, который нельзя перемотать назад.
+    """
+
+    def __init__(self, prefix: bytes, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.prefix:
+            size = min(len(buffer), len(self.prefix))
+            buffer[:size], self.prefix = self.prefix[:size], self.prefix[size:]
+            return size
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
@@ -0,0 +1,18 @@
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import READ_YOUR_WRITES_SECONDS
+
+# Cookie, по которой чтения клиента после его загрузки направляются в основную БД
+READ_PIN_COOKIE = "read_primary"
+
+
+def pin_reads(response: Response) -> Response:
+    """Закрепляет чтения клиента за основной БД на READ_YOUR_WRITES_SECONDS секунд"""
+    if READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(READ_PIN_COOKIE, "1", max_age=READ_YOUR_WRITES_SECONDS, httponly=True)
+    return response
+
+
+def reads_pinned(request: Request) -> bool:
+    return READ_YOUR_WRITES_SECONDS > 0 and request.cookies.get(READ_PIN_COOKIE) == "1"
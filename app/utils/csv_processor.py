@@ -1,19 +1,194 @@
+import csv
+import io
+import time
 import pandas as pd
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from app.config import CSV_CHUNK_SIZE, CSV_ENGINE, CSV_BLOCK_SIZE
+from app.database.layout import CSV_DTYPES, CompanyLayout
+from app.utils.compression import DECOMPRESS_BUFFER_SIZE, PrefixedStream
+from app.utils.metrics import PARSE_SECONDS
+from app.utils.validation import FrameValidator, ValidationFailed
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:  # pragma: no cover - pyarrow необязателен
+    pa = None
+    pc = None
+    pa_csv = None
 
 logger = logging.getLogger(__name__)
 
 
-async def process_csv_file(file) -> List[Dict[str, Any]]:
-    """Обрабатывает CSV файл и возвращает список словарей с данными"""
+def _chunk_to_records(chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Преобразует порцию DataFrame в список словарей, заменяя NaN на None"""
+    return chunk.astype(object).where(chunk.notna(), None).to_dict(orient='records')
+
+
+def resolve_engine(engine: str = CSV_ENGINE) -> str:
+    """Определяет движок разбора CSV с учетом наличия pyarrow"""
+    if engine == "auto":
+        return "pyarrow" if pa_csv is not None else "c"
+    if engine == "pyarrow" and pa_csv is None:
+        raise ValueError("CSV engine 'pyarrow' requires the pyarrow package")
+    return engine
+
+
+def _iter_pandas_frames(source, chunk_size: int, dtypes: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(source, chunksize=chunk_size, dtype=dtypes) as reader:
+        yield from reader
+
+
+def _to_numeric(column: "pa.Array") -> "pa.Array":
+    """Приводит строковый столбец к int64 или float64 средствами Arrow, как это делает pandas
+
+    Если хотя бы одно значение не число, столбец остается строковым, и нечисловые
+    значения показателей находит проверка порции.
+    """
+    for numeric_type in (pa.int64(), pa.float64()):
+        try:
+            return pc.cast(column, numeric_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return column
+
+
+def _read_header(source) -> Tuple[List[str], Any]:
+    """Читает заголовок и возвращает его вместе с потоком, читаемым с начала заголовка
+
+    Поток распаковки zstd нельзя перемотать назад, поэтому прочитанная строка
+    возвращается в него через PrefixedStream. У SpooledTemporaryFile до Python 3.11
+    нет метода seekable, но перемотка поддерживается.
+    """
+    seekable = getattr(source, "seekable", None)
+    if seekable is None or seekable():
+        position = source.tell()
+        header = next(csv.reader([source.readline().decode("utf-8-sig")]))
+        source.seek(position)
+        return header, source
+
+    line = source.readline()
+    header = next(csv.reader([line.decode("utf-8-sig")]))
+    return header, io.BufferedReader(PrefixedStream(line, source), DECOMPRESS_BUFFER_SIZE)
+
+
+def _iter_pyarrow_frames(source, chunk_size: int, dtypes: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+    # Все столбцы читаются как строки: pyarrow фиксирует типы по первому блоку и
+    # прервал бы загрузку на нечисловом значении в середине файла. Числа
+    # определяются для каждой порции отдельно приведением в Arrow до преобразования в pandas
+    header, source = _read_header(source)
+    column_types = {column: pa.string() for column in header}
+    text_columns = {column for column, dtype in dtypes.items() if dtype is str}
+
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    for block in reader:
+        # Блок задается в байтах, а порции, как и у движка pandas, нарезаются по chunk_size строк
+        for offset in range(0, block.num_rows, chunk_size):
+            batch = block.slice(offset, chunk_size)
+            columns = [
+                column if name in text_columns else _to_numeric(column)
+                for name, column in zip(batch.schema.names, batch.columns)
+            ]
+            yield pa.RecordBatch.from_arrays(columns, names=batch.schema.names).to_pandas()
+
+
+def iter_csv_frames(file, chunk_size: int = CSV_CHUNK_SIZE, dtypes: Optional[Dict[str, Any]] = None,
+                    engine: str = CSV_ENGINE) -> Iterator[pd.DataFrame]:
+    """Читает CSV порциями и отдает их как DataFrame без построчного преобразования
+
+    Порции содержат до chunk_size строк; pyarrow дополнительно читает файл блоками
+    по CSV_BLOCK_SIZE байт. dtypes задает явные типы столбцов. В метрику времени
+    разбора попадает только время получения порций, без обработки их потребителем.
+    """
+    source = getattr(file, "file", file)
+    dtypes = CSV_DTYPES if dtypes is None else dtypes
+    engine = resolve_engine(engine)
+    total = 0
+    parse_seconds = 0.0
     try:
-        df = pd.read_csv(file.file)
+        if engine == "pyarrow":
+            frames = _iter_pyarrow_frames(source, chunk_size, dtypes)
+        else:
+            frames = _iter_pandas_frames(source, chunk_size, dtypes)
+
+        while True:
+            started_at = time.perf_counter()
+            frame = next(frames, None)
+            parse_seconds += time.perf_counter() - started_at
+            if frame is None:
+                break
 
-        data = df.where(pd.notnull(df), None).to_dict(orient='records')
+            total += len(frame)
+            logger.debug(f"Parsed batch of {len(frame)} records ({total} total) with {engine} engine")
+            yield frame
 
-        logger.debug(f"Processed {len(data)} records from CSV")
-        return data
+        PARSE_SECONDS.labels(engine=engine).observe(parse_seconds)
+        logger.debug(f"Processed {total} records from CSV in {parse_seconds:.2f}s")
     except Exception as e:
         logger.error(f"Error processing CSV file: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def iter_csv_batches(file, chunk_size: int = CSV_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Читает CSV порциями по chunk_size строк и отдает их списками словарей"""
+    for frame in iter_csv_frames(file, chunk_size, dtypes={}, engine="c"):
+        yield _chunk_to_records(frame)
+
+
+def parse_csv_rows(path: str, chunk_size: int = CSV_CHUNK_SIZE,
+                   counties: Optional[Dict[str, str]] = None) -> List[Tuple[Any, ...]]:
+    """Разбирает CSV файл целиком в кортежи значений в порядке COMPANY_COLUMNS
+
+    Предназначена для выполнения в отдельном процессе: принимает путь, а не открытый
+    файл, и справочник округов, прочитанный родителем, и возвращает готовые к записи
+    строки, чтобы родителю оставалась только вставка.
+    """
+    rows = []
+    layout = None
+    with open(path, "rb") as file:
+        for frame in iter_csv_frames(file, chunk_size):
+            if layout is None:
+                layout = CompanyLayout(frame.columns, counties)
+            rows.extend(layout.to_rows(frame))
+    logger.debug(f"Parsed {len(rows)} rows from {path}")
+    return rows
+
+
+def parse_validated_csv_rows(path: str, chunk_size: int = CSV_CHUNK_SIZE, counties: Optional[Dict[str, str]] = None,
+                             quarantine: bool = False) -> Tuple[List[Tuple[Any, ...]], FrameValidator]:
+    """Разбирает и проверяет CSV файл в отдельном процессе, возвращает строки и итог проверки
+
+    Исключение с отчетом не пережило бы передачу между процессами, поэтому ошибки не
+    выбрасываются, а остаются в возвращаемом FrameValidator. Если файл не прошел проверку,
+    строк он не возвращает; с quarantine возвращаются строки без ошибок.
+    """
+    rows = []
+    layout = None
+    validator = FrameValidator(quarantine)
+    with open(path, "rb") as file:
+        for frame in iter_csv_frames(file, chunk_size):
+            try:
+                invalid = validator.validate(frame)
+            except ValidationFailed:
+                return [], validator
+            if validator.failed:
+                continue
+            if quarantine and invalid.any():
+                frame = frame[~invalid]
+            if layout is None:
+                layout = CompanyLayout(frame.columns, counties)
+            rows.extend(layout.to_rows(frame))
+    logger.debug(f"Parsed {len(rows)} rows from {path}")
+    return ([] if validator.failed else rows), validator
+
+
+async def process_csv_file(file) -> List[Dict[str, Any]]:
+    """Обрабатывает CSV файл и возвращает список словарей с данными"""
+    return [record for batch in iter_csv_batches(file) for record in batch]
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Основные столбцы, которые при выгрузке идут перед данными о банкротстве, как в исходном CSV
+MAIN_COLUMNS = ("company_name", "region", "industry")
+
+# Количество строк, накапливаемых перед отправкой очередной порции ответа
+EXPORT_FLUSH_ROWS = 1000
+
+
+def _flatten(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Разворачивает bankruptcy_data обратно в столбцы исходного CSV"""
+    *main_values, bankruptcy_data = row
+    flat = dict(zip(MAIN_COLUMNS, main_values))
+    flat.update(bankruptcy_data or {})
+    return flat
+
+
+def iter_csv_export(rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    """Формирует CSV порциями; заголовок берется из состава bankruptcy_data первой строки"""
+    buffer = io.StringIO()
+    writer = None
+    header: List[str] = list(MAIN_COLUMNS)
+
+    for count, row in enumerate(rows, start=1):
+        flat = _flatten(row)
+        if writer is None:
+            header = list(flat.keys())
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(header)
+        writer.writerow([flat.get(column) for column in header])
+
+        if count % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if writer is None:
+        csv.writer(buffer, lineterminator="\n").writerow(header)
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson_export(rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    """Формирует NDJSON порциями, по одному объекту компании в строке"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_flatten(row), ensure_ascii=False))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Сжимает поток порций в формат gzip без накопления всего ответа"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
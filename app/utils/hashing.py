@@ -0,0 +1,38 @@
+import hashlib
+from typing import Iterable
+
+# Размер блока, которым читается поток при вычислении хеша
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class HashingReader:
+    """Обертка над файловым объектом, вычисляющая SHA-256 прочитанных данных"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if isinstance(data, str):
+            data = data.encode()
+        self._hash.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def hash_stream(stream) -> str:
+    """Вычисляет SHA-256 оставшейся части потока и возвращает позицию чтения на место"""
+    position = stream.tell()
+    reader = HashingReader(stream)
+    while reader.read(HASH_BLOCK_SIZE):
+        pass
+    stream.seek(position)
+    return reader.hexdigest()
+
+
+def combine_hashes(hashes: Iterable[str]) -> str:
+    """Строит хеш набора файлов, не зависящий от порядка их передачи"""
+    return hashlib.sha256("".join(sorted(hashes)).encode()).hexdigest()
@@ -0,0 +1,220 @@
+import logging
+from concurrent.futures import Future, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app.config import CSV_CHUNK_SIZE
+from app.database.repositories import CompanyRepository, QuarantineRepository, UploadRepository, DEFAULT_KEY, \
+    MODE_APPEND, MODE_REPLACE
+from app.database.session import SessionLocal
+from app.utils.cache import aggregate_cache
+from app.utils.columnar import iter_columnar_frames
+from app.utils.compression import open_decompressed
+from app.utils.csv_processor import iter_csv_frames, parse_validated_csv_rows
+from app.utils.hashing import combine_hashes, hash_stream
+from app.utils.validation import FrameValidator, ValidationFailed, combine_reports
+from app.utils.workers import get_parse_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _track_frames(frames: Iterable[pd.DataFrame], progress) -> Iterator[pd.DataFrame]:
+    """Сообщает о прогрессе по мере передачи порций строк в БД"""
+    for frame in frames:
+        progress.set_stage("inserting")
+        progress.add_rows(len(frame))
+        yield frame
+
+
+def upload_message(created_count: int, load_stats: Dict[str, Any]) -> str:
+    """Формирует текст ответа о результате загрузки"""
+    if "duplicate_of" in load_stats:
+        return f"File already uploaded, skipped {created_count} records"
+    return f"Successfully uploaded {created_count} records"
+
+
+def _find_duplicate(db, content_hash: str, mode: str, key: str, force: bool) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """Возвращает результат предыдущей загрузки того же файла, если повторная ничего не изменит
+
+    В режиме append повторная загрузка добавляет строки, поэтому такие файлы не пропускаются.
+    """
+    if force or mode == MODE_APPEND:
+        return None
+
+    duplicate = UploadRepository(db).find_duplicate(content_hash, mode, key)
+    if duplicate is None:
+        return None
+
+    logger.info(f"Skipping upload identical to upload {duplicate.id} ({content_hash})")
+    return duplicate.rows, dict(duplicate.result, duplicate_of=duplicate.id)
+
+
+def ingest_csv(file, chunk_size: int = CSV_CHUNK_SIZE, mode: str = MODE_REPLACE, key: str = DEFAULT_KEY,
+               progress=None, filename: Optional[str] = None, content_hash: Optional[str] = None,
+               force: bool = False, compression: Optional[str] = None,
+               quarantine: bool = False) -> Tuple[int, Dict[str, Any]]:
+    """Разбирает CSV и записывает данные в БД в собственной сессии
+
+    progress - необязательный объект с методами set_stage(stage) и add_rows(count),
+    получающий сведения о текущей стадии загрузки. Если хеш содержимого не передан,
+    он вычисляется одним чтением уже сохраненного файла до разбора; повтор последней
+    загрузки сразу возвращает ее результат без разбора и записи.
+    compression - сжатие файла (gzip, zstd, bzip2); файл распаковывается потоком по мере
+    разбора, а хеш считается по сжатым данным. Файл с ошибками в значениях отклоняется
+    через ValidationFailed; с quarantine такие строки откладываются, а остальные загружаются.
+    """
+    source = getattr(file, "file", file)
+    db = SessionLocal()
+    try:
+        if content_hash is None:
+            content_hash = hash_stream(source)
+
+        duplicate = _find_duplicate(db, content_hash, mode, key, force)
+        if duplicate is not None:
+            return duplicate
+
+        frames = iter_csv_frames(open_decompressed(source, compression), chunk_size)
+        return _load_frames(db, frames, mode, key, progress, filename, content_hash, quarantine)
+    finally:
+        db.close()
+
+
+def ingest_columnar(file, columnar_format: str, chunk_size: int = CSV_CHUNK_SIZE, mode: str = MODE_REPLACE,
+                    key: str = DEFAULT_KEY, filename: Optional[str] = None, force: bool = False,
+                    quarantine: bool = False) -> Tuple[int, Dict[str, Any]]:
+    """Читает Parquet или Arrow IPC и записывает данные в БД тем же путем, что и CSV"""
+    source = getattr(file, "file", file)
+    db = SessionLocal()
+    try:
+        content_hash = hash_stream(source)
+        duplicate = _find_duplicate(db, content_hash, mode, key, force)
+        if duplicate is not None:
+            return duplicate
+
+        frames = iter_columnar_frames(source, columnar_format, chunk_size)
+        return _load_frames(db, frames, mode, key, None, filename, content_hash, quarantine)
+    finally:
+        db.close()
+
+
+def _load_frames(db, frames: Iterable[pd.DataFrame], mode: str, key: str, progress, filename: Optional[str],
+                 content_hash: str, quarantine: bool = False) -> Tuple[int, Dict[str, Any]]:
+    """Проверяет и записывает порции в БД, сбрасывает кэш агрегатов и заносит загрузку в журнал"""
+    repo = CompanyRepository(db, progress=progress)
+    validator = FrameValidator(quarantine)
+    frames = validator.filter(frames)
+    if progress is not None:
+        frames = _track_frames(frames, progress)
+
+    try:
+        created_count = repo.bulk_create_from_frames(frames, mode, key)
+    except Exception:
+        # Исключение из потока порций доходит из COPY ошибкой драйвера, поэтому отчет берется из проверки
+        if validator.failed:
+            raise ValidationFailed(validator.report()) from None
+        raise
+
+    load_stats = repo.last_load_stats
+    if validator.quarantined:
+        QuarantineRepository(db).add(content_hash, filename, validator.quarantined)
+        load_stats = dict(load_stats, quarantined_rows=len(validator.quarantined), validation=validator.report())
+    aggregate_cache.invalidate()
+    UploadRepository(db).record(content_hash, filename, mode, key, created_count, load_stats)
+    return created_count, load_stats
+
+
+def _batch_report(validators: List[Tuple[str, FrameValidator]]) -> Dict[str, Any]:
+    return combine_reports([(name, validator.report()) for name, validator in validators])
+
+
+def _iter_parsed_rows(futures: List[Future], names: List[str], validators: List[Tuple[str, FrameValidator]],
+                      failures: List[Exception]) -> Iterator[Tuple[Any, ...]]:
+    """Отдает строки файлов по мере завершения их разбора, не дожидаясь самого медленного
+
+    Итоги проверки файлов собираются в validators в порядке файлов. Если хотя бы один
+    файл не прошел проверку, строки остальных больше не передаются, а после разбора всех
+    файлов выбрасывается ValidationFailed с общим отчетом. Ошибка разбора файла
+    сохраняется в failures.
+    """
+    results: Dict[int, FrameValidator] = {}
+    positions = {future: position for position, future in enumerate(futures)}
+    for future in as_completed(futures):
+        try:
+            rows, validator = future.result()
+        except ValueError as e:
+            failures.append(e)
+            raise
+        results[positions[future]] = validator
+        if not any(result.failed for result in results.values()):
+            yield from rows
+
+    validators.extend((names[position], results[position]) for position in sorted(results))
+    if any(validator.failed for _, validator in validators):
+        report = _batch_report(validators)
+        logger.error(f"Validation failed with {report['error_count']} invalid values")
+        raise ValidationFailed(report)
+
+
+def ingest_csv_files(paths: List[str], chunk_size: int = CSV_CHUNK_SIZE, mode: str = MODE_REPLACE,
+                     key: str = DEFAULT_KEY, filename: Optional[str] = None, content_hash: Optional[str] = None,
+                     force: bool = False, quarantine: bool = False,
+                     names: Optional[List[str]] = None) -> Tuple[int, Dict[str, Any]]:
+    """Разбирает несколько CSV параллельно в пуле процессов и записывает их одной загрузкой
+
+    Строки всех файлов попадают в одну вставку с единственным пересчетом агрегатов,
+    поэтому в режиме replace итогом становится объединение файлов. Хеш набора не
+    зависит от порядка файлов. Файлы проверяются при разборе, как и в ingest_csv;
+    names - имена файлов для отчета о проверке и отложенных строк.
+    """
+    names = names or paths
+    futures: List[Future] = []
+    db = SessionLocal()
+    try:
+        if content_hash is None:
+            hashes = []
+            for path in paths:
+                with open(path, "rb") as file:
+                    hashes.append(hash_stream(file))
+            content_hash = combine_hashes(hashes)
+
+        duplicate = _find_duplicate(db, content_hash, mode, key, force)
+        if duplicate is not None:
+            return duplicate
+
+        repo = CompanyRepository(db)
+        counties = repo.region_counties()
+        pool = get_parse_pool()
+        futures = [pool.submit(parse_validated_csv_rows, path, chunk_size, counties, quarantine) for path in paths]
+
+        validators: List[Tuple[str, FrameValidator]] = []
+        failures: List[Exception] = []
+        rows = _iter_parsed_rows(futures, names, validators, failures)
+        try:
+            created_count = repo.bulk_create_from_rows(rows, mode, key)
+        except Exception:
+            # Исключение из потока строк доходит из COPY ошибкой драйвера, поэтому исходная ошибка
+            # и отчет о проверке восстанавливаются по собранным генератором данным
+            if any(validator.failed for _, validator in validators):
+                raise ValidationFailed(_batch_report(validators)) from None
+            if failures:
+                raise failures[0] from None
+            raise
+
+        load_stats = dict(repo.last_load_stats, files=len(paths))
+        quarantined = [(name, validator) for name, validator in validators if validator.quarantined]
+        if quarantined:
+            for name, validator in quarantined:
+                QuarantineRepository(db).add(content_hash, name, validator.quarantined)
+            load_stats = dict(
+                load_stats,
+                quarantined_rows=sum(len(validator.quarantined) for _, validator in quarantined),
+                validation=_batch_report(validators),
+            )
+        aggregate_cache.invalidate()
+        UploadRepository(db).record(content_hash, filename, mode, key, created_count, load_stats)
+        return created_count, load_stats
+    finally:
+        for future in futures:
+            future.cancel()
+        db.close()
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.config import JOB_HISTORY_LIMIT
+from app.utils.ingestion import ingest_csv, upload_message
+from app.utils.workers import upload_executor
+
+logger = logging.getLogger(__name__)
+
+STAGE_QUEUED = "queued"
+STAGE_PARSING = "parsing"
+STAGE_INSERTING = "inserting"
+STAGE_AGGREGATING = "aggregating"
+# Данные приняты, но рабочие таблицы сейчас изменяет другая загрузка
+STAGE_WAITING = "waiting"
+STAGE_COMPLETED = "completed"
+STAGE_FAILED = "failed"
+
+FINISHED_STAGES = (STAGE_COMPLETED, STAGE_FAILED)
+
+
+class IngestionJob:
+    """Состояние фоновой загрузки CSV"""
+
+    def __init__(self, filename: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.stage = STAGE_QUEUED
+        self.rows_processed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage: str) -> None:
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+            if stage in FINISHED_STAGES:
+                self.finished_at = time.time()
+            self.stage = stage
+        logger.debug(f"Job {self.id} moved to stage {stage}")
+
+    def add_rows(self, count: int) -> None:
+        with self._lock:
+            self.rows_processed += count
+
+    def complete(self, result: Dict[str, Any]) -> None:
+        self.result = result
+        self.set_stage(STAGE_COMPLETED)
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.set_stage(STAGE_FAILED)
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in FINISHED_STAGES
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "stage": self.stage,
+                "rows_processed": self.rows_processed,
+                "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+                "rows_per_sec": round(self.rows_processed / elapsed, 1) if elapsed else None,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobRegistry:
+    """Потокобезопасный реестр фоновых задач текущего процесса"""
+
+    def __init__(self, history_limit: int = JOB_HISTORY_LIMIT):
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._history_limit = history_limit
+        self._lock = threading.Lock()
+
+    def add(self, job: IngestionJob) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        """Удаляет самые старые завершенные задачи сверх лимита истории"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self._history_limit, 0)]:
+            del self._jobs[job_id]
+
+
+job_registry = JobRegistry()
+
+
+def submit_ingestion_job(path: str, filename: str, chunk_size: int, mode: str, key: str,
+                         content_hash: Optional[str] = None, force: bool = False,
+                         compression: Optional[str] = None, quarantine: bool = False) -> IngestionJob:
+    """Ставит сохраненный файл в очередь на фоновую загрузку; сжатый файл хранится на диске сжатым"""
+    job = IngestionJob(filename)
+    job_registry.add(job)
+    upload_executor.submit(_run_ingestion_job, job, path, chunk_size, mode, key, content_hash, force, compression,
+                             quarantine)
+    logger.info(f"Queued ingestion job {job.id} for file: {filename}")
+    return job
+
+
+def _run_ingestion_job(job: IngestionJob, path: str, chunk_size: int, mode: str, key: str,
+                       content_hash: Optional[str], force: bool, compression: Optional[str],
+                       quarantine: bool) -> None:
+    """Выполняет загрузку в рабочем потоке и фиксирует итог в задаче"""
+    try:
+        job.set_stage(STAGE_PARSING)
+        with open(path, "rb") as file:
+            created_count, load_stats = ingest_csv(file, chunk_size, mode, key, progress=job, filename=job.filename,
+                                                   content_hash=content_hash, force=force,
+                                                   compression=compression, quarantine=quarantine)
+
+        job.complete({
+            "message": upload_message(created_count, load_stats),
+            "load_stats": load_stats,
+        })
+        logger.info(f"Ingestion job {job.id} completed with {created_count} records")
+    except Exception as e:
+        job.fail(str(e))
+        logger.error(f"Ingestion job {job.id} failed: {str(e)}")
+    finally:
+        os.remove(path)
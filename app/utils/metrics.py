@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.routing import Match
+
+# Границы корзин: размеры файлов от 1 КБ до 4 ГБ, длительности от 5 мс до 10 минут
+SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(12))
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+UPLOAD_SIZE = Histogram(
+    "upload_size_bytes", "Размер загруженных файлов", ["endpoint"], buckets=SIZE_BUCKETS
+)
+PARSE_SECONDS = Histogram(
+    "csv_parse_seconds", "Время разбора CSV без учета ожидания потребителя порций", ["engine"],
+    buckets=DURATION_BUCKETS
+)
+INSERT_SECONDS = Histogram(
+    "db_insert_seconds", "Время вставки строк компаний в БД", ["method", "mode"], buckets=DURATION_BUCKETS
+)
+AGGREGATION_SECONDS = Histogram(
+    "aggregation_seconds", "Время пересчета таблиц агрегатов", ["kind"], buckets=DURATION_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ["method", "route", "status"],
+    buckets=DURATION_BUCKETS
+)
+
+ROWS_INGESTED = Counter("rows_ingested_total", "Строки компаний, записанные в БД", ["mode"])
+ROWS_FAILED = Counter("rows_failed_total", "Строки компаний из загрузок, завершившихся ошибкой", ["mode"])
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "Соединения, выданные из пула БД")
+DB_POOL_SIZE = Gauge("db_pool_size", "Размер пула соединений БД")
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[None]:
+    """Замеряет длительность блока и записывает ее в гистограмму с указанными метками"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started_at)
+
+
+def track_pool(engine) -> None:
+    """Публикует состояние пула соединений движка при каждом чтении метрик"""
+    DB_POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout())
+    DB_POOL_SIZE.set_function(lambda: engine.pool.size())
+
+
+def _route_path(scope) -> str:
+    """Возвращает шаблон маршрута, чтобы идентификаторы в путях не размножали серии метрик"""
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware, замеряющее время запроса до отправки последней части ответа"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.labels(
+                method=scope["method"], route=_route_path(scope), status=str(status_code)
+            ).observe(time.perf_counter() - started_at)
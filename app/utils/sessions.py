@@ -0,0 +1,264 @@
+import logging
+from io import BytesIO
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import CSV_CHUNK_SIZE, STAGING_TTL_SECONDS
+from app.database.layout import CompanyLayout
+from app.database.models import UploadSessionORM
+from app.database.repositories import CompanyRepository, UploadRepository, UploadSessionRepository, DEFAULT_KEY, \
+    MODE_REPLACE
+from app.database.session import SessionLocal
+from app.database.staging import StagingArea
+from app.utils.cache import aggregate_cache
+from app.utils.csv_processor import iter_csv_frames
+from app.utils.ingestion import upload_message
+from app.utils.validation import FrameValidator, ValidationFailed
+
+logger = logging.getLogger(__name__)
+
+SESSION_OPEN = "open"
+SESSION_COMPLETED = "completed"
+SESSION_ABORTED = "aborted"
+SESSION_EXPIRED = "expired"
+
+
+class UploadSessionNotFound(LookupError):
+    pass
+
+
+class UploadSessionConflict(ValueError):
+    """Запрос не соответствует состоянию сессии; offset - смещение, с которого ждется следующая часть"""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+def session_state(upload_session: UploadSessionORM) -> Dict[str, Any]:
+    return {
+        "session_id": upload_session.id,
+        "filename": upload_session.filename,
+        "status": upload_session.status,
+        "offset": upload_session.received_bytes,
+        "rows_committed": upload_session.rows_committed,
+        "result": upload_session.result,
+    }
+
+
+def _complete_rows_length(data: bytes) -> int:
+    """Возвращает длину начала data из целых строк CSV
+
+    data начинается с начала строки, поэтому перевод строки завершает строку CSV,
+    только если перед ним четное число кавычек; иначе он внутри значения в кавычках.
+    Кавычки считаются за один проход от начала к концу, каждый байт просматривается один раз.
+    """
+    boundary = 0
+    quotes = 0
+    start = 0
+    position = data.find(b"\n")
+    while position >= 0:
+        quotes += data.count(b'"', start, position)
+        if quotes % 2 == 0:
+            boundary = position + 1
+        start = position + 1
+        position = data.find(b"\n", start)
+    return boundary
+
+
+def _iter_segment_rows(header: bytes, segment: bytes, counties: Dict[str, str],
+                       validator: FrameValidator) -> Iterator[Tuple[Any, ...]]:
+    layout = None
+    for frame in validator.filter(iter_csv_frames(BytesIO(header + segment), CSV_CHUNK_SIZE)):
+        if layout is None:
+            layout = CompanyLayout(frame.columns, counties)
+        yield from layout.to_rows(frame)
+
+
+def _copy_segment(db, upload_session: UploadSessionORM, segment: bytes) -> int:
+    """Разбирает целые строки части и дописывает их в промежуточную копию в текущей транзакции"""
+    if not segment.strip():
+        return 0
+    repo = CompanyRepository(db)
+    # Справочник читается до начала COPY: во время COPY соединение занято потоком строк
+    counties = repo.region_counties()
+    staging = StagingArea(db, upload_session.staging_suffix)
+    # Номера строк в отчете об ошибках считаются от начала файла, а не от начала части
+    validator = FrameValidator(first_row=upload_session.rows_committed + 1)
+    rows = _iter_segment_rows(upload_session.header.encode("utf-8"), segment, counties, validator)
+    try:
+        return repo.copy_to_staging_table(staging, rows)
+    except Exception:
+        if validator.failed:
+            raise ValidationFailed(validator.report()) from None
+        raise
+
+
+def _get_session(db, session_id: str, lock: bool = False, require_open: bool = True) -> UploadSessionORM:
+    upload_session = UploadSessionRepository(db).get(session_id, lock=lock)
+    if upload_session is None:
+        raise UploadSessionNotFound(f"Upload session {session_id} not found")
+    if require_open and upload_session.status != SESSION_OPEN:
+        raise UploadSessionConflict(f"Upload session {session_id} is {upload_session.status}",
+                                    upload_session.received_bytes)
+    return upload_session
+
+
+def cleanup_abandoned_uploads(max_age: float = STAGING_TTL_SECONDS) -> Dict[str, int]:
+    """Удаляет промежуточные копии брошенных загрузок и возвращает количество удаленных
+
+    Открытые сессии без новых частей дольше max_age секунд истекают. Копии обычных
+    загрузок, оставшиеся после сбоя воркера, удаляются, если созданы раньше max_age
+    секунд назад; копии открытых сессий не трогаются.
+    """
+    db = SessionLocal()
+    try:
+        repo = UploadSessionRepository(db)
+        expired = repo.expired(SESSION_OPEN, max_age)
+        for upload_session in expired:
+            StagingArea(db, upload_session.staging_suffix).drop()
+            upload_session.status = SESSION_EXPIRED
+            upload_session.pending = b""
+        db.commit()
+
+        abandoned = StagingArea.find_abandoned(db, max_age, keep=repo.staging_suffixes(SESSION_OPEN))
+        for staging in abandoned:
+            staging.drop()
+        db.commit()
+
+        if expired or abandoned:
+            logger.info(f"Expired {len(expired)} upload sessions, dropped {len(abandoned)} abandoned staging areas")
+        return {"expired_sessions": len(expired), "abandoned_staging": len(abandoned)}
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error cleaning up abandoned uploads: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+def create_upload_session(filename: Optional[str]) -> Dict[str, Any]:
+    """Создает сессию возобновляемой загрузки в режиме replace вместе с промежуточными копиями таблиц"""
+    db = SessionLocal()
+    try:
+        upload_session = UploadSessionRepository(db).create(filename, SESSION_OPEN)
+        StagingArea(db, upload_session.staging_suffix).create()
+        db.commit()
+        logger.info(f"Created upload session {upload_session.id} for file: {filename}")
+        return session_state(upload_session)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error creating upload session: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+def get_upload_session(session_id: str) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return session_state(_get_session(db, session_id, require_open=False))
+    finally:
+        db.close()
+
+
+def append_upload_chunk(session_id: str, offset: int, chunk: bytes) -> Dict[str, Any]:
+    """Принимает часть файла, начинающуюся со смещения offset
+
+    Целые строки части сразу записываются в промежуточную копию, а незавершенная
+    последняя строка сохраняется в сессии. Строки и новое смещение фиксируются одной
+    транзакцией, поэтому после сбоя часть можно повторить с того же смещения.
+    """
+    db = SessionLocal()
+    try:
+        upload_session = _get_session(db, session_id, lock=True)
+        if offset != upload_session.received_bytes:
+            raise UploadSessionConflict(
+                f"Upload session {session_id} expects offset {upload_session.received_bytes}, got {offset}",
+                upload_session.received_bytes,
+            )
+
+        data = upload_session.pending + chunk
+        if upload_session.header is None:
+            header_end = data.find(b"\n") + 1
+            if header_end:
+                upload_session.header = data[:header_end].decode("utf-8")
+                data = data[header_end:]
+
+        rows_count = 0
+        if upload_session.header is not None:
+            boundary = _complete_rows_length(data)
+            rows_count = _copy_segment(db, upload_session, data[:boundary])
+            data = data[boundary:]
+
+        upload_session.pending = data
+        upload_session.received_bytes += len(chunk)
+        upload_session.rows_committed += rows_count
+        db.commit()
+        logger.info(f"Upload session {session_id}: committed {rows_count} rows, "
+                    f"offset {upload_session.received_bytes}")
+        return session_state(upload_session)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error appending chunk to upload session {session_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+def finalize_upload_session(session_id: str) -> Tuple[int, Dict[str, Any]]:
+    """Дописывает последнюю строку, агрегирует принятые строки и подменяет ими рабочие таблицы"""
+    db = SessionLocal()
+    try:
+        upload_session = _get_session(db, session_id, lock=True)
+        staging = StagingArea(db, upload_session.staging_suffix)
+        repo = CompanyRepository(db)
+
+        if upload_session.header is None and upload_session.pending:
+            upload_session.header = upload_session.pending.decode("utf-8") + "\n"
+            upload_session.pending = b""
+        if upload_session.pending:
+            upload_session.rows_committed += _copy_segment(db, upload_session, upload_session.pending)
+            upload_session.pending = b""
+
+        created_count = upload_session.rows_committed
+        repo.publish_staged_load(staging, created_count)
+        load_stats = repo.last_load_stats
+
+        # Журнал фиксирует транзакцию целиком: последние строки, подмену таблиц и отметку о
+        # завершении сессии, поэтому после сбоя сессия остается открытой и ее можно завершить заново
+        upload_session.status = SESSION_COMPLETED
+        upload_session.result = {"message": upload_message(created_count, load_stats), "load_stats": load_stats}
+        # Хеш не записывается: состояние SHA-256 нельзя сохранить между частями, а хеш, зависящий
+        # от разбиения на части, не совпал бы с хешем того же файла из /upload-csv/
+        UploadRepository(db).record(None, upload_session.filename, MODE_REPLACE, DEFAULT_KEY, created_count,
+                                    load_stats)
+        aggregate_cache.invalidate()
+        logger.info(f"Upload session {session_id} finalized with {created_count} records")
+        return created_count, load_stats
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error finalizing upload session {session_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+def abort_upload_session(session_id: str) -> Dict[str, Any]:
+    """Отменяет сессию и удаляет промежуточные копии с уже принятыми строками"""
+    db = SessionLocal()
+    try:
+        upload_session = _get_session(db, session_id, lock=True)
+        StagingArea(db, upload_session.staging_suffix).drop()
+        upload_session.status = SESSION_ABORTED
+        upload_session.pending = b""
+        db.commit()
+        logger.info(f"Upload session {session_id} aborted")
+        return session_state(upload_session)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Error aborting upload session {session_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
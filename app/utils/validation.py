@@ -0,0 +1,145 @@
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import VALIDATION_ERROR_LIMIT
+from app.database.layout import BANKRUPTCY_FLAGS, BANKRUPTCY_KEY, MAIN_COLUMNS, METRIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = MAIN_COLUMNS + (BANKRUPTCY_KEY,)
+
+
+class ValidationFailed(ValueError):
+    """Файл не прошел проверку; report содержит общее число ошибок и первые из них"""
+
+    def __init__(self, report: Dict[str, Any]):
+        super().__init__(f"Validation failed: {report['error_count']} invalid values")
+        self.report = report
+
+
+def combine_reports(reports: List[Tuple[str, Dict[str, Any]]],
+                    error_limit: int = VALIDATION_ERROR_LIMIT) -> Dict[str, Any]:
+    """Объединяет отчеты о проверке нескольких файлов, помечая ошибки именем файла"""
+    error_count = sum(report["error_count"] for _, report in reports)
+    errors = [dict(error, file=name) for name, report in reports for error in report["errors"]][:error_limit]
+    return {"error_count": error_count, "errors": errors, "truncated": error_count > len(errors)}
+
+
+class FrameValidator:
+    """Проверка порций перед записью в БД векторными операциями над столбцами
+
+    Без quarantine первая же ошибка останавливает передачу строк в БД, но проверка
+    продолжается до конца файла, чтобы отчет охватил его целиком; затем выбрасывается
+    ValidationFailed. С quarantine строки с ошибками откладываются в quarantined,
+    а остальные загружаются.
+    """
+
+    def __init__(self, quarantine: bool = False, error_limit: int = VALIDATION_ERROR_LIMIT, first_row: int = 1):
+        self.quarantine = quarantine
+        self.error_limit = error_limit
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.quarantined: List[Dict[str, Any]] = []
+        self._next_row = first_row
+        self._checked_columns = False
+        self._rejected = False
+
+    @property
+    def failed(self) -> bool:
+        """Файл отклоняется: без карантина любая ошибка, с карантином - только отсутствие столбцов"""
+        return self._rejected or (self.error_count > 0 and not self.quarantine)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "truncated": self.error_count > len(self.errors),
+        }
+
+    def _add_errors(self, rows: np.ndarray, frame: pd.DataFrame, column: str, mask: np.ndarray, message: str,
+                    messages: Dict[int, List[str]]) -> None:
+        positions = np.flatnonzero(mask)
+        self.error_count += len(positions)
+        if not self.quarantine:
+            positions = positions[:max(self.error_limit - len(self.errors), 0)]
+        values = frame[column] if column in frame else None
+        for position in positions:
+            row = int(rows[position])
+            if self.quarantine:
+                messages.setdefault(position, []).append(f"{column}: {message}")
+            if len(self.errors) < self.error_limit:
+                value = None if values is None or pd.isna(values.iloc[position]) else str(values.iloc[position])
+                self.errors.append({"row": row, "column": column, "value": value, "error": message})
+
+    def _check_columns(self, frame: pd.DataFrame) -> None:
+        self._checked_columns = True
+        missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+        if missing:
+            self._rejected = True
+            self.error_count += len(missing)
+            self.errors.extend(
+                {"row": None, "column": column, "value": None, "error": "required column is missing"}
+                for column in missing
+            )
+            # Без обязательных столбцов файл отклоняется целиком, даже при карантине строк
+            raise ValidationFailed(self.report())
+
+    def validate(self, frame: pd.DataFrame) -> np.ndarray:
+        """Проверяет порцию и возвращает маску строк с ошибками"""
+        if not self._checked_columns:
+            self._check_columns(frame)
+
+        size = len(frame)
+        rows = np.arange(self._next_row, self._next_row + size)
+        self._next_row += size
+        invalid = np.zeros(size, dtype=bool)
+        messages: Dict[int, List[str]] = {}
+
+        def check(column: str, mask, message: str) -> None:
+            mask = np.asarray(mask, dtype=bool)
+            if mask.any():
+                invalid[mask] = True
+                self._add_errors(rows, frame, column, mask, message, messages)
+
+        names = frame["company_name"]
+        check("company_name", names.isna() | (names.astype(str).str.strip() == ""), "value is required")
+        check(BANKRUPTCY_KEY, ~frame[BANKRUPTCY_KEY].isin(list(BANKRUPTCY_FLAGS)),
+              f"must be one of: {', '.join(BANKRUPTCY_FLAGS)}")
+
+        for column, limit in METRIC_COLUMNS.items():
+            if column not in frame:
+                continue
+            values = frame[column]
+            numbers = pd.to_numeric(values, errors="coerce").astype("float64")
+            check(column, values.notna() & numbers.isna(), "not a number")
+            if limit is None:
+                check(column, np.isinf(numbers), "out of range")
+            else:
+                check(column, (numbers < -limit) | (numbers >= limit), "out of range")
+                check(column, np.isfinite(numbers) & (numbers != np.floor(numbers)), "not an integer")
+
+        if self.quarantine and invalid.any():
+            bad = frame[invalid]
+            lines = bad.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n").split("\n")
+            for position, line in zip(np.flatnonzero(invalid), lines):
+                self.quarantined.append({"row_number": int(rows[position]), "errors": messages[position],
+                                         "data": line})
+        return invalid
+
+    def filter(self, frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Пропускает к записи только проверенные строки"""
+        for frame in frames:
+            invalid = self.validate(frame)
+            if self.quarantine:
+                yield frame[~invalid] if invalid.any() else frame
+            elif not self.failed:
+                yield frame
+
+        if self.failed:
+            logger.error(f"Validation failed with {self.error_count} invalid values")
+            raise ValidationFailed(self.report())
+        if self.quarantined:
+            logger.warning(f"Quarantined {len(self.quarantined)} rows with {self.error_count} invalid values")
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from app.config import MAX_CONCURRENT_UPLOADS, PARSE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Ограниченный пул для синхронных стадий загрузки (разбор CSV и запись в БД),
+# чтобы они не блокировали цикл событий
+upload_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_UPLOADS, thread_name_prefix="upload")
+
+# Пул процессов для разбора файлов пакетной загрузки на всех ядрах; создается при первом обращении
+_parse_executor: Optional[ProcessPoolExecutor] = None
+_parse_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Возвращает пул процессов разбора, создавая его при необходимости"""
+    global _parse_executor
+    with _parse_lock:
+        if _parse_executor is None:
+            logger.info(f"Starting parse process pool with {PARSE_WORKERS} workers")
+            _parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        return _parse_executor
+
+
+async def run_in_upload_pool(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Выполняет синхронную функцию в пуле загрузок, не блокируя цикл событий"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(upload_executor, partial(func, *args, **kwargs))
+
+
+def shutdown_upload_pool() -> None:
+    """Дожидается завершения текущих загрузок и останавливает пул"""
+    logger.info("Shutting down upload worker pool")
+    upload_executor.shutdown(wait=True)
+
+    global _parse_executor
+    with _parse_lock:
+        if _parse_executor is not None:
+            _parse_executor.shutdown(wait=True)
+            _parse_executor = None
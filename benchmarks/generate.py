@@ -0,0 +1,115 @@
+import argparse
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.database.layout import BANKRUPTCY_KEY
+
+logger = logging.getLogger(__name__)
+
+# Заголовок совпадает с test_data.csv
+HEADER = (
+    "company_name",
+    "region",
+    "industry",
+    BANKRUPTCY_KEY,
+    "current_business_value",
+    "liquidation_value",
+    "creditor_return",
+    "working_capital_needs",
+    "pre_tax_profit",
+)
+
+# Регионы с весами: три региона с собственными округами и длинный хвост, попадающий в "Другой"
+REGIONS = {
+    "Москва": 0.3,
+    "СПб": 0.15,
+    "Новосибирск": 0.08,
+    "Казань": 0.07,
+    "Екатеринбург": 0.07,
+    "Нижний Новгород": 0.06,
+    "Самара": 0.05,
+    "Ростов-на-Дону": 0.05,
+    "Краснодар": 0.05,
+    "Владивосток": 0.04,
+    "Пермь": 0.04,
+    "Омск": 0.04,
+}
+
+INDUSTRIES = (
+    "IT",
+    "Производство",
+    "Розница",
+    "Строительство",
+    "Сельское хозяйство",
+    "Транспорт",
+    "Финансы",
+    "Энергетика",
+)
+
+# Доли банкротов и пропусков в числовых столбцах
+BANKRUPT_SHARE = 0.1
+MISSING_SHARE = 0.02
+
+GENERATE_CHUNK_SIZE = 100000
+
+
+def _metric(rng: np.random.Generator, size: int, low: int, high: int) -> pd.Series:
+    """Случайные целые значения показателя с небольшой долей пропусков"""
+    values = pd.Series(rng.integers(low, high, size=size), dtype="Int64")
+    values[rng.random(size) < MISSING_SHARE] = pd.NA
+    return values
+
+
+def generate_chunk(rng: np.random.Generator, start: int, size: int) -> pd.DataFrame:
+    """Строит порцию синтетических компаний с номерами начиная с start"""
+    business_value = rng.integers(100000, 50000000, size=size)
+    liquidation_value = (business_value * rng.uniform(0.3, 0.9, size=size)).astype("int64")
+
+    return pd.DataFrame({
+        "company_name": [f"Компания {number}" for number in range(start + 1, start + size + 1)],
+        "region": rng.choice(list(REGIONS), size=size, p=list(REGIONS.values())),
+        "industry": rng.choice(INDUSTRIES, size=size),
+        BANKRUPTCY_KEY: np.where(rng.random(size) < BANKRUPT_SHARE, "Да", "Нет"),
+        "current_business_value": business_value,
+        "liquidation_value": liquidation_value,
+        "creditor_return": _metric(rng, size, 0, 5000000),
+        "working_capital_needs": _metric(rng, size, 0, 3000000),
+        "pre_tax_profit": _metric(rng, size, -2000000, 10000000),
+    }, columns=HEADER)
+
+
+def generate_csv(path: str, rows: int, seed: Optional[int] = 0, chunk_size: int = GENERATE_CHUNK_SIZE) -> int:
+    """Записывает в path CSV из rows синтетических компаний и возвращает размер файла в байтах
+
+    Одинаковый seed дает одинаковый файл, поэтому результаты разных коммитов сопоставимы.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8", newline="") as target:
+        for start in range(0, rows, chunk_size):
+            chunk = generate_chunk(rng, start, min(chunk_size, rows - start))
+            chunk.to_csv(target, index=False, header=start == 0)
+        if rows == 0:
+            target.write(",".join(HEADER) + "\n")
+
+    size = os.path.getsize(path)
+    logger.info(f"Generated {rows} rows ({size} bytes) into {path}")
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Генерирует синтетический CSV с данными компаний")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generate_csv(args.path, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
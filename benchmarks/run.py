@@ -0,0 +1,179 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.config import CSV_CHUNK_SIZE
+from app.database.models import CompanyDataORM
+from app.database.repositories import CompanyRepository, LOAD_MODES, MODE_REPLACE
+from app.database.session import SessionLocal, get_engine
+from app.utils.csv_processor import parse_csv_rows, resolve_engine
+from benchmarks.generate import generate_csv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROWS = (10000, 100000, 1000000)
+
+STAGES = ("parse", "insert", "aggregate")
+
+
+class StageTimer:
+    """Запоминает моменты смены стадий, о которых сообщает CompanyRepository"""
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {}
+
+    def set_stage(self, stage: str) -> None:
+        self.marks.setdefault(stage, time.perf_counter())
+
+    def add_rows(self, count: int) -> None:
+        pass
+
+
+def _stage(seconds: float, rows: int) -> Dict[str, Any]:
+    return {"seconds": round(seconds, 4), "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None}
+
+
+def run_case(path: str, rows: int, mode: str = MODE_REPLACE, chunk_size: int = CSV_CHUNK_SIZE) -> Dict[str, Any]:
+    """Загружает файл и замеряет разбор, вставку и агрегацию по отдельности
+
+    Разбор выполняется заранее в список строк, чтобы время вставки не включало чтение CSV.
+    """
+    db = SessionLocal()
+    try:
+        timer = StageTimer()
+        repo = CompanyRepository(db, progress=timer)
+
+        counties = repo.region_counties()
+        started_at = time.perf_counter()
+        parsed = parse_csv_rows(path, chunk_size, counties)
+        parse_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        repo.bulk_create_from_rows(parsed, mode)
+        finished_at = time.perf_counter()
+    finally:
+        db.close()
+
+    # Если репозиторий не сообщил о стадии агрегации, все время относится к вставке
+    aggregating_at = timer.marks.get("aggregating", finished_at)
+    return {
+        "rows": rows,
+        "file_bytes": os.path.getsize(path),
+        "mode": mode,
+        "method": repo.last_load_stats.get("method"),
+        "parse": _stage(parse_seconds, rows),
+        "insert": _stage(aggregating_at - started_at, rows),
+        "aggregate": _stage(finished_at - aggregating_at, rows),
+        "total_seconds": round(parse_seconds + finished_at - started_at, 4),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    with get_engine().connect() as connection:
+        server_version = connection.exec_driver_sql("SHOW server_version").scalar()
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "csv_engine": resolve_engine(),
+        "postgres": server_version,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Сравнивает пропускную способность стадий с предыдущим отчетом для одинаковых объемов"""
+    previous = {(result["rows"], result["mode"]): result for result in baseline.get("results", [])}
+    lines = []
+    for result in report["results"]:
+        before = previous.get((result["rows"], result["mode"]))
+        if before is None:
+            continue
+        for stage in STAGES:
+            old, new = before[stage]["rows_per_sec"], result[stage]["rows_per_sec"]
+            if old and new:
+                lines.append(f"{result['rows']:>9} rows {stage:<9} {old:>12.1f} -> {new:>12.1f} rows/sec "
+                             f"({(new / old - 1) * 100:+.1f}%)")
+    return lines
+
+
+def run(rows_list: List[int], mode: str, output: str, workdir: str, seed: int,
+        baseline: Optional[str] = None) -> Dict[str, Any]:
+    """Генерирует файлы заданных объемов, замеряет стадии загрузки и сохраняет отчет в JSON"""
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": _environment(),
+        "seed": seed,
+        "results": [],
+    }
+
+    for rows in rows_list:
+        path = os.path.join(workdir, f"companies_{rows}.csv")
+        if not os.path.exists(path):
+            generate_csv(path, rows, seed)
+
+        result = run_case(path, rows, mode)
+        report["results"].append(result)
+        logger.info(
+            f"{rows} rows: parse {result['parse']['seconds']}s, insert {result['insert']['seconds']}s, "
+            f"aggregate {result['aggregate']['seconds']}s"
+        )
+
+    with open(output, "w", encoding="utf-8") as target:
+        json.dump(report, target, ensure_ascii=False, indent=2)
+    logger.info(f"Benchmark report written to {output}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as source:
+            for line in compare(report, json.load(source)):
+                logger.info(line)
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замеряет разбор, вставку и агрегацию на синтетических CSV")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--mode", choices=LOAD_MODES, default=MODE_REPLACE)
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--workdir", default=tempfile.gettempdir(),
+                        help="каталог для сгенерированных файлов; уже существующие файлы переиспользуются")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="отчет предыдущего запуска для сравнения")
+    parser.add_argument("--allow-overwrite", action="store_true",
+                        help="разрешить запуск на БД, в которой уже есть данные компаний")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    db = SessionLocal()
+    try:
+        existing = db.query(CompanyDataORM.id).first()
+    finally:
+        db.close()
+    if existing is not None and not args.allow_overwrite:
+        parser.error("company_data is not empty; benchmark loads replace it, pass --allow-overwrite to proceed")
+
+    run(args.rows, args.mode, args.output, args.workdir, args.seed, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
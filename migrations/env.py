@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 from app.database.models import Base
 from sqlalchemy import engine_from_config, text
@@ -8,6 +9,10 @@ from alembic import context
 # access to the values within the .ini file in use.
 config = context.config
 
+# DSN из окружения имеет приоритет над alembic.ini, как и в приложении
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 fileConfig(config.config_file_name)
@@ -0,0 +1,64 @@
+"""Create initial company and common info tables
+
+Revision ID: 0a1f5c3e9b27
+Revises: 
+Create Date: 2025-07-22 18:04:11.502936
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a1f5c3e9b27'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Таблицы, которые раньше создавались через Base.metadata.create_all при импорте приложения.
+# Базы, созданные таким образом, уже содержат их и стоят на 844d0b34815e, поэтому эта
+# ревизия для них не выполняется; с нее начинается только создание новой базы.
+COMMON_INFO_TABLES = [
+    ('common_info_region', 'region'),
+    ('common_info_county', 'county'),
+    ('common_info_industry', 'industry'),
+]
+
+
+def upgrade():
+    op.create_table('company_data',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_name', sa.String(), nullable=True),
+    sa.Column('region', sa.String(), nullable=True),
+    sa.Column('industry', sa.String(), nullable=True),
+    sa.Column('bankruptcy_data', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='fastapi_schema'
+    )
+    op.create_index('ix_company_data_id', 'company_data', ['id'], unique=False, schema='fastapi_schema')
+
+    for table, key in COMMON_INFO_TABLES:
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(key, sa.String(), nullable=True),
+        sa.Column('total_companies', sa.Integer(), nullable=True),
+        sa.Column('profitable_companies', sa.Integer(), nullable=True),
+        sa.Column('debt_free_companies', sa.Integer(), nullable=True),
+        sa.Column('solvent_companies', sa.Integer(), nullable=True),
+        sa.Column('roa_companies', sa.Integer(), nullable=True),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['fastapi_schema.company_data.id'], name=f'{table}_company_id_fkey'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(key),
+        schema='fastapi_schema'
+        )
+        op.create_index(f'ix_{table}_id', table, ['id'], unique=False, schema='fastapi_schema')
+
+
+def downgrade():
+    for table, _ in reversed(COMMON_INFO_TABLES):
+        op.drop_index(f'ix_{table}_id', table_name=table, schema='fastapi_schema')
+        op.drop_table(table, schema='fastapi_schema')
+
+    op.drop_index('ix_company_data_id', table_name='company_data', schema='fastapi_schema')
+    op.drop_table('company_data', schema='fastapi_schema')
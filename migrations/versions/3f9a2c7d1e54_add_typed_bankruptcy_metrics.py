@@ -0,0 +1,70 @@
+"""Add typed bankruptcy metric columns and region/industry indexes
+
+Revision ID: 3f9a2c7d1e54
+Revises: 844d0b34815e
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a2c7d1e54'
+down_revision = '844d0b34815e'
+branch_labels = None
+depends_on = None
+
+# Значения, которые не подходят под шаблон (в том числе не помещающиеся в тип), остаются только в JSON
+BIGINT_PATTERN = r'^[+-]?\d{1,18}(\.\d+)?$'
+INTEGER_PATTERN = r'^[+-]?\d{1,9}(\.\d+)?$'
+FLOAT_PATTERN = r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d{1,3})?$'
+
+METRIC_COLUMNS = [
+    ('current_business_value', sa.BigInteger(), BIGINT_PATTERN, 'NUMERIC::BIGINT'),
+    ('liquidation_value', sa.BigInteger(), BIGINT_PATTERN, 'NUMERIC::BIGINT'),
+    ('creditor_return', sa.BigInteger(), BIGINT_PATTERN, 'NUMERIC::BIGINT'),
+    ('working_capital_needs', sa.BigInteger(), BIGINT_PATTERN, 'NUMERIC::BIGINT'),
+    ('pre_tax_profit', sa.BigInteger(), BIGINT_PATTERN, 'NUMERIC::BIGINT'),
+    ('solvency_rank', sa.Integer(), INTEGER_PATTERN, 'NUMERIC::INTEGER'),
+    ('roa_coefficient', sa.Float(), FLOAT_PATTERN, 'DOUBLE PRECISION'),
+]
+
+TOTAL_COLUMNS = [
+    'total_business_value',
+    'total_liquidation_value',
+    'total_creditor_return',
+    'total_working_capital_needs',
+    'total_pre_tax_profit',
+]
+
+
+def upgrade():
+    for column, sql_type, _, _ in METRIC_COLUMNS:
+        op.add_column('company_data', sa.Column(column, sql_type, nullable=True), schema='fastapi_schema')
+
+    assignments = ', '.join(
+        f"{column} = CASE WHEN bankruptcy_data->>'{column}' ~ '{pattern}' "
+        f"THEN (bankruptcy_data->>'{column}')::{cast} END"
+        for column, _, pattern, cast in METRIC_COLUMNS
+    )
+    op.execute(f'UPDATE fastapi_schema.company_data SET {assignments}')
+
+    op.create_index(op.f('ix_fastapi_schema_company_data_region'), 'company_data', ['region'], unique=False, schema='fastapi_schema')
+    op.create_index(op.f('ix_fastapi_schema_company_data_industry'), 'company_data', ['industry'], unique=False, schema='fastapi_schema')
+
+    for table in ('region_data', 'county_data'):
+        for column in TOTAL_COLUMNS:
+            op.alter_column(table, column, type_=sa.BigInteger(), existing_type=sa.Integer(), schema='fastapi_schema')
+
+
+def downgrade():
+    for table in ('region_data', 'county_data'):
+        for column in TOTAL_COLUMNS:
+            op.alter_column(table, column, type_=sa.Integer(), existing_type=sa.BigInteger(), schema='fastapi_schema')
+
+    op.drop_index(op.f('ix_fastapi_schema_company_data_industry'), table_name='company_data', schema='fastapi_schema')
+    op.drop_index(op.f('ix_fastapi_schema_company_data_region'), table_name='company_data', schema='fastapi_schema')
+
+    for column, _, _, _ in reversed(METRIC_COLUMNS):
+        op.drop_column('company_data', column, schema='fastapi_schema')
@@ -1,7 +1,7 @@
 """Add RegionDataORM and CountyDataORM
 
 Revision ID: 844d0b34815e
-Revises: 
+Revises: 0a1f5c3e9b27
 Create Date: 2025-07-23 10:38:57.721724
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '844d0b34815e'
-down_revision = None
+down_revision = '0a1f5c3e9b27'
 branch_labels = None
 depends_on = None
 
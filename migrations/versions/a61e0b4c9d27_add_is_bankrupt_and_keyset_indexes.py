@@ -0,0 +1,45 @@
+"""Add is_bankrupt flag and composite indexes for keyset pagination
+
+Revision ID: a61e0b4c9d27
+Revises: 3f9a2c7d1e54
+Create Date: 2026-10-17 11:04:52.907316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a61e0b4c9d27'
+down_revision = '3f9a2c7d1e54'
+branch_labels = None
+depends_on = None
+
+BANKRUPTCY_KEY = 'возбуждено производство по делу о несостоятельности (банкротстве)'
+
+
+def upgrade():
+    op.add_column('company_data', sa.Column('is_bankrupt', sa.Boolean(), nullable=True), schema='fastapi_schema')
+    op.execute(f"""
+        UPDATE fastapi_schema.company_data
+        SET is_bankrupt = CASE bankruptcy_data->>'{BANKRUPTCY_KEY}'
+            WHEN 'Да' THEN TRUE
+            WHEN 'Нет' THEN FALSE
+        END
+    """)
+
+    # Составные индексы покрывают и прежние одиночные индексы по region/industry
+    op.drop_index('ix_fastapi_schema_company_data_region', table_name='company_data', schema='fastapi_schema')
+    op.drop_index('ix_fastapi_schema_company_data_industry', table_name='company_data', schema='fastapi_schema')
+    op.create_index('ix_company_data_region_id', 'company_data', ['region', 'id'], unique=False, schema='fastapi_schema')
+    op.create_index('ix_company_data_industry_id', 'company_data', ['industry', 'id'], unique=False, schema='fastapi_schema')
+    op.create_index('ix_company_data_is_bankrupt_id', 'company_data', ['is_bankrupt', 'id'], unique=False, schema='fastapi_schema')
+
+
+def downgrade():
+    op.drop_index('ix_company_data_is_bankrupt_id', table_name='company_data', schema='fastapi_schema')
+    op.drop_index('ix_company_data_industry_id', table_name='company_data', schema='fastapi_schema')
+    op.drop_index('ix_company_data_region_id', table_name='company_data', schema='fastapi_schema')
+    op.create_index('ix_fastapi_schema_company_data_industry', 'company_data', ['industry'], unique=False, schema='fastapi_schema')
+    op.create_index('ix_fastapi_schema_company_data_region', 'company_data', ['region'], unique=False, schema='fastapi_schema')
+    op.drop_column('company_data', 'is_bankrupt', schema='fastapi_schema')
@@ -0,0 +1,38 @@
+"""Add quarantined rows
+
+Revision ID: a8d4e6f2b9c3
+Revises: f3c9a1d7e5b2
+Create Date: 2026-10-17 21:14:37.208514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4e6f2b9c3'
+down_revision = 'f3c9a1d7e5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quarantined_rows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('filename', sa.String(), nullable=True),
+    sa.Column('row_number', sa.Integer(), nullable=True),
+    sa.Column('errors', sa.JSON(), nullable=True),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='fastapi_schema'
+    )
+    op.create_index(op.f('ix_fastapi_schema_quarantined_rows_content_hash'), 'quarantined_rows', ['content_hash'], unique=False, schema='fastapi_schema')
+    op.create_index(op.f('ix_fastapi_schema_quarantined_rows_id'), 'quarantined_rows', ['id'], unique=False, schema='fastapi_schema')
+
+
+def downgrade():
+    op.drop_index(op.f('ix_fastapi_schema_quarantined_rows_id'), table_name='quarantined_rows', schema='fastapi_schema')
+    op.drop_index(op.f('ix_fastapi_schema_quarantined_rows_content_hash'), table_name='quarantined_rows', schema='fastapi_schema')
+    op.drop_table('quarantined_rows', schema='fastapi_schema')
@@ -0,0 +1,31 @@
+"""Add shared data version
+
+Revision ID: b5e7c2a9d4f1
+Revises: a8d4e6f2b9c3
+Create Date: 2026-10-18 10:41:09.532817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e7c2a9d4f1'
+down_revision = 'a8d4e6f2b9c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='fastapi_schema'
+    )
+    op.execute("INSERT INTO fastapi_schema.data_version (id, generation) VALUES (1, 0)")
+
+
+def downgrade():
+    op.drop_table('data_version', schema='fastapi_schema')
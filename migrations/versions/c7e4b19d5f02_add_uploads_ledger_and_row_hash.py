@@ -0,0 +1,43 @@
+"""Add uploads ledger and company row hashes
+
+Revision ID: c7e4b19d5f02
+Revises: a61e0b4c9d27
+Create Date: 2026-10-17 12:21:08.554130
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e4b19d5f02'
+down_revision = 'a61e0b4c9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('uploads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('filename', sa.String(), nullable=True),
+    sa.Column('mode', sa.String(), nullable=True),
+    sa.Column('key', sa.String(), nullable=True),
+    sa.Column('rows', sa.Integer(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='fastapi_schema'
+    )
+    op.create_index(op.f('ix_fastapi_schema_uploads_content_hash'), 'uploads', ['content_hash'], unique=False, schema='fastapi_schema')
+    op.create_index(op.f('ix_fastapi_schema_uploads_id'), 'uploads', ['id'], unique=False, schema='fastapi_schema')
+
+    # Строки, загруженные до появления хешей, остаются с NULL и при upsert всегда перезаписываются
+    op.add_column('company_data', sa.Column('row_hash', sa.BigInteger(), nullable=True), schema='fastapi_schema')
+
+
+def downgrade():
+    op.drop_column('company_data', 'row_hash', schema='fastapi_schema')
+    op.drop_index(op.f('ix_fastapi_schema_uploads_id'), table_name='uploads', schema='fastapi_schema')
+    op.drop_index(op.f('ix_fastapi_schema_uploads_content_hash'), table_name='uploads', schema='fastapi_schema')
+    op.drop_table('uploads', schema='fastapi_schema')
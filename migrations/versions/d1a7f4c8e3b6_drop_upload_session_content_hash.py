@@ -0,0 +1,24 @@
+"""Drop upload session content hash
+
+Revision ID: d1a7f4c8e3b6
+Revises: b5e7c2a9d4f1
+Create Date: 2026-10-18 14:02:51.176204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a7f4c8e3b6'
+down_revision = 'b5e7c2a9d4f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_column('upload_sessions', 'content_hash', schema='fastapi_schema')
+
+
+def downgrade():
+    op.add_column('upload_sessions', sa.Column('content_hash', sa.String(length=64), nullable=True), schema='fastapi_schema')
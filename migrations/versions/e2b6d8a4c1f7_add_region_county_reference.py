@@ -0,0 +1,53 @@
+"""Add region_county reference and company county column
+
+Revision ID: e2b6d8a4c1f7
+Revises: c7e4b19d5f02
+Create Date: 2026-10-17 19:24:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6d8a4c1f7'
+down_revision = 'c7e4b19d5f02'
+branch_labels = None
+depends_on = None
+
+# Соответствие, которое раньше было зашито в запрос агрегации
+REGION_COUNTIES = [
+    {'region': 'Москва', 'county': 'Центральный'},
+    {'region': 'СПб', 'county': 'Северо-Западный'},
+    {'region': 'Новосибирск', 'county': 'Сибирский'},
+]
+
+
+def upgrade():
+    region_county = op.create_table('region_county',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('region', sa.String(), nullable=False),
+    sa.Column('county', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('region'),
+    schema='fastapi_schema'
+    )
+    op.create_index(op.f('ix_fastapi_schema_region_county_id'), 'region_county', ['id'], unique=False, schema='fastapi_schema')
+    op.bulk_insert(region_county, REGION_COUNTIES)
+
+    op.add_column('company_data', sa.Column('county', sa.String(), nullable=True), schema='fastapi_schema')
+    op.execute("""
+        UPDATE fastapi_schema.company_data AS company
+        SET county = COALESCE(reference.county, 'Другой')
+        FROM fastapi_schema.company_data AS source
+        LEFT JOIN fastapi_schema.region_county AS reference ON reference.region = source.region
+        WHERE company.id = source.id
+    """)
+    op.create_index('ix_company_data_county_id', 'company_data', ['county', 'id'], unique=False, schema='fastapi_schema')
+
+
+def downgrade():
+    op.drop_index('ix_company_data_county_id', table_name='company_data', schema='fastapi_schema')
+    op.drop_column('company_data', 'county', schema='fastapi_schema')
+    op.drop_index(op.f('ix_fastapi_schema_region_county_id'), table_name='region_county', schema='fastapi_schema')
+    op.drop_table('region_county', schema='fastapi_schema')
@@ -0,0 +1,39 @@
+"""Add resumable upload sessions
+
+Revision ID: f3c9a1d7e5b2
+Revises: e2b6d8a4c1f7
+Create Date: 2026-10-17 20:02:15.746391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9a1d7e5b2'
+down_revision = 'e2b6d8a4c1f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_sessions',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('filename', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('staging_suffix', sa.String(), nullable=False),
+    sa.Column('header', sa.Text(), nullable=True),
+    sa.Column('received_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('rows_committed', sa.BigInteger(), nullable=False),
+    sa.Column('pending', sa.LargeBinary(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='fastapi_schema'
+    )
+
+
+def downgrade():
+    op.drop_table('upload_sessions', schema='fastapi_schema')
@@ -1,19 +1,26 @@
 import pytest
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import os
 from app.database.models import Base
+from app.main import app
+from app.utils.cache import county_cache
 
 DB_URL = os.getenv("DATABASE_URL")
 
+# Справочник округов, которым миграция заполняет region_county
+REGION_COUNTIES = {"Москва": "Центральный", "СПб": "Северо-Западный", "Новосибирск": "Сибирский"}
+
 
 @pytest.fixture(scope="session")
 def engine():
     engine = create_engine(DB_URL)
 
-    # Создаем схему в тестовой БД
+    # Создаем схему в тестовой БД; в рабочих БД ее создают миграции Alembic
     with engine.begin() as conn:
         conn.execute(text("CREATE SCHEMA IF NOT EXISTS fastapi_schema"))
+    Base.metadata.create_all(bind=engine)
 
     yield engine
     engine.dispose()
@@ -25,6 +32,12 @@ def db_session(engine):
     with engine.begin() as conn:
         for table in reversed(Base.metadata.sorted_tables):
             conn.execute(text(f"TRUNCATE TABLE fastapi_schema.{table.name} CASCADE"))
+        for region, county in REGION_COUNTIES.items():
+            conn.execute(
+                text("INSERT INTO fastapi_schema.region_county (region, county) VALUES (:region, :county)"),
+                {"region": region, "county": county},
+            )
+    county_cache.invalidate()
 
     connection = engine.connect()
     transaction = connection.begin()
@@ -35,4 +48,10 @@ def db_session(engine):
 
     session.close()
     transaction.rollback()
-    connection.close()
\ No newline at end of file
+    connection.close()
+
+
+@pytest.fixture
+def client(db_session):
+    # Обработчики открывают собственные сессии, поэтому клиенту нужна только очистка таблиц из db_session
+    yield TestClient(app)
\ No newline at end of file
@@ -0,0 +1,133 @@
+from email.utils import parsedate_to_datetime
+from io import StringIO
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import views
+from app.database.session import SessionLocal
+from app.database.versions import bump_data_version, data_version
+from app.handlers import aggregates
+from app.utils.cache import AggregateCache, aggregate_cache
+
+CSV_DATA = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве),pre_tax_profit
+Компания 1,Москва,IT,Да,100
+Компания 2,СПб,Розница,Нет,200"""
+
+
+@pytest.fixture
+def matview_backend(monkeypatch):
+    monkeypatch.setattr(views, "AGGREGATE_BACKEND", views.BACKEND_MATVIEW)
+    yield
+    db = SessionLocal()
+    try:
+        views.drop_views(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _upload(client, csv_data=CSV_DATA, query="?force=true"):
+    response = client.post(f"/api/upload-csv/{query}", files={"file": ("test.csv", StringIO(csv_data))})
+    assert response.status_code == 201
+
+
+def test_get_aggregate_table(client):
+    _upload(client)
+
+    response = client.get("/api/aggregates/region_data")
+
+    assert response.status_code == 200
+    assert [row["region"] for row in response.json()] == ["Москва", "СПб"]
+    assert response.json()[0]["total_pre_tax_profit"] == 100
+    assert response.headers["etag"]
+    assert response.headers["last-modified"]
+
+
+def test_get_aggregate_returns_304_until_next_upload(client):
+    _upload(client)
+    etag = client.get("/api/aggregates/common_info_industry").headers["etag"]
+
+    cached = client.get("/api/aggregates/common_info_industry", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    _upload(client, CSV_DATA.replace("Розница", "Производство"))
+    refreshed = client.get("/api/aggregates/common_info_industry", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+def test_get_aggregate_sees_changes_from_other_workers(client, engine, monkeypatch):
+    monkeypatch.setattr(aggregate_cache, "version_ttl", 0)
+    _upload(client)
+    before = client.get("/api/aggregates/region_data")
+
+    # Другой воркер меняет данные под блокировкой загрузки и не может сбросить кэш этого процесса
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE fastapi_schema.region_data SET total_pre_tax_profit = 999 WHERE region = 'Москва'"
+        ))
+        bump_data_version(Session(bind=connection))
+
+    after = client.get("/api/aggregates/region_data", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.json()[0]["total_pre_tax_profit"] == 999
+    assert parsedate_to_datetime(after.headers["last-modified"]) >= \
+        parsedate_to_datetime(before.headers["last-modified"])
+
+
+def test_polls_reuse_checked_version_without_database(client, monkeypatch):
+    monkeypatch.setattr(aggregate_cache, "version_ttl", 60)
+    _upload(client)
+    checks = []
+
+    def counted_data_version(db):
+        checks.append(db)
+        return data_version(db)
+
+    monkeypatch.setattr(aggregates, "data_version", counted_data_version)
+
+    etag = client.get("/api/aggregates/region_data").headers["etag"]
+    for _ in range(3):
+        assert client.get("/api/aggregates/region_data", headers={"If-None-Match": etag}).status_code == 304
+    assert len(checks) == 1
+
+    # Своя загрузка сбрасывает запомненную версию сразу, не дожидаясь version_ttl
+    _upload(client)
+    client.get("/api/aggregates/region_data")
+    assert len(checks) == 2
+
+
+def test_get_unknown_aggregate(client):
+    assert client.get("/api/aggregates/company_data").status_code == 404
+
+
+def test_cache_discards_entries_loaded_before_invalidation():
+    cache = AggregateCache()
+
+    def stale_loader():
+        cache.invalidate()
+        return ["stale"]
+
+    cache.get("region_data", stale_loader)
+
+    assert cache.get("region_data", lambda: ["fresh"]).body == b'["fresh"]'
+
+
+def _contents(client, table):
+    rows = client.get(f"/api/aggregates/{table}").json()
+    return sorted((tuple((column, value) for column, value in row.items() if column != "id") for row in rows), key=str)
+
+
+def test_materialized_views_match_aggregate_tables(client, request):
+    _upload(client)
+    tables = {table: _contents(client, table) for table in views.AGGREGATE_VIEWS}
+
+    request.getfixturevalue("matview_backend")
+    _upload(client)
+    assert {table: _contents(client, table) for table in views.AGGREGATE_VIEWS} == tables
+
+    _upload(client, CSV_DATA.replace("Компания 2", "Компания 3"), "?mode=append")
+    moscow = [row for row in client.get("/api/aggregates/common_info_region").json() if row["region"] == "Москва"]
+    assert moscow[0]["total_companies"] == 2
@@ -0,0 +1,25 @@
+import csv
+from pathlib import Path
+
+from benchmarks.generate import HEADER, generate_csv
+
+SAMPLE_PATH = Path(__file__).parent.parent / "test_data.csv"
+
+
+def test_generated_csv_matches_sample_header(tmp_path):
+    path = tmp_path / "companies.csv"
+
+    generate_csv(str(path), 250, chunk_size=100)
+
+    with open(SAMPLE_PATH, encoding="utf-8") as sample, open(path, encoding="utf-8") as generated:
+        assert next(csv.reader(generated)) == next(csv.reader(sample)) == list(HEADER)
+        assert len(list(csv.reader(generated))) == 250
+
+
+def test_generated_csv_is_reproducible(tmp_path):
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+
+    generate_csv(str(first), 50, seed=7)
+    generate_csv(str(second), 50, seed=7)
+
+    assert first.read_bytes() == second.read_bytes()
@@ -0,0 +1,80 @@
+import gzip
+import json
+from io import StringIO
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.main import app
+
+CSV_DATA = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве),pre_tax_profit
+Компания 1,Москва,IT,Да,100
+Компания 2,СПб,Розница,Нет,200
+Компания 3,Москва,IT,Нет,300
+Компания 4,Москва,Розница,Да,400"""
+
+
+@pytest.fixture
+def client(db_session):
+    client = TestClient(app)
+    response = client.post("/api/upload-csv/", files={"file": ("test.csv", StringIO(CSV_DATA))})
+    assert response.status_code == 201
+    yield client
+
+
+def test_list_companies_keyset_pagination(client):
+    first = client.get("/api/companies?region=Москва&limit=2").json()
+    second = client.get(f"/api/companies?region=Москва&limit=2&cursor={first['next_cursor']}").json()
+
+    assert [item["company_name"] for item in first["items"]] == ["Компания 1", "Компания 3"]
+    assert [item["company_name"] for item in second["items"]] == ["Компания 4"]
+    assert second["next_cursor"] is None
+
+
+def test_list_companies_filters_and_projection(client):
+    response = client.get("/api/companies?industry=IT&bankrupt=false&fields=company_name,pre_tax_profit")
+
+    assert response.status_code == 200
+    assert response.json()["items"] == [{"id": response.json()["items"][0]["id"],
+                                         "company_name": "Компания 3", "pre_tax_profit": 300}]
+
+
+def test_list_companies_rejects_unknown_fields(client):
+    assert client.get("/api/companies?fields=password").status_code == 400
+
+
+def test_export_companies_csv_matches_upload(client):
+    response = client.get("/api/companies/export")
+
+    assert response.status_code == 200
+    assert response.text.splitlines() == CSV_DATA.splitlines()
+
+
+def test_export_companies_ndjson_gzip(client):
+    response = client.get("/api/companies/export?format=ndjson&gzip=true&region=СПб", stream=True)
+
+    lines = gzip.decompress(response.raw.read()).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{
+        "company_name": "Компания 2",
+        "region": "СПб",
+        "industry": "Розница",
+        "возбуждено производство по делу о несостоятельности (банкротстве)": "Нет",
+        "pre_tax_profit": 200,
+    }]
+
+
+def test_failed_reload_keeps_previous_snapshot(client, db_session):
+    broken = CSV_DATA + "\nКомпания 5,\"Москва,IT,Нет,500"
+
+    response = client.post(
+        "/api/upload-csv/?chunk_size=2",
+        files={"file": ("broken.csv", StringIO(broken))}
+    )
+
+    assert response.status_code == 500
+    assert len(client.get("/api/companies").json()["items"]) == 4
+    staging_tables = db_session.execute(text(
+        "SELECT COUNT(*) FROM pg_tables WHERE schemaname = 'fastapi_schema' AND tablename LIKE '%staging%'"
+    )).scalar()
+    assert staging_tables == 0
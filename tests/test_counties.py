@@ -0,0 +1,67 @@
+from io import StringIO
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database.models import CompanyDataORM, CommonInfoCounty
+from app.database.versions import bump_data_version
+from app.main import app
+from app.utils.cache import county_cache
+
+CSV_DATA = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве),pre_tax_profit
+Компания 1,Москва,IT,Да,100
+Компания 2,Казань,Розница,Нет,200
+Компания 3,Самара,IT,Нет,300"""
+
+
+def _county_totals():
+    response = TestClient(app).get("/api/aggregates/common_info_county")
+    assert response.status_code == 200
+    return {row["county"]: row["total_companies"] for row in response.json()}
+
+
+def test_upload_resolves_county_from_reference(client, db_session):
+    response = client.post("/api/upload-csv/?force=true", files={"file": ("test.csv", StringIO(CSV_DATA))})
+    assert response.status_code == 201
+
+    counties = dict(db_session.query(CompanyDataORM.company_name, CompanyDataORM.county).all())
+    assert counties == {"Компания 1": "Центральный", "Компания 2": "Другой", "Компания 3": "Другой"}
+    assert _county_totals() == {"Центральный": 1, "Другой": 2}
+
+
+def test_reference_update_reassigns_loaded_companies(client, db_session):
+    client.post("/api/upload-csv/?force=true", files={"file": ("test.csv", StringIO(CSV_DATA))})
+
+    reference = "region,county\nМосква,Центральный\nКазань,Приволжский\nСамара,Приволжский\n"
+    response = client.post("/api/region-county/upload-csv",
+                           files={"file": ("counties.csv", StringIO(reference))})
+
+    assert response.status_code == 200
+    assert response.json()["reassigned_companies"] == 2
+    assert client.get("/api/region-county").json()["Самара"] == "Приволжский"
+    assert _county_totals() == {"Центральный": 1, "Приволжский": 2}
+    assert db_session.query(CommonInfoCounty).filter_by(county="Другой").count() == 0
+
+
+def test_upload_rereads_reference_changed_by_other_worker(client, engine, monkeypatch):
+    monkeypatch.setattr(county_cache, "ttl", 3600)
+    client.post("/api/upload-csv/?force=true", files={"file": ("test.csv", StringIO(CSV_DATA))})
+
+    # Другой воркер заменяет справочник и не может сбросить кэш этого процесса
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO fastapi_schema.region_county (region, county) VALUES ('Казань', 'Приволжский')"))
+        bump_data_version(Session(bind=connection))
+
+    response = client.post("/api/upload-csv/?force=true", files={"file": ("test.csv", StringIO(CSV_DATA))})
+    assert response.status_code == 201
+    assert _county_totals() == {"Центральный": 1, "Приволжский": 1, "Другой": 1}
+
+
+def test_reference_upload_rejects_duplicate_regions(client):
+    reference = "region,county\nКазань,Приволжский\nКазань,Другой\n"
+    response = client.post("/api/region-county/upload-csv",
+                           files={"file": ("counties.csv", StringIO(reference))})
+
+    assert response.status_code == 400
+    assert client.put("/api/region-county", json={"Казань": " "}).status_code == 400
@@ -0,0 +1,87 @@
+import bz2
+import gzip
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from app.database.layout import BANKRUPTCY_KEY, CompanyLayout
+from app.utils.compression import BZIP2, GZIP, ZSTD, open_decompressed
+from app.utils.csv_processor import iter_csv_batches, iter_csv_frames, process_csv_file
+
+CSV_DATA = """company_name,region,industry,pre_tax_profit
+Test 1,Москва,IT,100
+Test 2,СПб,,
+Test 3,Новосибирск,Розница,300
+""".encode()
+
+
+def test_iter_csv_batches_respects_chunk_size():
+    batches = list(iter_csv_batches(BytesIO(CSV_DATA), chunk_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][1] == {"company_name": "Test 2", "region": "СПб", "industry": None, "pre_tax_profit": None}
+
+
+@pytest.mark.asyncio
+async def test_process_csv_file_returns_all_records():
+    records = await process_csv_file(BytesIO(CSV_DATA))
+
+    assert [record["company_name"] for record in records] == ["Test 1", "Test 2", "Test 3"]
+
+
+LAYOUT_CSV = f"""company_name,region,industry,{BANKRUPTCY_KEY},pre_tax_profit,solvency_rank
+Test 1,Москва,IT,Да,100,5
+Test 2,СПб,IT,Нет,,нет данных
+""".encode()
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+def test_layout_rows_match_between_engines(engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+
+    frames = list(iter_csv_frames(BytesIO(LAYOUT_CSV), engine=engine))
+    layout = CompanyLayout(frames[0].columns, {"Москва": "Центральный"})
+    rows = [row for frame in frames for row in layout.to_rows(frame)]
+
+    assert rows[0][:4] == ("Test 1", "Москва", "IT",
+                           f'{{"{BANKRUPTCY_KEY}":"Да","pre_tax_profit":100,"solvency_rank":"5"}}')
+    assert rows[0][4:-1] == (None, None, None, None, 100, 5, None, True, "Центральный")
+    assert rows[1][3] == f'{{"{BANKRUPTCY_KEY}":"Нет","pre_tax_profit":null,"solvency_rank":"нет данных"}}'
+    assert rows[1][4:-1] == (None, None, None, None, None, None, None, False, "Другой")
+    assert rows[0][-1] != rows[1][-1]
+
+
+def test_layout_keeps_floats_outside_int64_range():
+    frame = pd.DataFrame({
+        "company_name": ["Test 1", "Test 2"],
+        BANKRUPTCY_KEY: ["Да", "Нет"],
+        "debt": [1e20, 2.0],
+        "ratio": [float("inf"), None],
+    })
+
+    rows = list(CompanyLayout(frame.columns).to_rows(frame))
+
+    assert rows[0][3] == f'{{"{BANKRUPTCY_KEY}":"Да","debt":1e+20,"ratio":"inf"}}'
+    assert rows[1][3] == f'{{"{BANKRUPTCY_KEY}":"Нет","debt":2.0,"ratio":null}}'
+
+
+def _compress(data, compression):
+    if compression == ZSTD:
+        zstandard = pytest.importorskip("zstandard")
+        return zstandard.ZstdCompressor().compress(data)
+    return {GZIP: gzip.compress, BZIP2: bz2.compress}[compression](data)
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+@pytest.mark.parametrize("compression", [GZIP, ZSTD, BZIP2])
+def test_compressed_csv_is_parsed_as_stream(compression, engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+
+    source = open_decompressed(BytesIO(_compress(CSV_DATA, compression)), compression)
+    frames = list(iter_csv_frames(source, chunk_size=2, engine=engine))
+
+    assert [name for frame in frames for name in frame["company_name"]] == ["Test 1", "Test 2", "Test 3"]
+    assert [len(frame) for frame in frames] == [2, 1]
@@ -0,0 +1,74 @@
+import time
+from io import StringIO
+
+from sqlalchemy import text
+
+from app.database.locks import LOAD_LOCK_KEY
+from app.utils.jobs import IngestionJob, JobRegistry
+
+
+def _wait_for_job(client, status_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(status_url).json()
+        if job["stage"] in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job did not finish in {timeout}s")
+
+
+def test_async_upload_returns_job(client):
+    csv_data = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)
+Test 1,Region A,IT,Да
+Test 2,Region B,Manufacturing,Нет"""
+
+    response = client.post(
+        "/api/upload-csv/?async=true",
+        files={"file": ("test.csv", StringIO(csv_data))}
+    )
+
+    assert response.status_code == 202
+    job = _wait_for_job(client, response.json()["status_url"])
+    assert job["stage"] == "completed"
+    assert job["rows_processed"] == 2
+    assert "Successfully uploaded 2 records" in job["result"]["message"]
+
+
+def test_async_upload_waits_for_concurrent_load(client, engine):
+    csv_data = "company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)\n" \
+               "Test 1,Region A,IT,Да"
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": LOAD_LOCK_KEY})
+
+        status_url = client.post(
+            "/api/upload-csv/?async=true", files={"file": ("test.csv", StringIO(csv_data))}
+        ).json()["status_url"]
+        deadline = time.monotonic() + 10
+        while client.get(status_url).json()["stage"] != "waiting":
+            assert time.monotonic() < deadline, "Job did not wait for the load lock"
+            time.sleep(0.05)
+
+        transaction.rollback()
+
+    assert _wait_for_job(client, status_url)["stage"] == "completed"
+
+
+def test_get_unknown_job(client):
+    response = client.get("/api/jobs/unknown")
+    assert response.status_code == 404
+
+
+def test_job_registry_prunes_finished_jobs():
+    registry = JobRegistry(history_limit=1)
+    first, second, running = IngestionJob("a.csv"), IngestionJob("b.csv"), IngestionJob("c.csv")
+    first.complete({})
+    second.fail("boom")
+
+    for job in (first, second, running):
+        registry.add(job)
+
+    assert registry.get(first.id) is None
+    assert registry.get(second.id) is second
+    assert registry.get(running.id) is running
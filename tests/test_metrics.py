@@ -0,0 +1,31 @@
+from io import StringIO
+
+
+def _sample(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " ") or line.startswith(name + "{"):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_cover_upload_stages(client):
+    csv_data = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)
+Test 1,Москва,IT,Да
+Test 2,СПб,IT,Нет"""
+    before = client.get("/metrics").text
+
+    response = client.post("/api/upload-csv/?force=true", files={"file": ("test.csv", StringIO(csv_data))})
+    assert response.status_code == 201
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+
+    text = metrics.text
+    assert _sample(text, 'rows_ingested_total{mode="replace"}') - \
+        _sample(before, 'rows_ingested_total{mode="replace"}') == 2
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/upload-csv/",status="201"}' in text
+    assert 'aggregation_seconds_count{kind="staging"}' in text
+    assert "upload_size_bytes_count" in text
+    assert "csv_parse_seconds_count" in text
+    assert "db_pool_checked_out_connections" in text
@@ -0,0 +1,140 @@
+from app.database.layout import BANKRUPTCY_KEY
+from app.database.models import CompanyDataORM, RegionDataORM, CountyDataORM, CommonInfoRegion, \
+    CommonInfoCounty, CommonInfoIndustry
+from app.database.repositories import CompanyRepository, MODE_APPEND, MODE_UPSERT
+
+
+def _companies():
+    return [
+        {"company_name": "Компания 1", "region": "Москва", "industry": "IT",
+         BANKRUPTCY_KEY: "Да", "pre_tax_profit": 200000, "creditor_return": 500000},
+        {"company_name": "Компания 2", "region": "СПб", "industry": "Производство",
+         BANKRUPTCY_KEY: "Нет", "pre_tax_profit": float("nan"), "creditor_return": 0},
+    ]
+
+
+def test_bulk_create_companies_uses_copy(db_session):
+    repo = CompanyRepository(db_session)
+
+    created = repo.bulk_create_companies(_companies())
+
+    assert created == 2
+    assert repo.last_load_stats["method"] == "copy"
+    assert repo.last_load_stats["rows"] == 2
+
+    company = db_session.query(CompanyDataORM).filter_by(company_name="Компания 2").one()
+    assert company.region == "СПб"
+    assert company.bankruptcy_data == {BANKRUPTCY_KEY: "Нет", "pre_tax_profit": None, "creditor_return": 0}
+
+
+def test_bulk_create_companies_orm_fallback(db_session, monkeypatch):
+    repo = CompanyRepository(db_session)
+    monkeypatch.setattr(repo, "_supports_copy", lambda: False)
+
+    created = repo.bulk_create_companies(_companies()[:1])
+
+    assert created == 1
+    assert repo.last_load_stats["method"] == "orm"
+    assert db_session.query(CompanyDataORM).count() == 1
+
+
+def test_bulk_create_companies_updates_all_aggregates(db_session):
+    companies = _companies() + [
+        {"company_name": "Компания 3", "region": "Москва", "industry": "IT",
+         BANKRUPTCY_KEY: "Нет", "pre_tax_profit": 50000, "creditor_return": 100},
+        {"company_name": "Компания 4", "region": "Казань", "industry": "Розница",
+         BANKRUPTCY_KEY: "Нет", "pre_tax_profit": -10, "creditor_return": 0},
+    ]
+    CompanyRepository(db_session).bulk_create_companies(companies)
+
+    moscow = db_session.query(RegionDataORM).filter_by(region="Москва").one()
+    assert moscow.total_pre_tax_profit == 250000
+    assert moscow.total_creditor_return == 500100
+    assert [row.region for row in db_session.query(RegionDataORM).order_by(RegionDataORM.id)] == \
+        ["Москва", "СПб", "Казань"]
+
+    counties = {row.county: row.total_pre_tax_profit for row in db_session.query(CountyDataORM)}
+    assert counties == {"Центральный": 250000, "Северо-Западный": 0, "Другой": -10}
+
+    region_info = db_session.query(CommonInfoRegion).filter_by(region="Москва").one()
+    assert (region_info.total_companies, region_info.profitable_companies) == (2, 2)
+
+    county_info = db_session.query(CommonInfoCounty).filter_by(county="Другой").one()
+    assert (county_info.total_companies, county_info.debt_free_companies) == (1, 1)
+
+    industry_info = db_session.query(CommonInfoIndustry).filter_by(industry="IT").one()
+    assert industry_info.total_companies == 2
+
+
+def _aggregate_snapshot(db_session):
+    return {
+        "region_data": sorted((row.region, row.total_pre_tax_profit, row.total_creditor_return)
+                              for row in db_session.query(RegionDataORM)),
+        "county_data": sorted((row.county, row.total_pre_tax_profit) for row in db_session.query(CountyDataORM)),
+        "common_info_region": sorted((row.region, row.total_companies, row.profitable_companies)
+                                     for row in db_session.query(CommonInfoRegion)),
+        "common_info_county": sorted((row.county, row.total_companies) for row in db_session.query(CommonInfoCounty)),
+        "common_info_industry": sorted((row.industry, row.total_companies, row.debt_free_companies)
+                                       for row in db_session.query(CommonInfoIndustry)),
+    }
+
+
+def test_upsert_applies_delta_aggregates(db_session):
+    repo = CompanyRepository(db_session)
+    repo.bulk_create_companies(_companies())
+
+    changes = [
+        {"company_name": "Компания 2", "region": "Казань", "industry": "IT",
+         BANKRUPTCY_KEY: "Нет", "pre_tax_profit": 700, "creditor_return": 0},
+        {"company_name": "Компания 5", "region": "Москва", "industry": "Розница",
+         BANKRUPTCY_KEY: "Нет", "pre_tax_profit": 5, "creditor_return": 10},
+    ]
+    repo.bulk_create_companies(changes, mode=MODE_UPSERT)
+    incremental = _aggregate_snapshot(db_session)
+
+    assert db_session.query(CompanyDataORM).count() == 3
+    assert db_session.query(CommonInfoRegion).filter_by(region="СПб").count() == 0
+
+    repo._update_aggregates()
+    assert incremental == _aggregate_snapshot(db_session)
+
+
+def test_append_keeps_existing_rows(db_session):
+    repo = CompanyRepository(db_session)
+    repo.bulk_create_companies(_companies())
+
+    repo.bulk_create_companies(_companies()[:1], mode=MODE_APPEND)
+
+    assert db_session.query(CompanyDataORM).count() == 3
+    assert db_session.query(CommonInfoRegion).filter_by(region="Москва").one().total_companies == 2
+
+
+def test_bulk_create_companies_populates_typed_metrics(db_session):
+    companies = [
+        {"company_name": "Компания 1", "region": "Москва", "industry": "IT", BANKRUPTCY_KEY: "Нет",
+         "pre_tax_profit": "1500.0", "creditor_return": "n/a", "solvency_rank": 10 ** 12, "roa_coefficient": "0.5"},
+    ]
+    CompanyRepository(db_session).bulk_create_companies(companies)
+
+    company = db_session.query(CompanyDataORM).one()
+    assert company.pre_tax_profit == 1500
+    assert company.creditor_return is None
+    assert company.solvency_rank is None
+    assert company.roa_coefficient == 0.5
+    assert company.bankruptcy_data["creditor_return"] == "n/a"
+
+    region_info = db_session.query(CommonInfoRegion).one()
+    assert (region_info.profitable_companies, region_info.roa_companies) == (1, 1)
+
+
+def test_upsert_skips_unchanged_rows(db_session):
+    repo = CompanyRepository(db_session)
+    repo.bulk_create_companies(_companies())
+    unchanged_id = db_session.query(CompanyDataORM.id).filter_by(company_name="Компания 1").scalar()
+
+    changes = [_companies()[0], dict(_companies()[1], pre_tax_profit=100)]
+    repo.bulk_create_companies(changes, mode=MODE_UPSERT)
+
+    assert repo.last_load_stats["unchanged_rows"] == 1
+    assert db_session.query(CompanyDataORM.id).filter_by(company_name="Компания 1").scalar() == unchanged_id
+    assert db_session.query(CompanyDataORM).filter_by(company_name="Компания 2").one().pre_tax_profit == 100
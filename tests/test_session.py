@@ -0,0 +1,62 @@
+import os
+from io import StringIO
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import InternalError
+
+from app.database import session as database_session
+from app.main import app
+from app.utils import consistency
+from app.utils.consistency import READ_PIN_COOKIE
+
+DB_URL = os.getenv("DATABASE_URL")
+# Реплику в тестах заменяет второе подключение к тому же серверу, если отдельная реплика не задана
+READ_URL = os.getenv("DATABASE_READ_URL") or DB_URL
+
+
+@pytest.fixture
+def split_engines(db_session):
+    database_session.dispose_engine()
+    database_session.init_engine(DB_URL, READ_URL)
+    yield
+    database_session.dispose_engine()
+
+
+def test_read_sessions_use_read_only_engine(split_engines):
+    reader = database_session.read_session()
+    writer = database_session.read_session(primary=True)
+    try:
+        assert reader.get_bind() is database_session.get_read_engine()
+        assert writer.get_bind() is database_session.get_engine()
+        assert reader.get_bind() is not writer.get_bind()
+
+        with pytest.raises(InternalError, match="read-only transaction"):
+            reader.execute(text("INSERT INTO fastapi_schema.region_county (region, county) VALUES ('Омск', 'Сибирский')"))
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_reads_pinned_to_primary_after_upload(split_engines, monkeypatch):
+    monkeypatch.setattr(consistency, "READ_YOUR_WRITES_SECONDS", 5)
+    routed = []
+
+    open_session = database_session.read_session
+
+    def read_session(primary=False):
+        routed.append(primary)
+        return open_session(primary)
+
+    monkeypatch.setattr(database_session, "read_session", read_session)
+    client = TestClient(app)
+    csv_data = "company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)\n" \
+               "Test 1,Москва,IT,Да"
+
+    assert client.get("/api/companies").json()["items"] == []
+    response = client.post("/api/upload-csv/", files={"file": ("test.csv", StringIO(csv_data))})
+    assert response.cookies.get(READ_PIN_COOKIE) == "1"
+    assert [item["company_name"] for item in client.get("/api/companies").json()["items"]] == ["Test 1"]
+
+    assert routed == [False, True]
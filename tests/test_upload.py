@@ -1,21 +1,50 @@
+import asyncio
+import gzip
+import hashlib
+import time
+
 import pytest
-from fastapi.testclient import TestClient
-from io import StringIO
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+import zipfile
+from io import BytesIO, StringIO
+from urllib3 import encode_multipart_formdata
+
+from app.database import locks
+from app.handlers import upload
+from app.utils import ingestion
 from app.main import app
-from app.database.session import get_db
+from app.database.layout import BANKRUPTCY_KEY
+from app.database.models import CommonInfoRegion, CompanyDataORM, QuarantinedRowORM, UploadORM
+
+
+REGION_HEADER = "company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)"
 
 
-@pytest.fixture
-def client(db_session):
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
+async def asgi_request(method, path, body=b"", headers=()):
+    """Выполняет запрос напрямую к ASGI-приложению в текущем цикле событий"""
+    messages = []
 
-    app.dependency_overrides[get_db] = override_get_db
-    yield TestClient(app)
-    app.dependency_overrides.clear()
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
 
 
 def test_upload_csv_success(client):
@@ -37,4 +66,288 @@ def test_upload_csv_invalid_file_type(client):
         "/api/upload-csv/",
         files={"file": ("test.txt", StringIO("invalid data"))}
     )
-    assert response.status_code == 400
\ No newline at end of file
+    assert response.status_code == 400
+
+
+def test_upload_compressed_csv(client, db_session):
+    csv_data = f"{REGION_HEADER}\nTest 1,Москва,IT,Да\nTest 2,СПб,IT,Нет"
+
+    response = client.post(
+        "/api/upload-csv/?chunk_size=1",
+        files={"file": ("test.csv.gz", BytesIO(gzip.compress(csv_data.encode())))}
+    )
+
+    assert response.status_code == 201
+    assert "Successfully uploaded 2 records" in response.json()["message"]
+    assert db_session.query(CompanyDataORM).filter_by(company_name="Test 2").one().region == "СПб"
+
+
+def _columnar_file(columnar_format):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({
+        "company_name": ["Test 1", "Test 2", "Test 3"],
+        "region": pa.array(["Москва", "Казань", "Москва"]).dictionary_encode(),
+        "industry": ["IT", "IT", None],
+        BANKRUPTCY_KEY: ["Да", "Нет", "Нет"],
+        "pre_tax_profit": pa.array([100, None, 300], type=pa.int64()),
+        "roa_coefficient": [0.5, 1.25, None],
+    })
+    buffer = BytesIO()
+    if columnar_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, buffer, row_group_size=2)
+    elif columnar_format == "arrows":
+        with pa.ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table, max_chunksize=2)
+    else:
+        with pa.ipc.new_file(buffer, table.schema) as writer:
+            writer.write_table(table, max_chunksize=2)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("columnar_format", ["parquet", "arrows", "arrow"])
+def test_upload_columnar_file(client, db_session, columnar_format):
+    response = client.post(
+        "/api/upload-columnar/?chunk_size=1",
+        files={"file": (f"test.{columnar_format}", _columnar_file(columnar_format))}
+    )
+
+    assert response.status_code == 201
+    assert "Successfully uploaded 3 records" in response.json()["message"]
+
+    company = db_session.query(CompanyDataORM).filter_by(company_name="Test 2").one()
+    assert (company.region, company.county, company.industry) == ("Казань", "Другой", "IT")
+    assert company.bankruptcy_data == {BANKRUPTCY_KEY: "Нет", "pre_tax_profit": None, "roa_coefficient": 1.25}
+    assert (company.pre_tax_profit, company.roa_coefficient, company.is_bankrupt) == (None, 1.25, False)
+    assert db_session.query(CompanyDataORM).filter_by(company_name="Test 3").one().pre_tax_profit == 300
+
+
+def test_upload_columnar_rejects_unknown_format(client):
+    response = client.post("/api/upload-columnar/", files={"file": ("test.csv", StringIO("a,b"))})
+    assert response.status_code == 400
+
+
+def test_upload_csv_rejects_invalid_values(client, db_session):
+    csv_data = (f"{REGION_HEADER},pre_tax_profit\nTest 1,Москва,IT,Да,100\n"
+                f"Test 2,СПб,IT,Может быть,200\nTest 3,СПб,IT,Нет,много\nTest 4,Москва,IT,Да,100.5")
+
+    response = client.post("/api/upload-csv/?chunk_size=2", files={"file": ("test.csv", StringIO(csv_data))})
+
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail["error_count"] == 3
+    assert [(error["row"], error["column"], error["error"]) for error in detail["errors"]] == [
+        (2, BANKRUPTCY_KEY, "must be one of: Да, Нет"), (3, "pre_tax_profit", "not a number"),
+        (4, "pre_tax_profit", "not an integer"),
+    ]
+    assert db_session.query(CompanyDataORM).count() == 0
+
+
+def test_upload_csv_quarantines_invalid_rows(client, db_session):
+    csv_data = f"{REGION_HEADER},pre_tax_profit\nTest 1,Москва,IT,Да,100\nTest 2,СПб,IT,Нет,много"
+
+    response = client.post("/api/upload-csv/?quarantine=true", files={"file": ("test.csv", StringIO(csv_data))})
+
+    assert response.status_code == 201
+    assert response.json()["load_stats"]["quarantined_rows"] == 1
+    assert [company.company_name for company in db_session.query(CompanyDataORM)] == ["Test 1"]
+    quarantined = db_session.query(QuarantinedRowORM).one()
+    assert (quarantined.row_number, quarantined.errors) == (2, ["pre_tax_profit: not a number"])
+    assert quarantined.data["pre_tax_profit"] == "много"
+
+
+def test_upload_csv_rejects_concurrent_load(client, db_session, engine, monkeypatch):
+    monkeypatch.setattr(locks, "LOAD_LOCK_MODE", locks.LOCK_REJECT)
+    csv_data = f"{REGION_HEADER}\nTest 1,Москва,IT,Да"
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": locks.LOAD_LOCK_KEY})
+        response = client.post("/api/upload-csv/", files={"file": ("test.csv", StringIO(csv_data))})
+        transaction.rollback()
+
+    assert response.status_code == 409
+    assert db_session.query(CompanyDataORM).count() == 0
+    assert db_session.execute(text(
+        "SELECT COUNT(*) FROM pg_tables WHERE schemaname = 'fastapi_schema' AND tablename LIKE '%_staging_%'"
+    )).scalar() == 0
+
+
+def test_upload_csv_in_batches(client):
+    rows = "\n".join(f"Test {i},Region A,IT,Нет" for i in range(5))
+    csv_data = f"company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)\n{rows}"
+
+    response = client.post(
+        "/api/upload-csv/?chunk_size=2",
+        files={"file": ("test.csv", StringIO(csv_data))}
+    )
+
+    assert response.status_code == 201
+    assert "Successfully uploaded 5 records" in response.json()["message"]
+
+
+@pytest.mark.asyncio
+async def test_root_stays_responsive_during_upload(monkeypatch):
+    def slow_ingest(*args, **kwargs):
+        time.sleep(1)
+        return 0, {}
+
+    monkeypatch.setattr(upload, "ingest_csv", slow_ingest)
+    body, content_type = encode_multipart_formdata({"file": ("big.csv", b"company_name\nTest")})
+
+    upload_task = asyncio.ensure_future(
+        asgi_request("POST", "/api/upload-csv/", body, [("content-type", content_type)])
+    )
+    await asyncio.sleep(0.1)
+
+    started_at = time.perf_counter()
+    root_status = await asgi_request("GET", "/")
+    elapsed = time.perf_counter() - started_at
+
+    assert root_status == 200
+    assert elapsed < 0.5
+    assert not upload_task.done()
+    assert await upload_task == 201
+
+
+def test_upload_csv_append_mode(client):
+    csv_data = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве)
+Test 1,Region A,IT,Да"""
+
+    for _ in range(2):
+        response = client.post(
+            "/api/upload-csv/?mode=append",
+            files={"file": ("test.csv", StringIO(csv_data))}
+        )
+        assert response.status_code == 201
+        assert response.json()["load_stats"]["mode"] == "append"
+
+
+def test_upload_csv_rejects_unknown_mode(client):
+    response = client.post(
+        "/api/upload-csv/?mode=merge",
+        files={"file": ("test.csv", StringIO("company_name\nTest"))}
+    )
+    assert response.status_code == 422
+
+
+def test_upload_csv_batch_loads_all_files_at_once(client, db_session):
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as target:
+        target.writestr("kazan.csv", f"{REGION_HEADER}\nTest 3,Казань,IT,Нет\nTest 4,Казань,IT,Да")
+        target.writestr("readme.txt", "skipped")
+
+    response = client.post(
+        "/api/upload-csv/batch",
+        files=[
+            ("files", ("moscow.csv", StringIO(f"{REGION_HEADER}\nTest 1,Москва,IT,Да"))),
+            ("files", ("spb.csv", StringIO(f"{REGION_HEADER}\nTest 2,СПб,IT,Нет"))),
+            ("files", ("regions.zip", archive.getvalue())),
+        ]
+    )
+
+    assert response.status_code == 201
+    assert response.json()["load_stats"]["files"] == 3
+    assert db_session.query(CompanyDataORM).count() == 4
+    assert db_session.query(CommonInfoRegion).filter_by(region="Казань").one().total_companies == 2
+
+
+def test_upload_csv_batch_reports_invalid_values(client, db_session):
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as target:
+        target.writestr("kazan.csv", f"{REGION_HEADER}\nTest 3,Казань,IT,Может быть")
+
+    def files():
+        return [
+            ("files", ("moscow.csv", StringIO(f"{REGION_HEADER}\nTest 1,Москва,IT,Да\n,Москва,IT,Нет"))),
+            ("files", ("regions.zip", archive.getvalue())),
+        ]
+
+    response = client.post("/api/upload-csv/batch", files=files())
+
+    assert response.status_code == 422
+    assert [(error["file"], error["row"], error["column"]) for error in response.json()["detail"]["errors"]] == [
+        ("moscow.csv", 2, "company_name"), ("regions.zip/kazan.csv", 1, BANKRUPTCY_KEY)
+    ]
+    assert client.get("/api/companies").json()["items"] == []
+
+    response = client.post("/api/upload-csv/batch?quarantine=true", files=files())
+    assert response.status_code == 201
+    assert response.json()["load_stats"]["quarantined_rows"] == 2
+    assert [company.company_name for company in db_session.query(CompanyDataORM)] == ["Test 1"]
+    assert sorted(row.filename for row in db_session.query(QuarantinedRowORM)) == ["moscow.csv", "regions.zip/kazan.csv"]
+
+
+def test_upload_csv_batch_removes_extracted_files_on_error(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload, "UPLOAD_DIR", str(tmp_path))
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as target:
+        target.writestr("moscow.csv", f"{REGION_HEADER}\nTest 1,Москва,IT,Да")
+        target.writestr("spb.csv", f"{REGION_HEADER}\nTest 2,СПб,IT,Нет")
+    # Портим данные второго файла, чтобы распаковка упала на проверке CRC после первого
+    corrupted = archive.getvalue().replace("Test 2".encode(), b"Test 9")
+
+    response = client.post("/api/upload-csv/batch", files=[("files", ("regions.zip", corrupted))])
+
+    assert response.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_csv_batch_rejects_unparsable_file(client):
+    response = client.post(
+        "/api/upload-csv/batch", files=[("files", ("broken.csv", "company_name\n\"Test 1".encode("utf-16")))]
+    )
+    assert response.status_code == 400
+
+
+def test_upload_csv_batch_rejects_unknown_file_type(client):
+    response = client.post(
+        "/api/upload-csv/batch",
+        files=[("files", ("test.txt", StringIO("invalid data")))]
+    )
+    assert response.status_code == 400
+
+
+def test_repeated_upload_returns_previous_result(client, db_session):
+    first = f"{REGION_HEADER}\nTest 1,Москва,IT,Да"
+    second = f"{REGION_HEADER}\nTest 2,СПб,IT,Нет"
+
+    def post(csv_data, query=""):
+        return client.post(f"/api/upload-csv/{query}", files={"file": ("test.csv", StringIO(csv_data))})
+
+    assert post(first).status_code == 201
+
+    repeated = post(first)
+    assert repeated.status_code == 200
+    assert "already uploaded" in repeated.json()["message"]
+    assert "duplicate_of" in repeated.json()["load_stats"]
+
+    assert post(first, "?force=true").status_code == 201
+    assert post(second).status_code == 201
+    assert post(first).status_code == 201
+    assert db_session.query(CompanyDataORM).one().company_name == "Test 1"
+
+
+def test_repeated_upload_is_skipped_before_parsing(client, db_session, monkeypatch):
+    data = gzip.compress(f"{REGION_HEADER}\nTest 1,Москва,IT,Да\nTest 2,СПб,IT,Может быть".encode())
+
+    def post(query=""):
+        return client.post(f"/api/upload-csv/{query}",
+                           files={"file": ("test.csv.gz", BytesIO(data), "application/gzip")})
+
+    assert post("?quarantine=true").status_code == 201
+
+    def iter_csv_frames(*args, **kwargs):
+        raise AssertionError("repeated upload must not be parsed")
+
+    monkeypatch.setattr(ingestion, "iter_csv_frames", iter_csv_frames)
+    failed_rows = REGISTRY.get_sample_value("rows_failed_total", {"mode": "replace"}) or 0
+
+    repeated = post()
+    assert repeated.status_code == 200
+    assert "already uploaded" in repeated.json()["message"]
+    assert (REGISTRY.get_sample_value("rows_failed_total", {"mode": "replace"}) or 0) == failed_rows
+
+    assert db_session.query(UploadORM).one().content_hash == hashlib.sha256(data).hexdigest()
+    assert db_session.query(CompanyDataORM).one().company_name == "Test 1"
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+
+from app.database.models import CompanyDataORM, CommonInfoRegion, UploadORM
+from app.database.session import get_engine
+from app.database.staging import StagingArea
+from app.handlers import upload_sessions
+from app.utils.sessions import cleanup_abandoned_uploads
+
+CSV_DATA = """company_name,region,industry,возбуждено производство по делу о несостоятельности (банкротстве),pre_tax_profit
+Компания 1,Москва,IT,Да,100
+"Компания 2, ""многострочная""
+часть",СПб,Розница,Нет,200
+Компания 3,Москва,IT,Нет,300""".encode()
+
+
+def _staging_tables(db_session):
+    return db_session.execute(text(
+        "SELECT COUNT(*) FROM pg_tables WHERE schemaname = 'fastapi_schema' AND tablename LIKE '%_staging_%'"
+    )).scalar()
+
+
+def test_chunked_upload_resumes_from_offset(client, db_session):
+    created = client.post("/api/upload-sessions?filename=companies.csv")
+    assert created.status_code == 201
+    upload_url = created.json()["upload_url"]
+
+    # Границы частей режут заголовок, многобайтовые символы и значение в кавычках с переводом строки
+    boundaries = [0, 40, 150, 171, 190, len(CSV_DATA)]
+    for start, end in zip(boundaries, boundaries[1:]):
+        response = client.put(f"{upload_url}?offset={start}", data=CSV_DATA[start:end])
+        assert response.status_code == 200
+        assert response.json()["offset"] == end
+
+    repeated = client.put(f"{upload_url}?offset=40", data=CSV_DATA[40:150])
+    assert repeated.status_code == 409
+    assert repeated.json()["detail"]["offset"] == len(CSV_DATA)
+
+    state = client.get(upload_url).json()
+    assert (state["status"], state["rows_committed"]) == ("open", 2)
+    assert client.get("/api/companies").json()["items"] == []
+
+    finalized = client.post(f"{upload_url}/finalize")
+    assert finalized.status_code == 201
+    assert "Successfully uploaded 3 records" in finalized.json()["message"]
+
+    names = {company.company_name for company in db_session.query(CompanyDataORM)}
+    assert names == {"Компания 1", 'Компания 2, "многострочная"\nчасть', "Компания 3"}
+    assert db_session.query(CommonInfoRegion).filter_by(region="Москва").one().total_companies == 2
+    # Хеш файла по частям не вычисляется, поэтому журнал не выдает его за SHA-256 содержимого
+    assert db_session.query(UploadORM).one().content_hash is None
+    assert client.get(upload_url).json()["status"] == "completed"
+    assert client.post(f"{upload_url}/finalize").status_code == 409
+    assert _staging_tables(db_session) == 0
+
+
+def test_aborted_session_drops_staged_rows(client, db_session):
+    upload_url = client.post("/api/upload-sessions").json()["upload_url"]
+    assert client.put(f"{upload_url}?offset=0", data=CSV_DATA[:150]).status_code == 200
+
+    aborted = client.delete(upload_url)
+
+    assert aborted.json()["status"] == "aborted"
+    assert client.put(f"{upload_url}?offset=150", data=CSV_DATA[150:]).status_code == 409
+    assert client.get("/api/upload-sessions/unknown").status_code == 404
+    assert _staging_tables(db_session) == 0
+
+
+def test_cleanup_expires_idle_sessions_and_drops_orphaned_staging(client, db_session):
+    idle_url = client.post("/api/upload-sessions").json()["upload_url"]
+    assert client.put(f"{idle_url}?offset=0", data=CSV_DATA[:150]).status_code == 200
+    active_url = client.post("/api/upload-sessions").json()["upload_url"]
+    assert client.put(f"{active_url}?offset=0", data=CSV_DATA[:150]).status_code == 200
+
+    with get_engine().begin() as conn:
+        # Сессия без активности двое суток и копии загрузки, прерванной сбоем процесса
+        conn.execute(text(
+            "UPDATE fastapi_schema.upload_sessions SET updated_at = now() - interval '2 days' WHERE id = :id"
+        ), {"id": idle_url.rsplit("/", 1)[-1]})
+        orphan = StagingArea(conn)
+        orphan.create()
+        conn.execute(text(f"COMMENT ON TABLE {orphan.table('company_data')} IS NULL"))
+
+    assert cleanup_abandoned_uploads(max_age=60 * 60) == {"expired_sessions": 1, "abandoned_staging": 1}
+
+    assert client.get(idle_url).json()["status"] == "expired"
+    assert client.put(f"{idle_url}?offset=150", data=CSV_DATA[150:]).status_code == 409
+    assert client.put(f"{active_url}?offset=150", data=CSV_DATA[150:]).status_code == 200
+    assert client.post(f"{active_url}/finalize").status_code == 201
+    assert _staging_tables(db_session) == 0
+
+
+def test_oversized_chunk_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(upload_sessions, "UPLOAD_CHUNK_MAX_BYTES", 100)
+    upload_url = client.post("/api/upload-sessions").json()["upload_url"]
+
+    assert client.put(f"{upload_url}?offset=0", data=CSV_DATA).status_code == 413
+    # Без Content-Length тело читается потоком и отклоняется, как только превысит предел
+    messages = iter([{"type": "http.request", "body": CSV_DATA[:80], "more_body": True},
+                     {"type": "http.request", "body": CSV_DATA[80:160], "more_body": False}])
+
+    async def receive():
+        return next(messages)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(upload_sessions._read_chunk(Request({"type": "http", "headers": []}, receive)))
+    assert error.value.status_code == 413
+
+    assert client.get(upload_url).json()["offset"] == 0
+    assert client.put(f"{upload_url}?offset=0", data=CSV_DATA[:100]).status_code == 200
+    assert client.delete(upload_url).status_code == 200